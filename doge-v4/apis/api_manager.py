@@ -2,11 +2,14 @@ import json
 import os
 from astrbot.api import logger
 
+from .keyword_index import KeywordIndex
+
 
 class APIManager:
     def __init__(self, api_file):
         self.api_file = api_file
         self.apis = {}
+        self.index = KeywordIndex({})
         self.load_data()
 
     def load_data(self):
@@ -16,6 +19,11 @@ class APIManager:
                 self.apis = json.load(file)
         else:
             self._save_data()
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        """增删API后重建触发词索引"""
+        self.index = KeywordIndex(self.apis)
 
     def _save_data(self):
         """将数据保存到JSON文件"""
@@ -25,12 +33,14 @@ class APIManager:
     def add_api(self, api_info: dict):
         """添加一个新的API"""
         self.apis[api_info["name"][0]] = api_info
+        self._rebuild_index()
         self._save_data()
 
     def remove_api(self, name):
         """移除一个API"""
         if name in self.apis:
             del self.apis[name]
+            self._rebuild_index()
             self._save_data()
         else:
             logger.warning(f"API '{name}' 不存在。")
@@ -58,18 +68,10 @@ class APIManager:
         :param fuzzy: 是否模糊匹配
         :return: (key, api_dict) 或 None
         """
-        for key, api_data in self.apis.items():
-            keywords = api_data.get("keyword", [])
-            if isinstance(keywords, str):
-                keywords = [keywords]
-            # 精准匹配
-            if msg in keywords:
-                return key, api_data
-            # 模糊匹配
-            if api_data.get("fuzzy", False):
-                if any(k in msg for k in keywords):
-                    return key, api_data
-        return None
+        key = self.index.match(msg)
+        if key is None:
+            return None
+        return key, self.apis[key]
 
     def check_duplicate_api(self, api_name: str):
         """检查是否有重复的API"""
@@ -0,0 +1,84 @@
+from collections import deque
+
+
+class AhoCorasick:
+    """多模式串匹配自动机，一次扫描找出消息里出现的所有关键词"""
+
+    def __init__(self):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[set] = [set()]
+
+    def add(self, word: str, value):
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append(set())
+            node = nxt
+        self.output[node].add(value)
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.output[nxt] |= self.output[self.fail[nxt]]
+
+    def search(self, text: str) -> set:
+        """返回 text 中出现过的所有关键词对应的值"""
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            if self.output[node]:
+                found |= self.output[node]
+        return found
+
+
+class KeywordIndex:
+    """触发词索引
+
+    精确匹配用 关键词 -> API 的哈希表，模糊匹配的 API 的关键词放进 Aho-Corasick
+    自动机；两边都记录 API 在字典中的顺序，命中多个时取最靠前的一个，
+    和逐个遍历 API 的结果保持一致。
+    """
+
+    def __init__(self, apis: dict):
+        self.keys = list(apis.keys())
+        self.exact: dict[str, int] = {}
+        self.fuzzy = AhoCorasick()
+        # 空关键词在模糊匹配下是任何消息的子串
+        self.always: set[int] = set()
+        for order, (key, api_data) in enumerate(apis.items()):
+            keywords = api_data.get("keyword", [])
+            if isinstance(keywords, str):
+                keywords = [keywords]
+            for keyword in keywords:
+                self.exact.setdefault(keyword, order)
+                if api_data.get("fuzzy", False):
+                    if keyword:
+                        self.fuzzy.add(keyword, order)
+                    else:
+                        self.always.add(order)
+        self.fuzzy.build()
+
+    def match(self, msg: str) -> str | None:
+        hits = self.fuzzy.search(msg) | self.always
+        order = self.exact.get(msg)
+        if order is not None:
+            hits.add(order)
+        if not hits:
+            return None
+        return self.keys[min(hits)]
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class ResponseCache:
+    """按 API 和参数缓存响应，只用于配置了 cache_ttl 的幂等接口"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[tuple, tuple[float, object]] = OrderedDict()
+
+    @staticmethod
+    def make_key(api_name: str, params: dict | None) -> tuple:
+        return api_name, json.dumps(params or {}, sort_keys=True, ensure_ascii=False)
+
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, data = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return data
+
+    def set(self, key: tuple, data, ttl: float):
+        self.entries[key] = (time.monotonic() + ttl, data)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class LocalStore:
+    """API 失效时用的本地数据
+
+    文本按内容哈希去重；图片、视频、音频只记录文件路径。每个 API 的行带一个
+    从 1 开始连续的序号，行数就是最大序号，随机取一条只需要两次主键索引查询。
+    """
+
+    def __init__(self, db_path: Path):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS texts (
+                    api TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    hash TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    PRIMARY KEY (api, seq),
+                    UNIQUE (api, hash)
+                );
+                CREATE TABLE IF NOT EXISTS media (
+                    api TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    path TEXT NOT NULL UNIQUE,
+                    PRIMARY KEY (api, type, seq)
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # ---------- 文本 ----------
+
+    def add_text(self, api: str, content: str) -> bool:
+        """保存一条文本，已存在时返回 False"""
+        digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+        with self.lock, self.conn:
+            return self._insert_text(api, digest, content)
+
+    def _insert_text(self, api: str, digest: str, content: str) -> bool:
+        if self.conn.execute(
+            "SELECT 1 FROM texts WHERE api = ? AND hash = ?", (api, digest)
+        ).fetchone():
+            return False
+        (count,) = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM texts WHERE api = ?", (api,)).fetchone()
+        self.conn.execute(
+            "INSERT INTO texts (api, seq, hash, content) VALUES (?, ?, ?, ?)",
+            (api, count + 1, digest, content),
+        )
+        return True
+
+    def random_text(self, api: str) -> str | None:
+        with self.lock:
+            (count,) = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM texts WHERE api = ?", (api,)).fetchone()
+            if not count:
+                return None
+            row = self.conn.execute(
+                "SELECT content FROM texts WHERE api = ? AND seq = ?", (api, random.randint(1, count))
+            ).fetchone()
+        return row[0] if row else None
+
+    # ---------- 媒体文件 ----------
+
+    def add_media(self, api: str, data_type: str, path: str) -> bool:
+        with self.lock, self.conn:
+            return self._insert_media(api, data_type, path)
+
+    def has_media(self, path: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM media WHERE path = ?", (path,)).fetchone() is not None
+
+    def _insert_media(self, api: str, data_type: str, path: str) -> bool:
+        if self.conn.execute("SELECT 1 FROM media WHERE path = ?", (path,)).fetchone():
+            return False
+        (count,) = self.conn.execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM media WHERE api = ? AND type = ?", (api, data_type)
+        ).fetchone()
+        self.conn.execute(
+            "INSERT INTO media (api, type, seq, path) VALUES (?, ?, ?, ?)",
+            (api, data_type, count + 1, path),
+        )
+        return True
+
+    def random_media(self, api: str, data_type: str) -> str | None:
+        """随机取一个仍然存在的文件路径；文件已被删掉的行顺手清理"""
+        with self.lock:
+            while True:
+                (count,) = self.conn.execute(
+                    "SELECT COALESCE(MAX(seq), 0) FROM media WHERE api = ? AND type = ?", (api, data_type)
+                ).fetchone()
+                if not count:
+                    return None
+                seq = random.randint(1, count)
+                (path,) = self.conn.execute(
+                    "SELECT path FROM media WHERE api = ? AND type = ? AND seq = ?", (api, data_type, seq)
+                ).fetchone()
+                if Path(path).exists():
+                    return path
+                with self.conn:
+                    self._remove_media(api, data_type, seq, count)
+
+    def _remove_media(self, api: str, data_type: str, seq: int, count: int):
+        # 把最后一行挪到被删的位置，保持序号连续
+        self.conn.execute(
+            "DELETE FROM media WHERE api = ? AND type = ? AND seq = ?", (api, data_type, seq)
+        )
+        if seq != count:
+            self.conn.execute(
+                "UPDATE media SET seq = ? WHERE api = ? AND type = ? AND seq = ?",
+                (seq, api, data_type, count),
+            )
+
+    # ---------- 旧数据导入 ----------
+
+    def import_legacy(self, type_dirs: dict[str, Path]) -> int:
+        """首次启动时导入旧版的 <api>.json 文本和媒体目录，只执行一次"""
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+                return 0
+
+        imported = 0
+        with self.lock, self.conn:
+            for data_type, type_dir in type_dirs.items():
+                if not type_dir.exists():
+                    continue
+                if data_type == "text":
+                    for json_path in sorted(type_dir.glob("*.json")):
+                        try:
+                            items = json.loads(json_path.read_text(encoding="utf-8"))
+                        except (OSError, json.JSONDecodeError):
+                            continue
+                        if not isinstance(items, list):
+                            continue
+                        for item in items:
+                            content = str(item)
+                            digest = hashlib.sha1(content.encode("utf-8")).hexdigest()
+                            imported += self._insert_text(json_path.stem, digest, content)
+                else:
+                    for api_dir in sorted(p for p in type_dir.iterdir() if p.is_dir()):
+                        for file in sorted(api_dir.rglob("*")):
+                            if file.is_file():
+                                imported += self._insert_media(api_dir.name, data_type, str(file))
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_imported', '1')")
+        return imported
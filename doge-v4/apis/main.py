@@ -1,5 +1,6 @@
 
-import json
+import asyncio
+import hashlib
 import os
 from pathlib import Path
 import random
@@ -15,6 +16,7 @@ from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.message.components import BaseMessageComponent
 from astrbot.core.star.filter.event_message_type import EventMessageType
 from data.plugins.apis.api_manager import APIManager
+from data.plugins.apis.local_store import LocalStore, ResponseCache
 
 
 # 定义缓存路径
@@ -54,6 +56,35 @@ class ArknightsPlugin(Star):
             k[7:] for k, v in config.get("type_switch", {}).items() if v
         ]
         self.disable_api = config.get("disable_api", [])  # 禁用的api列表
+        self.session: aiohttp.ClientSession | None = None
+        # 响应缓存默认关闭，只对配置了 cache_ttl 的 API 或全局 cache_ttl > 0 时生效
+        self.cache_ttl = config.get("cache_ttl", 0)
+        self.cache = ResponseCache()
+        # 本地兜底数据，旧版 JSON 文件和媒体目录在后台导入一次
+        self.store = LocalStore(DATA_PATH / "local_store.db")
+        asyncio.create_task(self._import_legacy_data())
+
+    async def _import_legacy_data(self):
+        try:
+            imported = await asyncio.to_thread(self.store.import_legacy, TYPE_DIRS)
+            if imported:
+                logger.info(f"已导入 {imported} 条旧版本地数据")
+        except Exception as e:
+            logger.error(f"导入旧版本地数据失败: {e}")
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """所有请求共用一个带连接池的session，单个域名限制并发连接数"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=64, limit_per_host=8, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self.session
+
+    async def terminate(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.store.close()
 
     @filter.command("api list")
     async def api_ls(self, event: AstrMessageEvent):
@@ -121,22 +152,35 @@ class ArknightsPlugin(Star):
             url_list = [url]
         else:
             url_list = url
-        for u in url_list:
-            async with aiohttp.ClientSession() as session:
-                for u in url_list:
-                    try:
-                        async with session.get(url=u, params=params, timeout=30) as response:
-                            response.raise_for_status()
-                            content_type = response.headers.get("Content-Type", "").lower()
-                            if "application/json" in content_type:
-                                return await response.json()
-                            elif "text/html" in content_type or "text/plain" in content_type:
-                                return (await response.text()).strip()
-                            else:
-                                return await response.read()
-                    except Exception as e:
-                        logger.warning(f"请求 URL 失败: {u}, 错误: {e}")
-                        continue  # 尝试下一个 URL
+        if not url_list:
+            return None
+        session = self._get_session()
+
+        async def fetch(u: str):
+            try:
+                async with session.get(url=u, params=params) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("Content-Type", "").lower()
+                    if "application/json" in content_type:
+                        return await response.json()
+                    elif "text/html" in content_type or "text/plain" in content_type:
+                        return (await response.text()).strip()
+                    else:
+                        return await response.read()
+            except Exception as e:
+                logger.warning(f"请求 URL 失败: {u}, 错误: {e}")
+                return None
+
+        # 多个镜像地址同时请求，取最先成功的结果，其余取消
+        tasks = [asyncio.create_task(fetch(u)) for u in url_list]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                if result is not None:
+                    return result
+        finally:
+            for task in tasks:
+                task.cancel()
         logger.error("所有URL请求均失败")
 
     @filter.event_message_type(EventMessageType.ALL)
@@ -208,8 +252,15 @@ class ArknightsPlugin(Star):
 
         data = None
 
-        # 发送请求
-        data = await self._make_request(url=url, params=update_params)
+        # 发送请求，幂等的API可以配置 cache_ttl 复用一段时间内的响应
+        cache_ttl = api_data.get("cache_ttl", self.cache_ttl)
+        cache_key = self.cache.make_key(api_name, update_params)
+        if cache_ttl:
+            data = self.cache.get(cache_key)
+        if data is None:
+            data = await self._make_request(url=url, params=update_params)
+            if data and cache_ttl:
+                self.cache.set(cache_key, data, cache_ttl)
         if self.debug:
             logger.debug(f"响应结果: {data}")
         if data:
@@ -331,9 +382,13 @@ class ArknightsPlugin(Star):
         elif data_type == "audio" and file_path:
             chain = [Comp.Record.fromFileSystem(file_path)]
 
-        # 删除临时文件
-        if isinstance(data, bytes) and file_path and not auto_save_data:
-            os.remove(file_path)
+        # 删除临时文件，保留的文件记入本地数据索引
+        if file_path:
+            if auto_save_data:
+                await asyncio.to_thread(self.store.add_media, api_name, data_type, file_path)
+            elif isinstance(data, bytes) and not await asyncio.to_thread(self.store.has_media, file_path):
+                # 同内容的文件之前被保存过时不能删
+                os.remove(file_path)
 
         return chain  # type: ignore
 
@@ -446,35 +501,10 @@ class ArknightsPlugin(Star):
 
         # 保存文本
         if data_type == "text":
-            json_path = TYPE_DIR / f"{path_name}.json"
-            if not json_path.exists():
-                json_path.write_text(
-                    json.dumps([], ensure_ascii=False, indent=4), encoding="utf-8"
-                )
-                logger.info(f"{path_name}.json 文件不存在, 已创建一个空的 JSON 文件")
-            try:
-                json_data = json.loads(json_path.read_text(encoding="utf-8"))
-            except json.JSONDecodeError:
-                json_data = []
-                logger.error(
-                    f"读取 {path_name}.json 文件失败, 已重置为一个空的 JSON 文件"
-                )
-
-            # 确保 json_data 是一个列表
-            if not isinstance(json_data, list):
-                json_data = []
-
             text = str(data)
             clean_text = text.replace("\\r", "\n")
-
-            # 检查数据是否已存在，避免重复
-            if data not in json_data:
-                json_data.append(clean_text)
-            # 写回更新后的 JSON 数据
-            json_path.write_text(
-                json.dumps(json_data, ensure_ascii=False, indent=4), encoding="utf-8"
-            )
-
+            # 按内容哈希去重
+            await asyncio.to_thread(self.store.add_text, path_name, clean_text)
             return clean_text
 
         # 保存图片、视频、音频
@@ -486,10 +516,11 @@ class ArknightsPlugin(Star):
                 "audio": ".mp3",
                 "video": ".mp4",
             }.get(data_type, ".jpg")
-            index = len(list(save_dir.rglob("*")))
-            save_path = save_dir / f"{path_name}_{index}_api{extension}"
-            with open(save_path, "wb") as f:
-                f.write(data)  # type: ignore
+            # 文件名取内容哈希，相同的文件只保存一份
+            digest = hashlib.sha1(data).hexdigest()[:16]  # type: ignore
+            save_path = save_dir / f"{path_name}_{digest}_api{extension}"
+            if not save_path.exists():
+                await asyncio.to_thread(save_path.write_bytes, data)  # type: ignore
             return save_path
 
 
@@ -500,42 +531,13 @@ class ArknightsPlugin(Star):
         :param data_type: 数据类型（如"text"、"image"等）
         :return: 数据内容或文件路径，如果失败返回None
         """
-        # 数据保存路径
-        TYPE_DIR = TYPE_DIRS.get(data_type, Path("data/temp"))
-
-        # 随机取一条文本
         if data_type == "text":
-            json_path = TYPE_DIR / f"{path_name}.json"
-            if not json_path.exists():
-                logger.error(f"文件不存在：{json_path}")
-                return None
-
-            try:
-                json_data = json.loads(json_path.read_text(encoding="utf-8"))
-            except json.JSONDecodeError as e:
-                logger.error(f"解析JSON文件失败：{json_path}，错误：{e}")
-                return None
-
-            if isinstance(json_data, list) and json_data:
-                return random.choice(json_data)
-            else:
-                logger.error(f"JSON数据格式错误：{json_data}")
-                return None
-
-        # 随机取一张图片、视频、音频的路径
+            data = await asyncio.to_thread(self.store.random_text, path_name)
         else:
-            save_dir = TYPE_DIR / f"{path_name}"
-            if save_dir.exists():
-                files = list(save_dir.iterdir())
-                if files:
-                    selected_file = random.choice(files)
-                    return str(selected_file)
-                else:
-                    logger.error(f"目录为空：{save_dir}")
-                    return None
-            else:
-                logger.error(f"目录不存在：{save_dir}")
-                return None
+            data = await asyncio.to_thread(self.store.random_media, path_name, data_type)
+        if data is None:
+            logger.error(f"本地没有 {path_name} 的{data_type}数据")
+        return data
 
     @staticmethod
     async def _get_extra(event: AstrMessageEvent, target_id: str):
@@ -14,6 +14,9 @@ import time
 import random
 from playwright.async_api import async_playwright
 
+from .page_pool import PlotterPagePool, render_count, show_expression, wait_for_render
+from .renderer import UnsupportedExpression, render_png
+
 @register("complex_plotter", "runnel", "复函数绘图插件", "2.0.0")
 class ComplexPlotterPlugin(Star):
     def __init__(self, context: Context, config: dict = None):
@@ -21,9 +24,20 @@ class ComplexPlotterPlugin(Star):
         self.config = config if config is not None else {}
         self.playwright = None
         self.browser = None
+        self.page_pool = None
         self.is_initialized = False
+        self.init_lock = asyncio.Lock()
+        # 预热的绘图页面数量
+        self.page_pool_size = int(self.config.get("page_pool_size", 2))
         # 添加auto_cleanup_files属性，避免初始化错误
         self.auto_cleanup_files = True
+        # 本地绘图的分辨率和范围（以中心点为圆心、半宽为 plot_radius 的正方形）
+        self.plot_resolution = int(self.config.get("plot_resolution", 800))
+        self.plot_radius = float(self.config.get("plot_radius", 2.0))
+        self.plot_center = complex(
+            float(self.config.get("plot_center_x", 0.0)),
+            float(self.config.get("plot_center_y", 0.0)),
+        )
         # 从配置中获取代理设置，默认不使用代理
         self.proxy = self.config.get("proxy", None)
         
@@ -32,6 +46,7 @@ class ComplexPlotterPlugin(Star):
         self.update_interval = self.config.get("update_interval", 3600)  # 默认每小时更新一次
         self.test_url = self.config.get("test_url", "https://www.google.com")  # 测试节点可用性的目标URL
         self.test_timeout = self.config.get("test_timeout", 10)  # 节点测试超时时间(秒)
+        self.test_concurrency = int(self.config.get("test_concurrency", 16))  # 同时测试的节点数
         
         # 存储订阅节点和当前使用的代理
         self.nodes = []
@@ -44,9 +59,12 @@ class ComplexPlotterPlugin(Star):
 
     async def initialize(self):
         """初始化Playwright并检查浏览器驱动是否已安装"""
-        if self.is_initialized:
-            return
-            
+        async with self.init_lock:
+            if self.is_initialized:
+                return
+            await self._start_browser()
+
+    async def _start_browser(self):
         try:
             # 初始化Playwright
             self.playwright = await async_playwright().start()
@@ -68,9 +86,17 @@ class ComplexPlotterPlugin(Star):
             
             # 启动浏览器
             self.browser = await self.playwright.chromium.launch(**launch_options)
+            # 预先打开若干个已加载好绘图网站的页面
+            self.page_pool = PlotterPagePool(self.browser, self.page_pool_size)
+            await self.page_pool.start()
             self.is_initialized = True
             logger.info("Playwright initialized successfully for complex plotter")
         except Exception as e:
+            # 已经启动的浏览器和Playwright不能留着，否则下次初始化会再启动一份
+            try:
+                await self.close_browser()
+            except Exception as close_error:
+                logger.warning(f"关闭未初始化完成的浏览器失败：{close_error}")
             if "Executable doesn't exist at" in str(e):
                 error_message = (
                     "Playwright浏览器驱动未找到，请按照以下说明安装。\n\n"
@@ -105,15 +131,19 @@ class ComplexPlotterPlugin(Star):
     async def complex_plot(self, event: AstrMessageEvent):
         # 可以重新添加类型注解了，因为已经正确导入了AstrMessageEvent
         try:
-            if not self.is_initialized:
-                await self.initialize()
-                
             message = event.message_str or ""
             eq = message[len("/complex plot"):].strip()
-            encoded_eq = quote(eq)
-            url = f"https://samuelj.li/complex-function-plotter/#{encoded_eq}"
-            
-            screenshot_data = await self.capture_screenshot(url)
+
+            try:
+                # 优先在本地用 NumPy 绘制，不需要浏览器和网络
+                screenshot_data = await asyncio.to_thread(
+                    render_png, eq, self.plot_center, self.plot_radius, self.plot_resolution
+                )
+            except UnsupportedExpression as e:
+                logger.info(f"本地绘图不支持该表达式（{e}），回退到浏览器绘图")
+                if not self.is_initialized:
+                    await self.initialize()
+                screenshot_data = await self.capture_screenshot(quote(eq))
         
             with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
                 tmp.write(screenshot_data)
@@ -160,31 +190,17 @@ class ComplexPlotterPlugin(Star):
                 # 回退到使用reply方法
                 yield event.reply(f"执行自定义代码时出错: {str(e)}")
 
-    async def capture_screenshot(self, url):
-        """使用Playwright捕获指定URL的截图"""
-        page = None
+    async def capture_screenshot(self, encoded_eq):
+        """在预热好的页面上修改 hash 绘图并截图"""
         retry_count = 0
         max_retries = 2
-        screenshot = None
-        
-        while retry_count <= max_retries and screenshot is None:
+
+        while True:
             try:
-                page = await self.browser.new_page()
-                await page.set_viewport_size({"width": 1080, "height": 1080})
-                
-                # 增加超时时间到120秒，并使用更灵活的等待策略
-                # 先等待导航完成，再等待特定元素出现
-                await page.goto(url, wait_until="load", timeout=120000)  # 使用"load"而不是"domcontentloaded"
-                
-                # 更宽松地等待画布元素加载，允许更多时间
-                await page.wait_for_selector("canvas", timeout=30000)
-                
-                # 增加等待时间确保图像渲染完成
-                await page.wait_for_timeout(3000)  # 额外等待3秒
-                
-                # 截取全屏
-                screenshot = await page.screenshot(full_page=True)
-                logger.info(f"成功捕获 {url} 的截图，重试次数: {retry_count}")
+                async with self.page_pool.page() as page:
+                    await show_expression(page, encoded_eq)
+                    screenshot = await page.screenshot(full_page=True)
+                logger.info(f"成功捕获 {encoded_eq} 的截图，重试次数: {retry_count}")
                 return screenshot
             except Exception as e:
                 retry_count += 1
@@ -194,45 +210,35 @@ class ComplexPlotterPlugin(Star):
                     logger.error(f"达到最大重试次数，截图失败: {error_msg}")
                     raise
                 # 指数退避等待
-                await page.wait_for_timeout(1000 * (2 ** (retry_count - 1)))
-            finally:
-                if page:
-                    await page.close()
+                await asyncio.sleep(2 ** (retry_count - 1))
 
     async def execute_custom_code(self, code):
-        """使用Playwright执行自定义代码并捕获截图"""
-        page = None
+        """在预热好的页面上执行自定义代码并截图，用完后页面在后台重新加载"""
         retry_count = 0
         max_retries = 2
-        screenshot = None
-        
-        while retry_count <= max_retries and screenshot is None:
+
+        while True:
             try:
-                page = await self.browser.new_page()
-                await page.set_viewport_size({"width": 1080, "height": 1080})
-                
-                # 访问指定URL
-                await page.goto("https://samuelj.li/complex-function-plotter/#z", wait_until="load", timeout=120000)
-                
-                # 点击无文本按钮
-                await page.get_by_role("button").filter(has_text=re.compile(r"^$")).click()
-                
-                # 点击"Custom Function"按钮
-                await page.get_by_role("button", name="Custom Function").click()
-                
-                # 操作textarea
-                await page.locator("textarea").click()
-                await page.locator("textarea").press("ControlOrMeta+a")
-                await page.locator("textarea").fill(code)
-                await page.locator("#app-bar").get_by_role("button").filter(has_text=re.compile(r"^$")).click()
-                # 等待画布元素加载完成
-                await page.wait_for_selector("canvas", timeout=30000)
-                
-                # 等待绘图完成
-                await page.wait_for_timeout(3000)  # 额外等待3秒确保图像渲染完成
-                
-                # 截取全屏
-                screenshot = await page.screenshot(full_page=True)
+                async with self.page_pool.page(reset=True) as page:
+                    drawn = await render_count(page)
+
+                    # 点击无文本按钮
+                    await page.get_by_role("button").filter(has_text=re.compile(r"^$")).click()
+
+                    # 点击"Custom Function"按钮
+                    await page.get_by_role("button", name="Custom Function").click()
+
+                    # 操作textarea
+                    await page.locator("textarea").click()
+                    await page.locator("textarea").press("ControlOrMeta+a")
+                    await page.locator("textarea").fill(code)
+                    await page.locator("#app-bar").get_by_role("button").filter(has_text=re.compile(r"^$")).click()
+
+                    # 等待绘图完成
+                    await wait_for_render(page, since=drawn)
+
+                    # 截取全屏
+                    screenshot = await page.screenshot(full_page=True)
                 logger.info(f"成功执行自定义代码并捕获截图，重试次数: {retry_count}")
                 return screenshot
             except Exception as e:
@@ -243,25 +249,31 @@ class ComplexPlotterPlugin(Star):
                     logger.error(f"达到最大重试次数，执行自定义代码失败: {error_msg}")
                     raise
                 # 指数退避等待
-                await asyncio.sleep(1000 * (2 ** (retry_count - 1)) / 1000)  # 转换为秒
-            finally:
-                if page:
-                    await page.close()
+                await asyncio.sleep(2 ** (retry_count - 1))
 
-    async def terminate(self):
-        """插件停用时关闭浏览器和Playwright"""
+    async def close_browser(self):
+        """关闭页面池、浏览器和Playwright"""
+        if self.page_pool:
+            await self.page_pool.close()
+            self.page_pool = None
         if self.browser:
             await self.browser.close()
+            self.browser = None
         if self.playwright:
             await self.playwright.stop()
+            self.playwright = None
         self.is_initialized = False
+
+    async def terminate(self):
+        """插件停用时关闭浏览器和Playwright"""
+        await self.close_browser()
         logger.info("Complex plotter plugin terminated, browser and playwright closed")
 
     async def get_effective_proxy(self):
         """获取当前有效的代理配置"""
         # 优先使用测试通过的mihomo节点
         if self.current_node:
-            return self.current_node
+            return self._playwright_proxy(self.current_node)
         
         # 如果没有可用的mihomo节点，使用手动配置的代理
         if self.proxy:
@@ -462,61 +474,75 @@ class ComplexPlotterPlugin(Star):
                     nodes.append(node)
         return nodes
     
-    async def _test_nodes(self):
-        """测试代理节点可用性"""
-        logger.info(f"开始测试 {len(self.nodes)} 个代理节点")
-        
-        # 创建一个临时浏览器实例来测试节点
-        test_playwright = await async_playwright().start()
-        
-        available_nodes = []
-        
-        for node in self.nodes:
-            try:
-                start_time = time.time()
-                
-                # 配置浏览器使用当前节点
-                browser = await test_playwright.chromium.launch(
-                    headless=True,
-                    args=["--no-sandbox"],
-                    proxy=node
+    @staticmethod
+    def _playwright_proxy(node):
+        """把订阅节点转换成Playwright的代理配置"""
+        proxy = {"server": f"{node['type']}://{node['server']}:{node['port']}"}
+        if node.get("username") and node.get("password"):
+            proxy["username"] = node["username"]
+            proxy["password"] = node["password"]
+        return proxy
+
+    async def _probe_node(self, session, node):
+        """轻量探测一个节点，返回响应时间，失败返回None
+
+        HTTP代理直接通过代理请求测试地址；其他协议只测试能否连上节点端口。
+        """
+        start_time = time.monotonic()
+        try:
+            if node["type"] in ("http", "https"):
+                async with session.get(self.test_url, proxy=node["proxy_url"], allow_redirects=False) as response:
+                    if response.status >= 500:
+                        return None
+            else:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(node["server"], node["port"]), self.test_timeout
                 )
-                
-                # 创建页面并测试连接
-                page = await browser.new_page()
-                await page.goto(self.test_url, wait_until="domcontentloaded", timeout=self.test_timeout * 1000)
-                
-                # 计算响应时间
-                response_time = time.time() - start_time
-                
-                # 关闭浏览器
-                await browser.close()
-                
-                logger.info(f"节点 {node['name']} 测试通过，响应时间: {response_time:.2f}s")
-                available_nodes.append((node, response_time))
-            except Exception:
-                # 节点测试失败，忽略错误
-                continue
-        
-        # 关闭测试用的Playwright实例
-        await test_playwright.stop()
-        
+                writer.close()
+                await writer.wait_closed()
+        except Exception:
+            return None
+        return time.monotonic() - start_time
+
+    async def _test_nodes(self):
+        """并发测试代理节点可用性"""
+        # 浏览器只能使用HTTP/HTTPS/SOCKS5代理，其他协议的节点选出来也用不上
+        candidates = [n for n in self.nodes if n["type"] in ("http", "https", "socks5") and n.get("server")]
+        logger.info(f"开始测试 {len(candidates)} 个代理节点（共 {len(self.nodes)} 个，跳过浏览器不支持的协议）")
+
+        import aiohttp
+        semaphore = asyncio.Semaphore(max(1, self.test_concurrency))
+        timeout = aiohttp.ClientTimeout(total=self.test_timeout)
+
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async def probe(node):
+                async with semaphore:
+                    response_time = await self._probe_node(session, node)
+                if response_time is not None:
+                    logger.info(f"节点 {node['name']} 测试通过，响应时间: {response_time:.2f}s")
+                return node, response_time
+
+            results = await asyncio.gather(*(probe(node) for node in candidates))
+
+        available_nodes = [(node, t) for node, t in results if t is not None]
+
         if available_nodes:
             # 按响应时间排序，选择最快的节点
             available_nodes.sort(key=lambda x: x[1])
             best_node = available_nodes[0][0]
             
             logger.info(f"选择最佳节点: {best_node['name']}")
-            
+
+            changed = best_node != self.current_node
             # 更新当前使用的节点
             self.current_node = best_node
             
             # 如果浏览器已经初始化，重启浏览器以应用新的代理设置
-            if self.is_initialized and self.browser:
+            if changed and self.is_initialized:
                 logger.info("重启浏览器以应用新的代理设置")
-                await self.browser.close()
-                self.browser = None
-                await self.initialize()
+                async with self.init_lock:
+                    await self.close_browser()
+                    await self._start_browser()
         else:
             logger.warning("没有测试通过的代理节点")
-            self.current_node = None
\ No newline at end of file
+            self.current_node = None
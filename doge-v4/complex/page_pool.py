@@ -0,0 +1,194 @@
+"""
+复函数绘图网站的页面池
+
+页面创建后就加载好绘图网站并等到画布出现，之后每次绘图只修改 URL 的 hash，
+不再每次都完整导航和固定等待。页面里注入了一个绘制计数器（包装 WebGL 的
+drawArrays/drawElements 和 2D 画布的 drawImage/putImageData），修改 hash 前记下计数，
+等到计数增加、并且连续两帧不再变化时才认为新图已经画完。
+自定义函数会改动页面状态，用完后在后台重新加载再放回池中。
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+from astrbot.api import logger
+
+PLOTTER_URL = "https://samuelj.li/complex-function-plotter/"
+
+# 每次加载文档前注入：统计画布绘制调用次数，并提供等待绘制完成的函数
+RENDER_SIGNAL_JS = """
+(() => {
+    window.__plotterDraws = 0;
+    const wrap = (proto, names) => {
+        if (!proto) return;
+        for (const name of names) {
+            const original = proto[name];
+            if (typeof original !== "function") continue;
+            proto[name] = function (...args) {
+                window.__plotterDraws++;
+                return original.apply(this, args);
+            };
+        }
+    };
+    wrap(window.WebGLRenderingContext && WebGLRenderingContext.prototype, ["drawArrays", "drawElements"]);
+    wrap(window.WebGL2RenderingContext && WebGL2RenderingContext.prototype, ["drawArrays", "drawElements"]);
+    wrap(window.CanvasRenderingContext2D && CanvasRenderingContext2D.prototype, ["drawImage", "putImageData"]);
+
+    // 等到绘制次数超过 since 且连续两帧没有新的绘制；超过 limit 毫秒仍没有绘制时返回 false
+    window.__plotterWaitRender = (since, limit) => new Promise(resolve => {
+        const deadline = performance.now() + limit;
+        const settle = () => {
+            const count = window.__plotterDraws;
+            requestAnimationFrame(() => requestAnimationFrame(() => {
+                if (window.__plotterDraws === count || performance.now() > deadline) {
+                    resolve(true);
+                } else {
+                    settle();
+                }
+            }));
+        };
+        const check = () => {
+            if (document.querySelector("canvas") && window.__plotterDraws > since) {
+                settle();
+            } else if (performance.now() > deadline) {
+                resolve(false);
+            } else {
+                setTimeout(check, 20);
+            }
+        };
+        check();
+    });
+})();
+"""
+
+# 修改 hash 并等待重新绘制；hash 没有变化时页面不会重绘，只等当前画面稳定
+SHOW_EXPRESSION_JS = """
+([hash, limit]) => {
+    const since = window.__plotterDraws;
+    const previous = window.location.hash;
+    window.location.hash = hash;
+    return window.__plotterWaitRender(window.location.hash === previous ? -1 : since, limit);
+}
+"""
+
+# 没有检测到新的绘制时最多等待的时间（毫秒）
+RENDER_LIMIT_MS = 15000
+
+
+class PlotterPagePool:
+    def __init__(self, browser, size: int = 2, viewport: int = 1080):
+        self.browser = browser
+        self.size = max(1, size)
+        self.viewport = viewport
+        self.pages: asyncio.Queue = asyncio.Queue()
+        self.all_pages = set()
+        self.tasks = set()
+        self.closed = False
+
+    async def start(self):
+        results = await asyncio.gather(*(self._new_page() for _ in range(self.size)), return_exceptions=True)
+        for page in results:
+            if isinstance(page, Exception):
+                logger.warning(f"预热绘图页面失败: {page}")
+                continue
+            self.pages.put_nowait(page)
+        if self.pages.empty():
+            raise RuntimeError("无法打开复函数绘图网站")
+
+    async def _new_page(self):
+        page = await self.browser.new_page()
+        self.all_pages.add(page)
+        try:
+            await page.add_init_script(RENDER_SIGNAL_JS)
+            await page.set_viewport_size({"width": self.viewport, "height": self.viewport})
+            await self._load(page)
+        except Exception:
+            await self._discard(page)
+            raise
+        return page
+
+    async def _load(self, page, hash_: str = "z"):
+        await page.goto(f"{PLOTTER_URL}#{hash_}", wait_until="load", timeout=120000)
+        await page.wait_for_selector("canvas", timeout=30000)
+        # 新文档的计数从 0 开始，首次绘制后计数大于 0
+        await wait_for_render(page, since=0)
+
+    async def _discard(self, page):
+        self.all_pages.discard(page)
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    async def _reset_and_return(self, page):
+        """页面状态被改动或出错后重新加载，失败则换一个新页面"""
+        try:
+            await self._load(page)
+        except Exception as e:
+            logger.warning(f"重置绘图页面失败，重新创建: {e}")
+            await self._discard(page)
+            if self.closed:
+                return
+            try:
+                page = await self._new_page()
+            except Exception as e:
+                logger.error(f"重新创建绘图页面失败: {e}")
+                return
+        if self.closed:
+            await self._discard(page)
+        else:
+            self.pages.put_nowait(page)
+
+    @asynccontextmanager
+    async def page(self, reset: bool = False):
+        """借出一个已加载好的页面；reset=True 或出错时用完后在后台重新加载"""
+        if not self.all_pages:
+            # 所有页面都在重建失败后丢失时补一个
+            self.pages.put_nowait(await self._new_page())
+        page = await self.pages.get()
+        dirty = reset
+        try:
+            yield page
+        except BaseException:
+            dirty = True
+            raise
+        finally:
+            if self.closed:
+                await self._discard(page)
+            elif dirty:
+                task = asyncio.create_task(self._reset_and_return(page))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            else:
+                self.pages.put_nowait(page)
+
+    async def close(self):
+        self.closed = True
+        for task in list(self.tasks):
+            task.cancel()
+        for page in list(self.all_pages):
+            await self._discard(page)
+
+
+async def render_count(page) -> int:
+    """当前页面的绘制计数，在触发重新绘图之前调用"""
+    return await page.evaluate("() => window.__plotterDraws")
+
+
+async def wait_for_render(page, since: int, timeout: float = 30):
+    """等待绘制计数超过 since 并稳定下来"""
+    drawn = await asyncio.wait_for(
+        page.evaluate("([since, limit]) => window.__plotterWaitRender(since, limit)", [since, RENDER_LIMIT_MS]),
+        timeout,
+    )
+    if not drawn:
+        logger.warning(f"{RENDER_LIMIT_MS // 1000}秒内没有检测到画布重新绘制")
+
+
+async def show_expression(page, expression_hash: str, timeout: float = 30):
+    """只修改 hash，由页面自己的 hashchange 处理重新绘图，并等到新图画完"""
+    drawn = await asyncio.wait_for(
+        page.evaluate(SHOW_EXPRESSION_JS, [expression_hash, RENDER_LIMIT_MS]),
+        timeout,
+    )
+    if not drawn:
+        logger.warning(f"{RENDER_LIMIT_MS // 1000}秒内没有检测到画布重新绘制")
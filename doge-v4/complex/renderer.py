@@ -0,0 +1,234 @@
+"""
+本地复函数绘图（domain coloring）
+
+- 表达式先做少量预处理（^ 转 **、数字/右括号后的隐式乘法），再用 ast 解析，
+  只允许白名单内的运算、函数和常量，不会执行任意代码
+- 在 NumPy 复数网格上向量化求值，色相表示辐角，亮度按 log2|w| 的小数部分
+  画出模长等高线
+- 无法识别的语法抛出 UnsupportedExpression，由调用方回退到浏览器绘图
+"""
+import ast
+import re
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+MAX_EXPRESSION_LENGTH = 200
+MAX_NODES = 200
+
+FUNCTIONS = {
+    "sin": np.sin,
+    "cos": np.cos,
+    "tan": np.tan,
+    "sinh": np.sinh,
+    "cosh": np.cosh,
+    "tanh": np.tanh,
+    "asin": np.arcsin,
+    "acos": np.arccos,
+    "atan": np.arctan,
+    "arcsin": np.arcsin,
+    "arccos": np.arccos,
+    "arctan": np.arctan,
+    "asinh": np.arcsinh,
+    "acosh": np.arccosh,
+    "atanh": np.arctanh,
+    "exp": np.exp,
+    "log": np.log,
+    "ln": np.log,
+    "sqrt": np.sqrt,
+    "abs": lambda w: np.abs(w).astype(complex),
+    "arg": lambda w: np.angle(w).astype(complex),
+    "re": lambda w: np.real(w).astype(complex),
+    "real": lambda w: np.real(w).astype(complex),
+    "im": lambda w: np.imag(w).astype(complex),
+    "imag": lambda w: np.imag(w).astype(complex),
+    "conj": np.conj,
+    "sec": lambda w: 1 / np.cos(w),
+    "csc": lambda w: 1 / np.sin(w),
+    "cot": lambda w: 1 / np.tan(w),
+}
+
+CONSTANTS = {
+    "i": 1j,
+    "e": np.e,
+    "pi": np.pi,
+    "tau": 2 * np.pi,
+}
+
+BINARY_OPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.divide,
+    ast.Pow: np.power,
+}
+
+UNARY_OPS = {
+    ast.UAdd: np.positive,
+    ast.USub: np.negative,
+}
+
+
+class UnsupportedExpression(ValueError):
+    pass
+
+
+# 数字字面量（含小数、科学计数法和虚数后缀）整体作为一个记号，隐式乘法只在完整记号之间插入
+TOKEN_RE = re.compile(
+    r"(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?[jJ]?)"
+    r"|(?P<name>[A-Za-z_]\w*)"
+    r"|(?P<space>\s+)"
+    r"|(?P<other>.)",
+    re.S,
+)
+
+
+def _split_name(name: str) -> str:
+    """iz、piz 这类连写的常量和自变量拆成乘积，拆不开的原样保留"""
+    if name == "z" or name in CONSTANTS or name in FUNCTIONS:
+        return name
+    parts = []
+    rest = name
+    while rest:
+        for token in sorted(["z", *CONSTANTS], key=len, reverse=True):
+            if rest.startswith(token):
+                parts.append(token)
+                rest = rest[len(token):]
+                break
+        else:
+            return name
+    return "*".join(parts)
+
+
+def preprocess(expression: str) -> str:
+    """
+    ^ 转 **，并在数字、右括号和后面的变量、函数、左括号之间补上乘号
+
+    >>> preprocess("2(z+1)(z-1)")
+    '2*(z+1)*(z-1)'
+    >>> preprocess("1.5e-2z")
+    '1.5e-2*z'
+    >>> preprocess("1e3*z + 2j*z")
+    '1e3*z + 2j*z'
+    >>> preprocess("2 piz^2")
+    '2 *pi*z**2'
+    """
+    text = expression.strip().replace("^", "**").replace("·", "*").replace("×", "*")
+    parts = []
+    previous = None
+    for match in TOKEN_RE.finditer(text):
+        kind, token = match.lastgroup, match.group(0)
+        if kind == "space":
+            parts.append(token)
+            continue
+        # 2z、2(z+1)、(z+1)(z-1)、)z 这类隐式乘法
+        starts_operand = kind == "name" or token == "("
+        if starts_operand and (previous == "number" or previous == ")"):
+            parts.append("*")
+        if kind == "name":
+            token = _split_name(token)
+        parts.append(token)
+        previous = kind if kind != "other" else token
+    return "".join(parts)
+
+
+def parse_expression(expression: str) -> ast.Expression:
+    """解析并校验表达式，只允许白名单内的节点"""
+    if not expression or len(expression) > MAX_EXPRESSION_LENGTH:
+        raise UnsupportedExpression("表达式为空或过长")
+    try:
+        tree = ast.parse(preprocess(expression), mode="eval")
+    except SyntaxError as e:
+        raise UnsupportedExpression(f"无法解析表达式: {e.msg}") from e
+
+    nodes = list(ast.walk(tree))
+    if len(nodes) > MAX_NODES:
+        raise UnsupportedExpression("表达式过于复杂")
+    for node in nodes:
+        if isinstance(node, (ast.Expression, ast.Load)) or type(node) in BINARY_OPS or type(node) in UNARY_OPS:
+            continue
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            op = node.op
+            if type(op) not in BINARY_OPS and type(op) not in UNARY_OPS:
+                raise UnsupportedExpression(f"不支持的运算: {type(op).__name__}")
+        elif isinstance(node, ast.Constant):
+            if isinstance(node.value, bool) or not isinstance(node.value, (int, float, complex)):
+                raise UnsupportedExpression(f"不支持的常量: {node.value!r}")
+        elif isinstance(node, ast.Name):
+            if node.id != "z" and node.id not in CONSTANTS and node.id not in FUNCTIONS:
+                raise UnsupportedExpression(f"未知的名称: {node.id}")
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise UnsupportedExpression("不支持的函数调用")
+            if node.keywords or len(node.args) != 1:
+                raise UnsupportedExpression(f"{node.func.id} 只接受一个参数")
+        else:
+            raise UnsupportedExpression(f"不支持的语法: {type(node).__name__}")
+    return tree
+
+
+def _evaluate(node: ast.AST, z: np.ndarray) -> np.ndarray:
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, z)
+    if isinstance(node, ast.BinOp):
+        return BINARY_OPS[type(node.op)](_evaluate(node.left, z), _evaluate(node.right, z))
+    if isinstance(node, ast.UnaryOp):
+        return UNARY_OPS[type(node.op)](_evaluate(node.operand, z))
+    if isinstance(node, ast.Constant):
+        # 常量统一转成 complex128，避免 Python 大整数运算
+        return np.complex128(node.value)
+    if isinstance(node, ast.Name):
+        if node.id == "z":
+            return z
+        if node.id in CONSTANTS:
+            return np.complex128(CONSTANTS[node.id])
+        raise UnsupportedExpression(f"{node.id} 是函数，不能单独使用")
+    if isinstance(node, ast.Call):
+        return FUNCTIONS[node.func.id](_evaluate(node.args[0], z))
+    raise UnsupportedExpression(f"不支持的语法: {type(node).__name__}")
+
+
+def evaluate_grid(expression: str, center: complex, radius: float, resolution: int) -> np.ndarray:
+    """在以 center 为中心、半宽 radius 的正方形网格上求值"""
+    tree = parse_expression(expression)
+    axis = np.linspace(-radius, radius, resolution)
+    z = (center.real + axis)[None, :] + 1j * (center.imag - axis)[:, None]
+    with np.errstate(all="ignore"):
+        w = _evaluate(tree, z)
+    return np.broadcast_to(np.asarray(w, dtype=complex), z.shape)
+
+
+def domain_coloring(w: np.ndarray) -> np.ndarray:
+    """复数数组 -> (H, W, 3) 的 uint8 RGB 图像"""
+    saturation = 0.9
+    with np.errstate(all="ignore"):
+        hue = (np.angle(w) / (2 * np.pi)) % 1.0
+        log_modulus = np.log2(np.abs(w))
+        # 模长每翻一倍亮度从暗到亮循环一次，形成等高线
+        contour = log_modulus - np.floor(log_modulus)
+        value = 0.7 + 0.3 * contour
+
+        h6 = np.nan_to_num(hue) * 6
+        sector = np.floor(h6).astype(np.int64) % 6
+        f = h6 - np.floor(h6)
+        p = value * (1 - saturation)
+        q = value * (1 - saturation * f)
+        t = value * (1 - saturation * (1 - f))
+    r = np.choose(sector, [value, q, p, p, t, value])
+    g = np.choose(sector, [t, value, value, q, p, p])
+    b = np.choose(sector, [p, p, t, value, value, q])
+    rgb = np.stack([r, g, b], axis=-1)
+
+    # 极点/溢出画白色，无定义处画灰色
+    rgb[np.isinf(w)] = 1.0
+    rgb[np.isnan(w)] = 0.5
+    return (np.clip(rgb, 0, 1) * 255).astype(np.uint8)
+
+
+def render_png(expression: str, center: complex = 0j, radius: float = 2.0, resolution: int = 800) -> bytes:
+    w = evaluate_grid(expression, center, radius, resolution)
+    image = Image.fromarray(domain_coloring(w), "RGB")
+    with BytesIO() as output:
+        image.save(output, format="PNG")
+        return output.getvalue()
@@ -0,0 +1,36 @@
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+# 图生视频对参考图的要求：短边至少 300px，宽高比在 0.4~2.5 之间
+MIN_SIDE = 300
+MIN_RATIO = 0.4
+MAX_RATIO = 2.5
+# 长边超过这个值时缩小后再上传，减少请求体大小
+MAX_SIDE = 2048
+
+
+class ImageRequirementError(ValueError):
+    pass
+
+
+def prepare_image(data: bytes, max_side: int = MAX_SIDE) -> str:
+    """检查尺寸、按需缩小并转成 JPEG 的 base64 data URL（在线程池里调用）"""
+    with Image.open(BytesIO(data)) as img:
+        width, height = img.size
+        if width < MIN_SIDE or height < MIN_SIDE:
+            raise ImageRequirementError(
+                f"图片尺寸不符合要求 (需要至少{MIN_SIDE}px×{MIN_SIDE}px)，当前图片尺寸: {width}×{height}px"
+            )
+        ratio = width / height
+        if not MIN_RATIO <= ratio <= MAX_RATIO:
+            raise ImageRequirementError(f"图片宽高比不符合要求 (需要在{MIN_RATIO}~{MAX_RATIO}之间)，当前为{ratio:.2f}")
+
+        img.draft("RGB", (max_side, max_side))
+        img = img.convert("RGB")
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=90)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
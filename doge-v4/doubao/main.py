@@ -5,13 +5,10 @@ from astrbot.api.message_components import Image as MsgImage, Plain, Video, Repl
 import aiohttp
 import base64
 import asyncio
-import json
-from PIL import Image
-from io import BytesIO
 import os
-import re
 from volcenginesdkarkruntime import Ark
-import requests
+from .images import ImageRequirementError, prepare_image
+from .tasks import VideoTaskScheduler
 
 
 @register("doubao", "runnel", "豆包AI插件", "1.2.0")
@@ -39,6 +36,24 @@ class DoubaoAIPlugin(Star):
             "duration": 5
         }
 
+        self.session = None
+        # 所有视频任务由一个后台调度器统一轮询
+        self.video_tasks = VideoTaskScheduler(self.client)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """所有请求共用一个带连接池的session"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=32, limit_per_host=8, ttl_dns_cache=300)
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=aiohttp.ClientTimeout(total=30)
+            )
+        return self.session
+
+    async def _fetch_image(self, image_url):
+        async with self._get_session().get(image_url) as response:
+            response.raise_for_status()
+            return await response.read()
+
     @filter.command_group("doubao")
     def db(self):
         pass
@@ -56,27 +71,22 @@ class DoubaoAIPlugin(Star):
                 yield event.plain_result("请提供文本描述和图片")
                 return
 
-            # 检查图片尺寸是否符合要求
-            valid_images = []
-            for img_url in image_urls:
-                try:
-                    # 获取图片并检查尺寸
-                    response = requests.get(img_url, timeout=10)
-                    img = Image.open(BytesIO(response.content))
-                    width, height = img.size
-
-                    if width < 300 or height < 300:
-                        yield event.plain_result(f"图片尺寸不符合要求 (需要至少300px×300px)，当前图片尺寸: {width}×{height}px")
-                        return
-                    valid_images.append(img_url)
-                except Exception as e:
-                    yield event.plain_result(f"无法获取或处理图片: {str(e)}")
-                    return
-
-            video_url = await self._call_i2v_api(text, valid_images)
+            # 并发下载图片，检查尺寸、缩放和编码放到线程池里
+            image_urls = image_urls[:2]
+            try:
+                contents = await asyncio.gather(*(self._fetch_image(url) for url in image_urls))
+                valid_images = await asyncio.gather(
+                    *(asyncio.to_thread(prepare_image, data) for data in contents)
+                )
+            except ImageRequirementError as e:
+                yield event.plain_result(str(e))
+                return
+            except Exception as e:
+                yield event.plain_result(f"无法获取或处理图片: {str(e)}")
+                return
 
             await event.send(event.plain_result("开始生成视频，请稍候..."))
-            video_url = await self._call_i2v_api(text, image_urls)
+            video_url = await self._call_i2v_api(text, valid_images)
 
             # 尝试直接发送视频文件
             try:
@@ -283,29 +293,14 @@ class DoubaoAIPlugin(Star):
             })
         
         try:
-            create_result = self.client.content_generation.tasks.create(
+            create_result = await asyncio.to_thread(
+                self.client.content_generation.tasks.create,
                 model=model,
                 content=content
             )
             
-            # 轮询查询结果
-            task_id = create_result.id
-            max_retries = 30  # 最多轮询30次（约5分钟）
-            retry_count = 0
-            
-            while retry_count < max_retries:
-                retry_count += 1
-                get_result = self.client.content_generation.tasks.get(task_id=task_id)
-                
-                if get_result.status == "succeeded":
-                    return get_result.content.video_url
-                elif get_result.status == "failed":
-                    error_msg = get_result.error.message if hasattr(get_result.error, 'message') else str(get_result.error)
-                    raise Exception(f"视频生成失败: {error_msg}")
-                else:
-                    await asyncio.sleep(10)  # 每10秒轮询一次
-            
-            raise Exception("视频生成超时")
+            # 由调度器统一轮询，完成后返回视频链接
+            return await self.video_tasks.wait(create_result.id)
         except Exception as e:
             logger.error(f"i2v API调用失败: {str(e)}")
             raise
@@ -319,27 +314,20 @@ class DoubaoAIPlugin(Star):
             "text": text
         }]
         
-        create_result = self.client.content_generation.tasks.create(
+        create_result = await asyncio.to_thread(
+            self.client.content_generation.tasks.create,
             model=model,
             content=content
         )
         
-        # 轮询查询结果
-        task_id = create_result.id
-        while True:
-            get_result = self.client.content_generation.tasks.get(task_id=task_id)
-            if get_result.status == "succeeded":
-                return get_result.content.video_url
-            elif get_result.status == "failed":
-                raise Exception(f"视频生成失败: {get_result.error}")
-            else:
-                await asyncio.sleep(10)
+        return await self.video_tasks.wait(create_result.id)
 
     async def _call_i2i_api(self, text, image_url):
         """调用图生图API"""
         model = self.models["i2i"]
  
-        response = self.client.images.generate(
+        response = await asyncio.to_thread(
+            self.client.images.generate,
             model=model,
             prompt=text,
             image=image_url,
@@ -355,7 +343,8 @@ class DoubaoAIPlugin(Star):
         """调用文生图API"""
         model = self.models["t2i"]
 
-        response = self.client.images.generate(
+        response = await asyncio.to_thread(
+            self.client.images.generate,
             model=model,
             prompt=text
         )
@@ -365,39 +354,39 @@ class DoubaoAIPlugin(Star):
     async def _send_api_request(self, url, data):
         """发送API请求"""
         headers = {
-            "Authorization": f"Bearer {get_auth_token()}",
+            "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=data) as response:
-                if response.status != 200:
-                    error_text = await response.text()
-                    raise Exception(f"API错误: {error_text[:100]}")
-                result = await response.json()
-                
-                if "data" in result and "video_url" in result["data"]:
-                    return result["data"]["video_url"]
-                elif "data" in result and "image_url" in result["data"]:
-                    return result["data"]["image_url"]
-                else:
-                    raise Exception("API返回格式异常")
+        async with self._get_session().post(url, headers=headers, json=data) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"API错误: {error_text[:100]}")
+            result = await response.json()
+            
+            if "data" in result and "video_url" in result["data"]:
+                return result["data"]["video_url"]
+            elif "data" in result and "image_url" in result["data"]:
+                return result["data"]["image_url"]
+            else:
+                raise Exception("API返回格式异常")
 
     async def _download_image_as_base64(self, image_url):
         """下载图片并转换为base64编码"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        return base64.b64encode(image_data).decode('utf-8')
-                    else:
-                        logger.error(f"图片下载失败，状态码: {response.status}")
-                        return None
+            async with self._get_session().get(image_url) as response:
+                if response.status == 200:
+                    image_data = await response.read()
+                    return await asyncio.to_thread(lambda: base64.b64encode(image_data).decode('utf-8'))
+                else:
+                    logger.error(f"图片下载失败，状态码: {response.status}")
+                    return None
         except Exception as e:
             logger.error(f"图片处理失败: {str(e)}")
             return None
 
 
     async def terminate(self):
-        pass
+        await self.video_tasks.close()
+        if self.session and not self.session.closed:
+            await self.session.close()
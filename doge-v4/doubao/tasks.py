@@ -0,0 +1,125 @@
+"""
+视频生成任务的统一轮询
+
+所有等待中的任务登记到一个后台调度器里，由它统一查询状态：每轮只查询已经
+到期的任务，查询并发执行；任务状态没有变化时它的查询间隔逐步放大，
+完成或失败后通过 Future 通知等待的会话。
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+
+from astrbot.api import logger
+
+
+class VideoTaskError(Exception):
+    pass
+
+
+@dataclass
+class PendingTask:
+    task_id: str
+    future: asyncio.Future
+    deadline: float
+    interval: float
+    next_check: float
+    status: str = ""
+    checks: int = 0
+    created: float = field(default_factory=time.monotonic)
+
+
+class VideoTaskScheduler:
+    def __init__(
+        self,
+        client,
+        min_interval: float = 5,
+        max_interval: float = 30,
+        backoff: float = 1.5,
+        timeout: float = 600,
+    ):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self.pending: dict[str, PendingTask] = {}
+        self.wakeup = asyncio.Event()
+        self.worker: asyncio.Task | None = None
+
+    async def wait(self, task_id: str) -> str:
+        """登记任务并等待完成，返回视频链接"""
+        now = time.monotonic()
+        task = self.pending.get(task_id)
+        if task is None:
+            task = PendingTask(
+                task_id=task_id,
+                future=asyncio.get_running_loop().create_future(),
+                deadline=now + self.timeout,
+                interval=self.min_interval,
+                next_check=now + self.min_interval,
+            )
+            self.pending[task_id] = task
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._run())
+        self.wakeup.set()
+        return await asyncio.shield(task.future)
+
+    async def _run(self):
+        while self.pending:
+            self.wakeup.clear()
+            now = time.monotonic()
+            due = [t for t in self.pending.values() if t.next_check <= now]
+            if due:
+                await asyncio.gather(*(self._check(t) for t in due))
+                continue
+            delay = min(t.next_check for t in self.pending.values()) - now
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _check(self, task: PendingTask):
+        task.checks += 1
+        try:
+            result = await asyncio.to_thread(self.client.content_generation.tasks.get, task_id=task.task_id)
+        except Exception as e:
+            logger.warning(f"查询视频任务{task.task_id}失败: {e}")
+            result = None
+
+        if result is not None and result.status == "succeeded":
+            self._finish(task, result=result.content.video_url)
+            return
+        if result is not None and result.status == "failed":
+            error = getattr(result.error, "message", None) or str(result.error)
+            self._finish(task, error=VideoTaskError(f"视频生成失败: {error}"))
+            return
+
+        now = time.monotonic()
+        if now >= task.deadline:
+            self._finish(task, error=VideoTaskError("视频生成超时"))
+            return
+        status = result.status if result is not None else task.status
+        if status != task.status:
+            task.status = status
+            task.interval = self.min_interval
+        else:
+            task.interval = min(task.interval * self.backoff, self.max_interval)
+        task.next_check = min(now + task.interval, task.deadline)
+
+    def _finish(self, task: PendingTask, result: str | None = None, error: Exception | None = None):
+        self.pending.pop(task.task_id, None)
+        if task.future.done():
+            return
+        if error is not None:
+            task.future.set_exception(error)
+        else:
+            task.future.set_result(result)
+        logger.info(
+            f"视频任务{task.task_id}结束，共查询{task.checks}次，用时{time.monotonic() - task.created:.0f}秒"
+        )
+
+    async def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+        for task in list(self.pending.values()):
+            self._finish(task, error=VideoTaskError("插件已停止"))
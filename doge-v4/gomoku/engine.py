@@ -0,0 +1,337 @@
+"""
+五子棋 AI 引擎
+
+- 棋盘是长度 size*size 的一维数组，0 空 1 黑 2 白
+- 评估按行、列、两条对角线共四个方向的所有线计分，落子/撤子时只重算
+  经过该点的四条线（线型分值按内容缓存）
+- 搜索：先查必胜/必防点和连续冲四（VCF），再做带 Zobrist 置换表的
+  alpha-beta 迭代加深，候选点限制在已有棋子两格以内并按局部分值排序，
+  超出时间预算时返回上一轮完整搜索的结果
+"""
+import random
+import time
+from functools import lru_cache
+
+WIN_SCORE = 10_000_000
+# 一个五格窗口内只有一方的 n 颗棋子时的分值
+WINDOW_SCORES = (0, 1, 12, 150, 2000, WIN_SCORE)
+DIRECTIONS = ((1, 0), (0, 1), (1, 1), (1, -1))
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+@lru_cache(maxsize=200_000)
+def score_line(line: tuple) -> tuple:
+    """一条线上双方的棋型分值 (黑, 白)"""
+    black = white = 0
+    n = len(line)
+    for start in range(n - 4):
+        b = w = 0
+        for v in line[start:start + 5]:
+            if v == 1:
+                b += 1
+            elif v == 2:
+                w += 1
+        if b and not w:
+            black += WINDOW_SCORES[b]
+        elif w and not b:
+            white += WINDOW_SCORES[w]
+    return black, white
+
+
+class GomokuEngine:
+    def __init__(self, board: list, seed: int = 0):
+        self.size = len(board)
+        size = self.size
+        self.cells = [v for row in board for v in row]
+        self.stones = sum(1 for v in self.cells if v)
+
+        # 每个点所在的四条线编号，以及每条线依次经过的点
+        self.lines: list[list[int]] = []
+        self.cell_lines: list[list[int]] = [[] for _ in range(size * size)]
+        for dx, dy in DIRECTIONS:
+            for x0 in range(size):
+                for y0 in range(size):
+                    # 只从线的起点出发：起点的前一格在棋盘外
+                    px, py = x0 - dx, y0 - dy
+                    if 0 <= px < size and 0 <= py < size:
+                        continue
+                    line = []
+                    x, y = x0, y0
+                    while 0 <= x < size and 0 <= y < size:
+                        line.append(y * size + x)
+                        x += dx
+                        y += dy
+                    if len(line) >= 5:
+                        line_id = len(self.lines)
+                        self.lines.append(line)
+                        for idx in line:
+                            self.cell_lines[idx].append(line_id)
+
+        self.line_scores = [self._line_score(i) for i in range(len(self.lines))]
+        self.totals = [
+            sum(s[0] for s in self.line_scores),
+            sum(s[1] for s in self.line_scores),
+        ]
+
+        rng = random.Random(seed)
+        self.zobrist = [[0, rng.getrandbits(64), rng.getrandbits(64)] for _ in range(size * size)]
+        self.hash = 0
+        for idx, v in enumerate(self.cells):
+            if v:
+                self.hash ^= self.zobrist[idx][v]
+
+        self.tt: dict[int, tuple] = {}
+        self.deadline = 0.0
+        self.nodes = 0
+
+    # ---------- 落子与增量评估 ----------
+
+    def _line_score(self, line_id: int) -> tuple:
+        cells = self.cells
+        return score_line(tuple(cells[i] for i in self.lines[line_id]))
+
+    def _update_lines(self, idx: int):
+        for line_id in self.cell_lines[idx]:
+            old = self.line_scores[line_id]
+            new = self._line_score(line_id)
+            self.line_scores[line_id] = new
+            self.totals[0] += new[0] - old[0]
+            self.totals[1] += new[1] - old[1]
+
+    def place(self, idx: int, color: int):
+        self.cells[idx] = color
+        self.hash ^= self.zobrist[idx][color]
+        self.stones += 1
+        self._update_lines(idx)
+
+    def remove(self, idx: int):
+        color = self.cells[idx]
+        self.cells[idx] = 0
+        self.hash ^= self.zobrist[idx][color]
+        self.stones -= 1
+        self._update_lines(idx)
+
+    def evaluate(self, color: int) -> int:
+        """从 color 一方看的局面分值"""
+        own, opp = self.totals[color - 1], self.totals[2 - color]
+        return own - opp
+
+    def is_five(self, idx: int) -> bool:
+        """idx 处的棋子是否连成五子"""
+        size = self.size
+        color = self.cells[idx]
+        x, y = idx % size, idx // size
+        for dx, dy in DIRECTIONS:
+            count = 1
+            for d in (1, -1):
+                nx, ny = x + dx * d, y + dy * d
+                while 0 <= nx < size and 0 <= ny < size and self.cells[ny * size + nx] == color:
+                    count += 1
+                    nx += dx * d
+                    ny += dy * d
+            if count >= 5:
+                return True
+        return False
+
+    # ---------- 候选点 ----------
+
+    def candidates(self) -> list:
+        """已有棋子周围两格内的空点"""
+        size = self.size
+        cells = self.cells
+        if not self.stones:
+            return [(size // 2) * size + size // 2]
+        seen = set()
+        for idx, v in enumerate(cells):
+            if not v:
+                continue
+            x, y = idx % size, idx // size
+            for ny in range(max(0, y - 2), min(size, y + 3)):
+                row = ny * size
+                for nx in range(max(0, x - 2), min(size, x + 3)):
+                    if not cells[row + nx]:
+                        seen.add(row + nx)
+        return list(seen)
+
+    def _gain(self, idx: int, color: int) -> int:
+        """在 idx 落 color 子后 color 一方分值的增量"""
+        before = self.totals[color - 1]
+        self.cells[idx] = color
+        after = before
+        for line_id in self.cell_lines[idx]:
+            after += self._line_score(line_id)[color - 1] - self.line_scores[line_id][color - 1]
+        self.cells[idx] = 0
+        return after - before
+
+    def ordered_moves(self, color: int, limit: int) -> list:
+        """按进攻收益 + 防守收益排序的候选点"""
+        opp = 3 - color
+        scored = []
+        for idx in self.candidates():
+            attack = self._gain(idx, color)
+            defend = self._gain(idx, opp)
+            scored.append((attack + defend * 0.9, attack, defend, idx))
+        scored.sort(reverse=True)
+        # 有必胜点或必防点时只考虑这些点
+        if scored and scored[0][1] >= WIN_SCORE // 2:
+            return [scored[0][3]]
+        forced = [s[3] for s in scored if s[2] >= WIN_SCORE // 2]
+        if forced:
+            return forced
+        return [s[3] for s in scored[:limit]]
+
+    # ---------- 连续冲四（VCF） ----------
+
+    def _four_moves(self, color: int) -> list:
+        """落下后形成冲四（再下一手即成五）的点"""
+        moves = []
+        for idx in self.candidates():
+            gain = self._gain(idx, color)
+            if gain >= WINDOW_SCORES[4] - WINDOW_SCORES[3]:
+                moves.append((gain, idx))
+        moves.sort(reverse=True)
+        return [idx for _, idx in moves]
+
+    def _winning_point(self, color: int):
+        for idx in self.candidates():
+            self.cells[idx] = color
+            five = self.is_five(idx)
+            self.cells[idx] = 0
+            if five:
+                return idx
+        return None
+
+    def vcf(self, color: int, depth: int = 8):
+        """连续冲四取胜的第一手，找不到返回 None"""
+        if time.monotonic() > self.deadline:
+            raise SearchTimeout
+        win = self._winning_point(color)
+        if win is not None:
+            return win
+        if depth <= 0:
+            return None
+        opp = 3 - color
+        for idx in self._four_moves(color)[:10]:
+            self.place(idx, color)
+            try:
+                block = self._winning_point(color)
+                if block is None:
+                    continue
+                # 对手若自己能成五，冲四无效
+                if self._winning_point(opp) is not None:
+                    continue
+                self.place(block, opp)
+                try:
+                    if self.vcf(color, depth - 1) is not None:
+                        return idx
+                finally:
+                    self.remove(block)
+            finally:
+                self.remove(idx)
+        return None
+
+    # ---------- alpha-beta ----------
+
+    def negamax(self, depth: int, alpha: int, beta: int, color: int, width: int) -> int:
+        self.nodes += 1
+        if self.nodes & 255 == 0 and time.monotonic() > self.deadline:
+            raise SearchTimeout
+
+        key = self.hash ^ color
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry:
+            e_depth, e_score, e_flag, tt_move = entry
+            if e_depth >= depth:
+                if e_flag == 0:
+                    return e_score
+                if e_flag < 0 and e_score <= alpha:
+                    return e_score
+                if e_flag > 0 and e_score >= beta:
+                    return e_score
+
+        if depth == 0:
+            return self.evaluate(color)
+
+        moves = self.ordered_moves(color, width)
+        if not moves:
+            return 0
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        alpha_orig = alpha
+        best, best_move = -WIN_SCORE * 2, moves[0]
+        for idx in moves:
+            self.place(idx, color)
+            try:
+                if self.is_five(idx):
+                    score = WIN_SCORE + depth  # 越早取胜越好
+                else:
+                    score = -self.negamax(depth - 1, -beta, -alpha, 3 - color, width)
+            finally:
+                self.remove(idx)
+            if score > best:
+                best, best_move = score, idx
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        flag = 0
+        if best <= alpha_orig:
+            flag = -1
+        elif best >= beta:
+            flag = 1
+        self.tt[key] = (depth, best, flag, best_move)
+        return best
+
+    def search(self, color: int, time_budget: float = 3.0, max_depth: int = 10, width: int = 12) -> tuple:
+        """返回 (x, y)，迭代加深直到时间预算用完"""
+        self.deadline = time.monotonic() + time_budget
+        moves = self.ordered_moves(color, width)
+        best_move = moves[0]
+        if len(moves) == 1:
+            return self._xy(best_move)
+
+        try:
+            win = self.vcf(color)
+            if win is not None:
+                return self._xy(win)
+            for depth in range(2, max_depth + 1, 2):
+                score, move = self._root(moves, depth, color, width)
+                best_move = move
+                # 把本轮最佳着法排到最前，下一轮先搜
+                moves.remove(move)
+                moves.insert(0, move)
+                if abs(score) >= WIN_SCORE:
+                    break
+        except SearchTimeout:
+            pass
+        return self._xy(best_move)
+
+    def _root(self, moves: list, depth: int, color: int, width: int) -> tuple:
+        alpha, beta = -WIN_SCORE * 2, WIN_SCORE * 2
+        best_move = moves[0]
+        for idx in moves:
+            self.place(idx, color)
+            try:
+                if self.is_five(idx):
+                    score = WIN_SCORE + depth
+                else:
+                    score = -self.negamax(depth - 1, -beta, -alpha, 3 - color, width)
+            finally:
+                self.remove(idx)
+            if score > alpha:
+                alpha, best_move = score, idx
+        return alpha, best_move
+
+    def _xy(self, idx: int) -> tuple:
+        return idx % self.size, idx // self.size
+
+
+def find_best_move(board: list, color: int, time_budget: float = 3.0) -> tuple:
+    """同步入口，供线程池调用；board 为二维列表，返回 (x, y)"""
+    return GomokuEngine(board).search(color, time_budget)
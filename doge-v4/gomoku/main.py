@@ -1,12 +1,18 @@
 import os
+import io
 import json
+import asyncio
 import re
 import random
-import copy
 from PIL import Image, ImageDraw, ImageFont
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
+import astrbot.api.message_components as Comp
+
+from .engine import find_best_move
+
+AI_PLAYER_ID = "gomoku_ai"  # 人机对局中电脑一方的玩家ID
 
 @register("gomoku", "zhx,runnel", "五子棋插件", "1.1.0")
 class GomokuPlugin(Star):
@@ -17,9 +23,18 @@ class GomokuPlugin(Star):
         self.pvp_sessions = {}  # 维护 PVP 模式游戏
         self.current_player = {}  # 记录当前 PVP 游戏的当前玩家
         self.player_names = {}  # 全局存储玩家名字
-        self.board_history = {}  # 记录棋盘历史，用于悔棋
-        self.last_move_history = {}  # 记录最后一步的位置历史
+        self.move_history = {}  # 记录落子序列 [(x, y), ...]，用于悔棋
+        self.board_images = {}  # 每局已绘制的棋盘图 (图片, 已绘制的棋子)
         self.undo_requests = {}  # 记录悔棋请求
+        self.ai_time_budget = 3.0  # 电脑每步思考时间（秒）
+        self.player_names[AI_PLAYER_ID] = "电脑"
+
+        # 绘图参数与缓存：字体、空棋盘和棋子贴图只生成一次
+        self.cell_size = 40
+        self.margin = 35  # 稍微增加边缘留白，为更大的数字留出空间
+        self._font = None
+        self._empty_board = None
+        self._stone_sprites = {}
 
     def get_session_id(self, event: AstrMessageEvent):
         """获取唯一的游戏标识"""
@@ -52,31 +67,19 @@ class GomokuPlugin(Star):
         """创建空棋盘"""
         return [[0] * self.board_size for _ in range(self.board_size)]
 
-    def save_board_state(self, session_id, board, last_move=None):
-        """保存当前棋盘状态到历史记录"""
-        if session_id not in self.board_history:
-            self.board_history[session_id] = []
-            self.last_move_history[session_id] = []
-        
-        # 深拷贝棋盘状态，确保历史记录不会被当前操作影响
-        self.board_history[session_id].append(copy.deepcopy(board))
-        self.last_move_history[session_id].append(copy.deepcopy(last_move))
+    def record_move(self, session_id, move):
+        """记录一步落子，悔棋时按序列回退"""
+        self.move_history.setdefault(session_id, []).append(move)
 
     def can_undo(self, session_id):
         """检查是否可以悔棋"""
-        return (session_id in self.board_history and 
-                len(self.board_history[session_id]) >= 2)  # 至少需要两步才能悔棋
+        return len(self.move_history.get(session_id, [])) >= 1
 
-    def draw_board(self, board, last_move=None, session_id=None):
-        """绘制棋盘图片并返回路径"""
-        cell_size = 40
-        margin = 35  # 稍微增加边缘留白，为更大的数字留出空间
-        img_size = self.board_size * cell_size + 2 * margin
-        img = Image.new("RGB", (img_size, img_size), "#F0D9B5")
-        draw = ImageDraw.Draw(img)
-        
+    def load_font(self):
+        """按顺序尝试常见 Linux 字体，结果缓存"""
+        if self._font is not None:
+            return self._font
         font_size = 24  # 定义字体大小
-        # 尝试按顺序加载各种Linux常见字体
         font_paths = [
             "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
             "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
@@ -85,20 +88,27 @@ class GomokuPlugin(Star):
             "/usr/share/fonts/truetype/ubuntu/Ubuntu-R.ttf",
             "/usr/share/fonts/noto/NotoSans-Regular.ttf"
         ]
-        
-        font = None
         for path in font_paths:
             try:
-                font = ImageFont.truetype(path, font_size)
+                self._font = ImageFont.truetype(path, font_size)
                 logger.info(f"成功加载字体: {path}")
-                break
-            except:
+                return self._font
+            except OSError:
                 continue
-                
-        if font is None:
-            # 如果找不到TrueType字体，使用默认字体
-            font = ImageFont.load_default()
-            logger.info("无法加载任何TrueType字体，使用默认字体")
+        # 如果找不到TrueType字体，使用默认字体
+        self._font = ImageFont.load_default()
+        logger.info("无法加载任何TrueType字体，使用默认字体")
+        return self._font
+
+    def get_empty_board(self):
+        """网格和坐标数字只绘制一次"""
+        if self._empty_board is not None:
+            return self._empty_board
+        cell_size, margin = self.cell_size, self.margin
+        img_size = self.board_size * cell_size + 2 * margin
+        img = Image.new("RGB", (img_size, img_size), "#F0D9B5")
+        draw = ImageDraw.Draw(img)
+        font = self.load_font()
 
         # 画网格
         for i in range(self.board_size):
@@ -108,7 +118,7 @@ class GomokuPlugin(Star):
             # 竖线
             draw.line([(margin + cell_size // 2, margin + i * cell_size + cell_size // 2),
                       (img_size - margin - cell_size // 2, margin + i * cell_size + cell_size // 2)], fill="black")
-            
+
             # 添加坐标数字
             text = str(i)
             # 获取文本大小以便居中显示
@@ -116,40 +126,78 @@ class GomokuPlugin(Star):
                 text_bbox = font.getbbox(text)
                 text_width = text_bbox[2] - text_bbox[0]
                 text_height = text_bbox[3] - text_bbox[1]
-            except:
+            except AttributeError:
                 # 默认字体可能不支持getbbox，使用估算值
                 text_width = len(text) * 6
                 text_height = 8
-            
+
             # 上边和下边的数字
             x = margin + i * cell_size + cell_size // 2 - text_width // 2
             draw.text((x, 2), text, fill="black", font=font)
             draw.text((x, img_size - margin + 2), text, fill="black", font=font)
-            
+
             # 左边和右边的数字
             y = margin + i * cell_size + cell_size // 2 - text_height // 2
             draw.text((2, y), text, fill="black", font=font)
             draw.text((img_size - margin + 2, y), text, fill="black", font=font)
 
-        # 画棋子
+        self._empty_board = img
+        return img
+
+    def get_stone_sprite(self, color):
+        """黑白棋子贴图（带透明通道），尺寸为一个格子"""
+        if color not in self._stone_sprites:
+            cell_size = self.cell_size
+            sprite = Image.new("RGBA", (cell_size, cell_size), (0, 0, 0, 0))
+            ImageDraw.Draw(sprite).ellipse(
+                [(5, 5), (cell_size - 5, cell_size - 5)],
+                fill="black" if color == 1 else "white", outline="black")
+            self._stone_sprites[color] = sprite
+        return self._stone_sprites[color]
+
+    def draw_board(self, board, last_move=None, session_id=None):
+        """绘制棋盘图片并返回 PNG 字节
+
+        每局缓存一张已绘制棋子的图，只对与上次绘制不同的格子贴棋子或
+        用空棋盘对应区域覆盖，然后在副本上标出最后一步。
+        """
+        cell_size, margin = self.cell_size, self.margin
+        empty = self.get_empty_board()
+        img, drawn = self.board_images.get(session_id) or (empty.copy(), {})
+
         for y in range(self.board_size):
+            row = board[y]
             for x in range(self.board_size):
-                if board[y][x] != 0:
-                    color = "black" if board[y][x] == 1 else "white"
-                    draw.ellipse([(margin + x * cell_size + 5, margin + y * cell_size + 5),
-                                (margin + x * cell_size + cell_size - 5, margin + y * cell_size + cell_size - 5)],
-                                fill=color, outline="black")
+                color = row[x]
+                if drawn.get((x, y), 0) == color:
+                    continue
+                left, top = margin + x * cell_size, margin + y * cell_size
+                # 先恢复空格子，再贴上新棋子
+                img.paste(empty.crop((left, top, left + cell_size + 1, top + cell_size + 1)), (left, top))
+                if color:
+                    sprite = self.get_stone_sprite(color)
+                    img.paste(sprite, (left, top), sprite)
+                    drawn[(x, y)] = color
+                else:
+                    drawn.pop((x, y), None)
+        if session_id is not None:
+            self.board_images[session_id] = (img, drawn)
 
+        output = img.copy()
         # 高亮最后一步落子
         if last_move:
             x, y = last_move
-            draw.rectangle([(margin + x * cell_size, margin + y * cell_size),
-                          (margin + x * cell_size + cell_size, margin + y * cell_size + cell_size)],
-                          outline="red", width=3)
+            ImageDraw.Draw(output).rectangle(
+                [(margin + x * cell_size, margin + y * cell_size),
+                 (margin + x * cell_size + cell_size, margin + y * cell_size + cell_size)],
+                outline="red", width=3)
 
-        path = "gomoku_board.png"
-        img.save(path)
-        return path
+        buffer = io.BytesIO()
+        output.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def board_result(self, event: AstrMessageEvent, board, last_move=None, session_id=None):
+        return event.chain_result([Comp.Image.fromBytes(self.draw_board(board, last_move, session_id))])
 
     def check_win(self, board, x, y):
         """检查是否胜利"""
@@ -176,22 +224,14 @@ class GomokuPlugin(Star):
         return all(all(cell != 0 for cell in row) for row in board)
 
     def perform_undo(self, session_id):
-        """执行悔棋操作，回退一步"""
+        """执行悔棋操作，回退一步，返回 (是否成功, 回退后的最后一步)"""
         if not self.can_undo(session_id):
-            return False
-        
-        # 移除当前状态
-        self.board_history[session_id].pop()
-        self.last_move_history[session_id].pop()
-        
-        # 获取前一个状态
-        previous_board = self.board_history[session_id][-1]
-        previous_move = self.last_move_history[session_id][-1]
-        
-        # 更新当前游戏状态
-        self.games[session_id] = copy.deepcopy(previous_board)
-        
-        return True, previous_move
+            return False, None
+
+        moves = self.move_history[session_id]
+        x, y = moves.pop()
+        self.games[session_id][y][x] = 0
+        return True, (moves[-1] if moves else None)
 
     @filter.command("gomoku pvp")
     async def start_pvp(self, event: AstrMessageEvent):
@@ -204,13 +244,71 @@ class GomokuPlugin(Star):
         self.current_player[session_id] = None
         yield event.plain_result("PVP 模式开启，请输入 /gomoku join 加入游戏！输入 /gomoku end 可以结束当前游戏。")
 
+    def clear_session(self, session_id):
+        """清除一局游戏的全部数据"""
+        for store in (self.games, self.move_history, self.board_images,
+                      self.undo_requests, self.pvp_sessions, self.current_player):
+            store.pop(session_id, None)
+
+    @filter.command("gomoku ai")
+    async def start_ai(self, event: AstrMessageEvent):
+        """人机模式，玩家执黑先行，电脑执白"""
+        session_id = self.get_session_id(event)
+        if session_id in self.pvp_sessions:
+            yield event.plain_result("已经有一场对局在进行！")
+            return
+        player_id = self.get_player_id(event)
+        sender_name = event.get_sender_name()
+        if not sender_name or sender_name == "unknown":
+            sender_name = "玩家1"
+        self.save_player_name(player_id, sender_name)
+
+        self.pvp_sessions[session_id] = {"players": [player_id, AI_PLAYER_ID], "ai": True}
+        self.current_player[session_id] = player_id
+        board = self.create_board()
+        self.games[session_id] = board
+        self.move_history[session_id] = []
+        yield event.plain_result(f"人机对局开始！{sender_name}（黑子）先落子 /gomoku (x,y)  /gomoku undo 悔棋 /gomoku surrender 投降 /gomoku end 结束游戏。")
+
+    async def ai_move(self, event: AstrMessageEvent, session_id, board):
+        """电脑落子：搜索放到线程中执行，不阻塞其他群的对局"""
+        snapshot = [row[:] for row in board]
+        try:
+            x, y = await asyncio.to_thread(find_best_move, snapshot, 2, self.ai_time_budget)
+        except Exception as e:
+            logger.error(f"五子棋 AI 计算失败: {e}")
+            self.clear_session(session_id)
+            yield event.plain_result("电脑思考出错，对局已结束。")
+            return
+        # 思考期间对局可能已被结束或重开
+        if self.games.get(session_id) is not board:
+            return
+
+        human_id = self.pvp_sessions[session_id]["players"][0]
+        board[y][x] = 2
+        self.record_move(session_id, (x, y))
+        image = self.board_result(event, board, (x, y), session_id)
+        if self.check_win(board, x, y):
+            self.clear_session(session_id)
+            yield image
+            yield event.plain_result(f"电脑落子 ({x},{y})，电脑赢了！游戏结束。")
+            return
+        if self.is_board_full(board):
+            self.clear_session(session_id)
+            yield image
+            yield event.plain_result("⭕️ 棋盘已满，游戏结束，双方和局！")
+            return
+        self.current_player[session_id] = human_id
+        yield image
+        yield event.plain_result(f"电脑落子 ({x},{y})，轮到 {self.get_player_name(human_id)}（黑子）下棋！")
+
     @filter.command("gomoku")
     async def handle_gomoku(self, event: AstrMessageEvent, command: str = ""):
         """五子棋游戏指令"""
         session_id = self.get_session_id(event)
         player_id = self.get_player_id(event)
 
-        if command == "pvp":
+        if command in ("pvp", "ai"):
             return
         
         # 处理加入游戏命令
@@ -244,10 +342,10 @@ class GomokuPlugin(Star):
                 self.current_player[session_id] = players[0]
                 first_player_name = self.get_player_name(players[0])
                 
-                # 初始化一个空棋盘并保存到历史记录中
+                # 初始化一个空棋盘并清空落子记录
                 board = self.create_board()
                 self.games[session_id] = board
-                self.save_board_state(session_id, board)
+                self.move_history[session_id] = []
                 
                 yield event.plain_result(f"{player_name} 加入对局！游戏开始，{first_player_name}（黑子）先落子 /gomoku (x,y)  /gomoku undo 悔棋 /gomoku surrender 投降 /gomoku end 结束游戏。")
             return
@@ -265,18 +363,7 @@ class GomokuPlugin(Star):
                 return
             
             player_name = self.get_player_name(player_id)
-            # 安全删除游戏数据
-            if session_id in self.games:
-                del self.games[session_id]
-            if session_id in self.board_history:
-                del self.board_history[session_id]
-            if session_id in self.last_move_history:
-                del self.last_move_history[session_id]
-            if session_id in self.undo_requests:
-                del self.undo_requests[session_id]
-            del self.pvp_sessions[session_id]
-            if session_id in self.current_player:
-                del self.current_player[session_id]
+            self.clear_session(session_id)
             yield event.plain_result(f"游戏已被 {player_name} 结束！")
             return
 
@@ -298,18 +385,7 @@ class GomokuPlugin(Star):
             
             yield event.plain_result(f"🏳️ {player_name} 投降了！{winner_name} 获胜！")
             
-            # 安全删除游戏数据
-            if session_id in self.games:
-                del self.games[session_id]
-            if session_id in self.board_history:
-                del self.board_history[session_id]
-            if session_id in self.last_move_history:
-                del self.last_move_history[session_id]
-            if session_id in self.undo_requests:
-                del self.undo_requests[session_id]
-            del self.pvp_sessions[session_id]
-            if session_id in self.current_player:
-                del self.current_player[session_id]
+            self.clear_session(session_id)
             return
             
         # 处理悔棋请求命令
@@ -324,6 +400,17 @@ class GomokuPlugin(Star):
                 yield event.plain_result("你不是游戏玩家！")
                 return
                 
+            # 人机对局直接撤回电脑和自己各一步
+            if self.pvp_sessions[session_id].get("ai"):
+                if self.current_player[session_id] != player_id or len(self.move_history.get(session_id, [])) < 2:
+                    yield event.plain_result("当前无法悔棋！")
+                    return
+                self.perform_undo(session_id)
+                _, previous_move = self.perform_undo(session_id)
+                yield self.board_result(event, self.games[session_id], previous_move, session_id)
+                yield event.plain_result("已悔棋，撤回了电脑和你的上一步，请重新落子。")
+                return
+
             if player_id == self.current_player[session_id]:
                 yield event.plain_result("当前是你的回合，不能悔棋！")
                 return
@@ -378,7 +465,7 @@ class GomokuPlugin(Star):
             
             # 显示悔棋后的棋盘
             board = self.games[session_id]
-            yield event.image_result(self.draw_board(board, previous_move, session_id))
+            yield self.board_result(event, board, previous_move, session_id)
             yield event.plain_result(f"{accepter_name} 同意了 {requester_name} 的悔棋请求！轮到 {requester_name} 落子。")
             return
             
@@ -452,44 +539,22 @@ class GomokuPlugin(Star):
         
         # 玩家落子
         board[y][x] = player_color
-        # 保存当前棋盘状态到历史记录
-        self.save_board_state(session_id, board, (x, y))
+        # 记录落子，用于悔棋
+        self.record_move(session_id, (x, y))
         
         if self.check_win(board, x, y):
-            # 安全删除游戏数据
-            if session_id in self.games:
-                del self.games[session_id]
-            if session_id in self.board_history:
-                del self.board_history[session_id]
-            if session_id in self.last_move_history:
-                del self.last_move_history[session_id]
-            if session_id in self.undo_requests:
-                del self.undo_requests[session_id]
-            if session_id in self.pvp_sessions:
-                winner_name = self.get_player_name(player_id)
-                del self.pvp_sessions[session_id]
-                if session_id in self.current_player:
-                    del self.current_player[session_id]
-                yield event.image_result(self.draw_board(board, (x, y), session_id))
-                yield event.plain_result(f"🎉 {winner_name} 赢了！游戏结束。")
+            winner_name = self.get_player_name(player_id)
+            result = self.board_result(event, board, (x, y), session_id)
+            self.clear_session(session_id)
+            yield result
+            yield event.plain_result(f"🎉 {winner_name} 赢了！游戏结束。")
             return
         
         # 检查是否和局
         if self.is_board_full(board):
-            # 安全删除游戏数据
-            if session_id in self.games:
-                del self.games[session_id]
-            if session_id in self.board_history:
-                del self.board_history[session_id]
-            if session_id in self.last_move_history:
-                del self.last_move_history[session_id]
-            if session_id in self.undo_requests:
-                del self.undo_requests[session_id]
-            if session_id in self.pvp_sessions:
-                del self.pvp_sessions[session_id]
-                if session_id in self.current_player:
-                    del self.current_player[session_id]
-            yield event.image_result(self.draw_board(board, (x, y), session_id))
+            result = self.board_result(event, board, (x, y), session_id)
+            self.clear_session(session_id)
+            yield result
             yield event.plain_result("⭕️ 棋盘已满，游戏结束，双方和局！")
             return
         
@@ -497,7 +562,11 @@ class GomokuPlugin(Star):
         next_player_index = 1 - player_index
         next_player_id = players[next_player_index]
         self.current_player[session_id] = next_player_id
+        if next_player_id == AI_PLAYER_ID:
+            async for result in self.ai_move(event, session_id, board):
+                yield result
+            return
         next_player_name = self.get_player_name(next_player_id)
-        yield event.image_result(self.draw_board(board, (x, y), session_id))
+        yield self.board_result(event, board, (x, y), session_id)
         yield event.plain_result(f"轮到 {next_player_name}（{'黑子' if next_player_index == 0 else '白子'}）下棋！")
 
@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import itertools
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import httpx
+from astrbot.api import logger
+
+BASE_URL = "https://openapi.liblibai.cloud"
+STATUS_PATH = "/api/generate/webui/status"
+
+# generateStatus：1 等待执行 2 执行中 3 已生图 4 审核中 5 成功 6 失败 7 超时
+FAILED_STATUS = {6, 7}
+
+
+class LiblibClient:
+    """共用的 httpx 连接池，每个请求单独生成时间戳、随机数和签名"""
+
+    def __init__(self, access_key: str, secret_key: str, base_url: str = BASE_URL, timeout: float = 30):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        self.http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        )
+
+    def signed_url(self, path: str) -> str:
+        timestamp = int(time.time() * 1000)
+        nonce = uuid.uuid4().hex
+        content = f"{path}&{timestamp}&{nonce}"
+        digest = hmac.new(self.secret_key.encode(), content.encode(), hashlib.sha1).digest()
+        signature = base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+        return (
+            f"{self.base_url}{path}?AccessKey={self.access_key}&Signature={signature}"
+            f"&Timestamp={timestamp}&SignatureNonce={nonce}"
+        )
+
+    async def post_api(self, path: str, data: dict) -> dict:
+        response = await self.http.post(self.signed_url(path), headers=self.headers, json=data)
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self.http.aclose()
+
+
+@dataclass
+class Job:
+    id: int
+    user_id: str
+    prompt: str
+    status: str = "排队中"
+    generate_uuid: str = ""
+    percent: float = 0.0
+    created: float = field(default_factory=time.monotonic)
+    started: float = 0.0
+    finished: float = 0.0
+    error: str = ""
+
+    def describe(self) -> str:
+        now = time.monotonic()
+        if self.started:
+            elapsed = (self.finished or now) - self.started
+            progress = f"，进度{self.percent * 100:.0f}%，已用时{elapsed:.0f}秒"
+        else:
+            progress = f"，已等待{now - self.created:.0f}秒"
+        prompt = self.prompt if len(self.prompt) <= 20 else self.prompt[:20] + "…"
+        return f"#{self.id} {self.status}{progress}（{prompt}）"
+
+
+class JobManager:
+    """生图任务管理：全局/单用户并发上限、排队、异步轮询和超时取消
+
+    轮询间隔从 min_interval 开始，进度没有变化时逐步放大到 max_interval，
+    进度有变化时回到最小间隔。
+    """
+
+    def __init__(
+        self,
+        client: LiblibClient,
+        max_concurrency: int = 2,
+        per_user: int = 1,
+        max_queued_per_user: int = 3,
+        timeout: float = 240,
+        min_interval: float = 1.0,
+        max_interval: float = 8.0,
+    ):
+        self.client = client
+        self.global_slots = asyncio.Semaphore(max(1, max_concurrency))
+        self.per_user = max(1, per_user)
+        self.max_queued_per_user = max(1, max_queued_per_user)
+        self.user_slots: dict[str, asyncio.Semaphore] = {}
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jobs: dict[int, Job] = {}
+        self.ids = itertools.count(1)
+
+    def active_jobs(self, user_id: str | None = None) -> list[Job]:
+        return [j for j in self.jobs.values() if user_id is None or j.user_id == user_id]
+
+    def queue_position(self, job: Job) -> int:
+        return sum(1 for j in self.jobs.values() if j.status == "排队中" and j.id < job.id) + 1
+
+    async def run(self, path: str, data: dict, user_id: str = "", prompt: str = "") -> dict:
+        """提交任务并等待结果，返回和状态查询接口相同格式的数据"""
+        if len(self.active_jobs(user_id)) >= self.max_queued_per_user:
+            return {"code": 1, "msg": f"你已经有{self.max_queued_per_user}个任务在排队或生成中，请稍后再试"}
+
+        job = Job(id=next(self.ids), user_id=user_id, prompt=prompt)
+        self.jobs[job.id] = job
+        user_slot = self.user_slots.setdefault(user_id, asyncio.Semaphore(self.per_user))
+        try:
+            async with user_slot, self.global_slots:
+                job.status = "提交中"
+                job.started = time.monotonic()
+                try:
+                    return await asyncio.wait_for(self._execute(job, path, data), self.timeout)
+                except asyncio.TimeoutError:
+                    job.status = "已超时"
+                    logger.info(f"任务#{job.id}在{self.timeout}秒内没有完成，已取消轮询")
+                    return {"code": 1, "msg": "任务已经超时，文生图失败"}
+        except Exception as e:
+            job.status = "失败"
+            job.error = str(e)
+            raise
+        finally:
+            job.finished = time.monotonic()
+            self.jobs.pop(job.id, None)
+            if not user_slot.locked() and not any(j.user_id == user_id for j in self.jobs.values()):
+                self.user_slots.pop(user_id, None)
+
+    async def _execute(self, job: Job, path: str, data: dict) -> dict:
+        logger.info("正在发起请求,请求体为" + str(data))
+        progress = await self.client.post_api(path, data)
+        if progress.get("code") != 0:
+            job.status = "失败"
+            return {"code": progress.get("code", 1), "msg": progress.get("msg", "")}
+
+        job.generate_uuid = progress["data"]["generateUuid"]
+        job.status = "生成中"
+        interval = self.min_interval
+        last_percent = -1.0
+        while True:
+            await asyncio.sleep(interval)
+            progress = await self.client.post_api(STATUS_PATH, {"generateUuid": job.generate_uuid})
+            status_data = progress.get("data") or {}
+            job.percent = float(status_data.get("percentCompleted") or 0)
+            generate_status = status_data.get("generateStatus")
+            logger.info(
+                f"任务#{job.id}状态为：{generate_status}，进度为：{job.percent * 100:.0f}%，"
+                f"已经用时：{time.monotonic() - job.started:.1f}秒"
+            )
+            if any(image for image in status_data.get("images") or [] if image is not None):
+                job.status = "已完成"
+                logger.info("图片生成完成，返回原始数据：" + str(progress))
+                return progress
+            if generate_status in FAILED_STATUS:
+                job.status = "失败"
+                return {"code": 1, "msg": status_data.get("generateMsg") or "生图任务失败"}
+
+            if job.percent > last_percent:
+                interval = self.min_interval
+            else:
+                interval = min(interval * 1.5, self.max_interval)
+            last_percent = job.percent
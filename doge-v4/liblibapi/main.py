@@ -1,17 +1,13 @@
 from pathlib import Path
 import re
-import httpx
+import copy
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
 import astrbot.api.message_components as Comp
-import hmac
-import base64
-import time
 import json
-from datetime import datetime
-import hashlib
-import uuid
+from .jobs import JobManager, LiblibClient
+from .uploads import ImageUploader
 class text2imgConfig:
     def __init__(self,
     width=512,
@@ -30,7 +26,8 @@ class text2imgConfig:
     confyui_api=None,
     istranslate=True,
     translateType=None,
-    img_url=None
+    img_url=None,
+    user_id=""
     ):
         self.width = width
         self.height = height
@@ -49,6 +46,7 @@ class text2imgConfig:
         self.istranslate = istranslate
         self.translateType = translateType
         self.img_url = img_url
+        self.user_id = user_id
 
 @register("liblibApi", "machinad", "调用liblib进行文生图、图生图、可以自己换大模型,lora模型，支持contorlnet控制，支持自定义confyuiAPI", "1.1.4")
 class liblibApi(Star):
@@ -70,22 +68,18 @@ class liblibApi(Star):
         self.confyui_api = config.get("confyui_overwriting")#获取confyui api
         self.istranslate = config.get("prompt_Translation").get("is_Translation")#获取是否翻译
         self.translateType = config.get("prompt_Translation").get("Translation_Type")#获取翻译类型
-        self.time_stamp = int(datetime.now().timestamp() * 1000)#获取当前时间戳
-        self.signature_nonce = uuid.uuid1()#获取uuid
-        self.signature_img = self._hash_sk(self.sk, self.time_stamp, self.signature_nonce)#获取签名
-        self.singature_confyui = self._hash_confyui(self.sk, self.time_stamp, self.signature_nonce)#获取签名,confyui专用
-        self.signature_img_post = self._has_sk_imgPost(self.sk, self.time_stamp, self.signature_nonce)#获取图片上传签名
-        self.signature_ultra_img = self._hash_ultra_sk(self.sk, self.time_stamp, self.signature_nonce)#获取签名,暂时无用，请忽略
-        self.signature_status = self._hash_sk_status(self.sk, self.time_stamp, self.signature_nonce)#获取签名,用于获取状态
-        self.signature_getVersion = self._has_sk_getVersion(self.sk, self.time_stamp, self.signature_nonce)#获取签名,用于获取版本
         self.interval = interval
-        self.headers = {"Content-Type": "application/json"}
-        self.text2img_url = self.get_image_url(self.ak, self.signature_img, self.time_stamp,self.signature_nonce)#获取文生图url
-        self.confyui_url = self.get_confyui_url(self.ak, self.singature_confyui, self.time_stamp,self.signature_nonce)#confyui模式的url
-        self.text2img_ultra_url = self.get_ultra_image_url(self.ak, self.signature_ultra_img, self.time_stamp,self.signature_nonce)#无用的url
-        self.generate_url = self.get_generate_url(self.ak, self.signature_status, self.time_stamp,self.signature_nonce)#获取状态url
-        self.imgPost_url = self.get_imgPost_url(self.ak, self.signature_img_post, self.time_stamp,self.signature_nonce)#图片上传url
-        self.getVersion_url = self.get_getVersion_url(self.ak, self.signature_getVersion, self.time_stamp,self.signature_nonce)#获取版本url
+        # 所有请求共用一个连接池，签名在每次请求时生成
+        self.client = LiblibClient(self.ak, self.sk)
+        self.jobs = JobManager(
+            self.client,
+            max_concurrency=int(config.get("max_concurrent_jobs", 2)),
+            per_user=int(config.get("max_jobs_per_user", 1)),
+            timeout=float(config.get("job_timeout", 240)),
+            min_interval=1.0,
+            max_interval=float(max(interval, 1)),
+        )
+        self.uploader = ImageUploader(self.client, ttl=float(config.get("upload_cache_ttl", 3600)))
         self.path = Path("./data/plugins_data/liblib")
         self.img_config = text2imgConfig()
         self.img_config.width = self.width
@@ -104,64 +98,6 @@ class liblibApi(Star):
         self.img_config.istranslate = self.istranslate
         self.img_config.translateType = self.translateType
         super().__init__(context)
-    def hmac_sha1(self, key, code):#加密
-        hmac_code = hmac.new(key.encode(), code.encode(), hashlib.sha1)
-        return hmac_code.digest()
-    def _hash_sk(self, key, s_time, ro):
-        """加密sk"""
-        data = "/api/generate/webui/text2img" + "&" + str(s_time) + "&" + str(ro)
-        s = base64.urlsafe_b64encode(self.hmac_sha1(key, data)).rstrip(b'=').decode()  # noqa: Q000
-        return s
-    def _hash_confyui(self,key,s_time,ro):
-        """加密sk"""
-        data = "/api/generate/comfyui/app" + "&" + str(s_time) + "&" + str(ro)
-        s = base64.urlsafe_b64encode(self.hmac_sha1(key, data)).rstrip(b'=').decode()  # noqa: Q000
-        return s
-    def _hash_ultra_sk(self, key, s_time, ro):
-        """加密sk"""
-        data = "/api/generate/webui/text2img/ultra" + "&" + str(s_time) + "&" + str(ro)
-        s = base64.urlsafe_b64encode(self.hmac_sha1(key, data)).rstrip(b'=').decode()  # noqa: Q000
-        return s
-
-    def _hash_sk_status(self, key, s_time, ro):
-        """加密sk"""
-        data = "/api/generate/webui/status" + "&" + str(s_time) + "&" + str(ro)
-        s = base64.urlsafe_b64encode(self.hmac_sha1(key, data)).rstrip(b'=').decode()  # noqa: Q000
-        return s
-    def _has_sk_imgPost(self,key, s_time, ro):
-        """加密sk"""
-        data = "/api/generate/upload/signature"+"&"+str(s_time)+"&"+str(ro)
-        s = base64.urlsafe_b64encode(self.hmac_sha1(key, data)).rstrip(b'=').decode()  # noqa: Q000
-        return s
-    def _has_sk_getVersion(self,key, s_time, ro):
-        """加密sk"""
-        data = "/api/model/version/get"+"&"+str(s_time)+"&"+str(ro)
-        s = base64.urlsafe_b64encode(self.hmac_sha1(key, data)).rstrip(b'=').decode()  # noqa: Q000
-        return s
-    def get_image_url(self, ak, signature, time_stamp, signature_nonce):
-
-        url = f"https://openapi.liblibai.cloud/api/generate/webui/text2img?AccessKey={ak}&Signature={signature}&Timestamp={time_stamp}&SignatureNonce={signature_nonce}"
-        return url
-
-    def get_confyui_url(self, ak, signature, time_stamp, signature_nonce):
-        url = f"https://openapi.liblibai.cloud/api/generate/comfyui/app?AccessKey={ak}&Signature={signature}&Timestamp={time_stamp}&SignatureNonce={signature_nonce}"
-        return url
-
-    def get_ultra_image_url(self, ak, signature, time_stamp, signature_nonce):
-
-        url = f"https://openapi.liblibai.cloud/api/generate/webui/text2img/ultra?AccessKey={ak}&Signature={signature}&Timestamp={time_stamp}&SignatureNonce={signature_nonce}"
-        return url
-
-    def get_generate_url(self, ak, signature, time_stamp, signature_nonce):
-
-        url = f"https://openapi.liblibai.cloud/api/generate/webui/status?AccessKey={ak}&Signature={signature}&Timestamp={time_stamp}&SignatureNonce={signature_nonce}"
-        return url
-    def get_imgPost_url(self,ak,signature,time_stamp,signature_nonce):
-        url = f"https://openapi.liblibai.cloud/api/generate/upload/signature?AccessKey={ak}&Signature={signature}&Timestamp={time_stamp}&SignatureNonce={signature_nonce}"
-        return url
-    def get_getVersion_url(self,ak,signature,time_stamp,signature_nonce):
-        url = f"https://openapi.liblibai.cloud/api/model/version/get?AccessKey={ak}&Signature={signature}&Timestamp={time_stamp}&SignatureNonce={signature_nonce}"
-        return url
     async def text2img(self, config: text2imgConfig):
         if config.mgType == "sd1.5/XL模式(可自定义模型)":
             progess = await self.text_to_image_sd(config)
@@ -174,43 +110,11 @@ class liblibApi(Star):
             return progess
         else:
             return {"code": 1, "msg": "未设置类型"}
-    async def run(self, data, url, timeout=240):
-        """
-        发送任务到生图接口，直到返回image为止，失败抛出异常信息
-        """
-        start_time = time.time()  # 记录开始时间
-        # 这里提交任务，校验是否提交成功，并且获取任务ID
-        async with httpx.AsyncClient() as client:
-            logger.info("正在发起请求,请求体为"+str(data))
-            response = await client.post(url=url, headers=self.headers, json=data)
-            response.raise_for_status()
-            progress = response.json()# 获取响应数据
-            if progress["code"]==0:
-                while True:
-                    current_time = time.time()
-                    if(current_time - start_time)>timeout:
-                        logger.info(f"在发起生图任务后{current_time-start_time}秒，未获取到任务ID，已退出轮询。")
-                        return {"code": 1, "msg": "任务已经超时，文生图失败"}
-                    generate_uuid = progress["data"]["generateUuid"]# 获取任务ID
-                    data = {"generateUuid":generate_uuid}# 装载任务ID
-                    response = await client.post(url=self.generate_url, headers=self.headers, json=data)# 根据已创建的任务id发送请求，进行任务状态查询
-                    response.raise_for_status()# 检查响应是否成功
-                    progress = response.json()# 获取响应数据
-                    try:
-                        logger.info("当前任务状态为："+str(progress.get("data",{}).get("generateStatus",""))+"进度为："+str(progress.get("data",{}).get("percentCompleted","")*100)+"% 已经用时："+str(current_time-start_time)+"秒")
-                    except Exception as e:
-                        logger.info(f"任务状态查询失败，原因：{e}")
-                    if progress["data"].get("images") and any(image for image in progress["data"]["images"] if image is not None):
-                        logger.info("图片生成完成")
-                        try:
-                            logger.info("图片地址为："+str(progress.get("data",{}).get("images",[{}])[0].get("imageUrl",None)))
-                            logger.info("返回原始数据："+str(progress))
-                        except Exception:
-                            logger.info("图片地址为获取失败")
-                        return progress
-                    time.sleep(self.interval)# 等待一段时间后再次轮询  # noqa: ASYNC251
-            else:
-                return {"code": {progress["code"]}, "msg": {progress["msg"]}}
+    async def run(self, data, path, config: text2imgConfig):
+        """
+        发送任务到生图接口并等待出图，排队、轮询和超时由任务管理器处理
+        """
+        return await self.jobs.run(path, data, user_id=config.user_id, prompt=config.message_str or "")
     async def initialize(self):
         """可选择实现异步的插件初始化方法，当实例化该插件类之后会自动调用该方法。"""
     @filter.command("lcha")
@@ -225,18 +129,15 @@ class liblibApi(Star):
         data = {
             "versionUuid": str(prompt),
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url=self.getVersion_url, headers=self.headers, json=data)
-            response.raise_for_status()
-            progress = response.json()
-            logger.info("模型查询参数为"+str(progress))
-            yield event.plain_result(
-                f"已经查询到模型信息：\n"
-                f"模型ID：{progress.get('data', {}).get('versionUuid')}\n"
-                f"模型名称：{progress.get('data', {}).get('modelName')}\n"
-                f"模型版本：{progress.get('data', {}).get('versionName')}\n"
-                f"基础算法：{progress.get('data', {}).get('baseAlgoName')}\n"
-                )
+        progress = await self.client.post_api("/api/model/version/get", data)
+        logger.info("模型查询参数为"+str(progress))
+        yield event.plain_result(
+            f"已经查询到模型信息：\n"
+            f"模型ID：{progress.get('data', {}).get('versionUuid')}\n"
+            f"模型名称：{progress.get('data', {}).get('modelName')}\n"
+            f"模型版本：{progress.get('data', {}).get('versionName')}\n"
+            f"基础算法：{progress.get('data', {}).get('baseAlgoName')}\n"
+            )
     def textFilter(self,message:list)->str:
         for msg in message:
             if msg.type == "Plain":
@@ -271,9 +172,8 @@ class liblibApi(Star):
         message_str = self.textFilter(message)
         parts = str(message_str).split(" ",1)
         prompt = parts[1].strip() if len(parts) > 1 else ""# 获取用户发送的消息
-        self.img_config.img_url = image_url
-        self.img_config.message_str = prompt
-        progess = await self.text_to_image_sd(self.img_config)
+        config = self.request_config(event, prompt, image_url)
+        progess = await self.text_to_image_sd(config)
         if progess.get("code") == 0:
             chain = [
                 Comp.At(qq=event.get_sender_id()), # At 消息发送者
@@ -305,9 +205,8 @@ class liblibApi(Star):
             pass
         parts = str(message_str).split(" ",1)
         prompt = parts[1].strip() if len(parts) > 1 else ""# 获取用户发送的消息
-        self.img_config.img_url = image_url
-        self.img_config.message_str = prompt
-        progess = await self.text_to_image_flux(self.img_config)
+        config = self.request_config(event, prompt, image_url)
+        progess = await self.text_to_image_flux(config)
         if progess.get("code") == 0:
             chain = [
                 Comp.At(qq=event.get_sender_id()), # At 消息发送者
@@ -335,9 +234,8 @@ class liblibApi(Star):
         message_str = self.textFilter(message)
         parts = str(message_str).split(" ",1)
         prompt = parts[1].strip() if len(parts) > 1 else ""# 获取用户发送的消息
-        self.img_config.img_url = image_url
-        self.img_config.message_str = prompt
-        progess = await self.text_to_image_confyui(self.img_config)
+        config = self.request_config(event, prompt, image_url)
+        progess = await self.text_to_image_confyui(config)
         if progess.get("code") == 0:
             chain = [
                 Comp.At(qq=event.get_sender_id()), # At 消息发送者
@@ -364,10 +262,9 @@ class liblibApi(Star):
         message_str = self.textFilter(message)
         parts = str(message_str).split(" ",1)
         prompt = parts[1].strip() if len(parts) > 1 else ""# 获取用户发送的消息
-        self.img_config.img_url = image_url
-        self.img_config.message_str = prompt
+        config = self.request_config(event, prompt, image_url)
         try:
-            progess = await self.text2img(self.img_config)# 发送请求
+            progess = await self.text2img(config)# 发送请求
         except Exception as e:
             yield event.plain_result(f"调用文生图接口失败，原因：{e}")
             return
@@ -375,7 +272,7 @@ class liblibApi(Star):
             chain = [
                 Comp.At(qq=event.get_sender_id()), # At 消息发送者
                 Comp.Plain(f"图片已经生成:"
-                           f"\n当前使用模式：{self.img_config.mgType}"
+                           f"\n当前使用模式：{config.mgType}"
                            f"\n消耗点数：{progess.get('pointsCost')}，账户余额：{progess.get('accountBalance')}"
                            f"\n使用模型：{progess.get('modelName')}，使用算法：{progess.get('baseAlgoName')}"
                            f"\n提示词：{progess.get('prompt')}"
@@ -389,13 +286,40 @@ class liblibApi(Star):
             yield event.chain_result(chain)
         else:
             yield event.plain_result("图片生成失败，原因："+str(progess.get("msg")))
+    @filter.command("lstatus")
+    async def lstatus(self, event: AstrMessageEvent):
+        """
+        查看正在排队和生成中的任务，指令格式为：/lstatus
+        """
+        jobs = self.jobs.active_jobs()
+        if not jobs:
+            yield event.plain_result("当前没有排队或生成中的任务")
+            return
+        user_id = event.get_sender_id()
+        lines = [f"当前共有{len(jobs)}个任务："]
+        for job in jobs:
+            line = job.describe()
+            if job.status == "排队中":
+                line += f"，排第{self.jobs.queue_position(job)}位"
+            if job.user_id == user_id:
+                line += " ←你的任务"
+            lines.append(line)
+        yield event.plain_result("\n".join(lines))
+    def request_config(self, event: AstrMessageEvent, prompt: str, image_url):
+        """每次请求复制一份配置，避免并发的任务互相覆盖提示词和图片"""
+        config = copy.copy(self.img_config)
+        config.message_str = prompt
+        config.img_url = image_url
+        config.user_id = event.get_sender_id()
+        return config
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
+        await self.client.close()
     async def text_to_image_confyui(self,config:text2imgConfig):
         """
         处理用户发送的消息，获取用户发送的消息和图片链接，构造请求数据,confyui模式
         """
-        url = await self.get_signature_image_url(config.img_url,self.imgPost_url)
+        url = await self.get_signature_image_url(config.img_url)
         prompt = await self.prompt_Translation(config)
         data = """{
             "templateUuid": "4df2efa0f18d46dc9758803e478eb51c",
@@ -447,7 +371,7 @@ class liblibApi(Star):
                 base_json = json.loads(api_str)
             except Exception as e:
                 logger.info(f"confyui模式调用文生图接口失败，原因：json类型设置错误{e}")
-        d_data = await self.run(base_json, self.confyui_url)
+        d_data = await self.run(base_json, "/api/generate/comfyui/app", config)
         re_data = {
             "code": d_data.get("code",1),
             "msg": d_data.get("msg",""),
@@ -502,7 +426,7 @@ class liblibApi(Star):
         data["generateParams"]["prompt"] = prompt
         logger.info("翻译完成，翻译结果为："+str(prompt))
         logger.info("请求数据"+str(data))
-        d_data = await self.run(data, self.text2img_url)
+        d_data = await self.run(data, "/api/generate/webui/text2img", config)
         re_data = {
             "code": d_data.get("code",1),
             "msg": d_data.get("msg",""),
@@ -660,14 +584,14 @@ class liblibApi(Star):
             return {"code": 1, "msg": "翻译后提示词为空,请检查prompt_Translation函数"}
         if config.img_url is not None:
             logger.info("检测到图片链接，开始上传图片")
-            image_url = await self.get_signature_image_url(config.img_url,self.imgPost_url)
+            image_url = await self.get_signature_image_url(config.img_url)
             data.get("generateParams")["controlNet"][0]["sourceImage"] = image_url
             data.get("generateParams")["controlNet"][1]["sourceImage"] = image_url
         else:
             logger.info("未检测到图片链接,关闭controlnet")
             del data.get("generateParams")["controlNet"]
         logger.info("请求数据"+str(data))
-        d_data = await self.run(data, self.text2img_url)
+        d_data = await self.run(data, "/api/generate/webui/text2img", config)
         re_data = {
             "code": d_data.get("code",1),
             "msg": d_data.get("msg",""),
@@ -694,24 +618,21 @@ class liblibApi(Star):
         data = {
             "versionUuid": id,
         }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url=self.getVersion_url, headers=self.headers, json=data)
-            response.raise_for_status()
-            progress = response.json()
-            if progress["code"]==0:
-                logger.info("模型ID检测成功")
-                re_progress = {
-                    "code": 0,
-                    "msg": "模型ID检测成功",
-                    "versionUuid": progress.get("data",{}).get("versionUuid",None),
-                    "modelName": progress.get("data",{}).get("modelName",None),
-                    "versionName": progress.get("data",{}).get("versionName",None),
-                    "baseAlgoName": progress.get("data",{}).get("baseAlgoName",None)
-                }
-                return re_progress
-            else:
-                logger.info("模型ID检测失败，原因："+str(progress["msg"]))
-                return {"code": 1, "msg": "模型ID检测失败，原因："+str(progress["msg"]),"versionUuid": "","modelName": "","versionName":"","baseAlgoName":""}
+        progress = await self.client.post_api("/api/model/version/get", data)
+        if progress["code"]==0:
+            logger.info("模型ID检测成功")
+            re_progress = {
+                "code": 0,
+                "msg": "模型ID检测成功",
+                "versionUuid": progress.get("data",{}).get("versionUuid",None),
+                "modelName": progress.get("data",{}).get("modelName",None),
+                "versionName": progress.get("data",{}).get("versionName",None),
+                "baseAlgoName": progress.get("data",{}).get("baseAlgoName",None)
+            }
+            return re_progress
+        else:
+            logger.info("模型ID检测失败，原因："+str(progress["msg"]))
+            return {"code": 1, "msg": "模型ID检测失败，原因："+str(progress["msg"]),"versionUuid": "","modelName": "","versionName":"","baseAlgoName":""}
     async def prompt_Translation(self,config:text2imgConfig):
         """
         处理用户发送的消息，获取用户发送的消息和图片链接，构造请求数据
@@ -748,85 +669,12 @@ class liblibApi(Star):
         else:
             logger.info("未检测到中文，不进行翻译")
             return config.message_str
-    async def download_image(self, url: str):
-        """
-        下载图片并返回二进制数据
-        """
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url)
-                response.raise_for_status()
-            except Exception as e:
-                logger.info(f"图片下载失败，原因：{e}")
-                return None
-            return response.content
-
-    async def signature_image(self,url:str,name:str):
-        """
-        图片上传请求发起，获取回调签名参数，用于上传图片
-        """
-        data = {
-            "name": name,
-            "extension" : "png"
-        }
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(url, headers=self.headers, json=data)
-                response.raise_for_status()
-                progress = response.json()
-            except Exception as e:
-                logger.info(f"图片上传请求发起失败，原因：{e}")
-                return None
-            return progress
-
-    async def upload_image(self,progress:dict,image_file,save_path:bytes):
-        """
-        对图片二进制数据进行签名并上传
-        """
-        async with httpx.AsyncClient() as client:
-            data = {
-                "key": progress["data"]["key"],
-                "policy": progress["data"]["policy"],
-                "x-oss-date": progress["data"]["xOssDate"],
-                "x-oss-expires": progress["data"]["xOssExpires"],
-                "x-oss-signature": progress["data"]["xOssSignature"],
-                "x-oss-credential": progress["data"]["xOssCredential"],
-                "x-oss-signature-version": progress["data"]["xOssSignatureVersion"],
-            }
-            files = {
-                "file": (image_file, save_path, "image/png")
-            }
-            try:
-                response = await client.post(progress["data"]["postUrl"],data=data, files=files)
-                response.raise_for_status()
-                return progress.get("data").get("postUrl")+"/"+progress.get("data").get("key")
-            except Exception as e:
-                logger.info(f"图片上传失败，原因：{e}")
-                return None
-
-    async def get_signature_image_url(self,url:str,post_url):
+    async def get_signature_image_url(self,url:str):
         """
         该方法用于将消息平台的图片链接转换为liblib的api可以直接调用的图片链接
-        该方法会先将图片下载到本地，然后再签名上传到服务器，最后返回图片链接
-        """
-        image_name = "image"+str(uuid.uuid1())
-        image_file = image_name+"."+"png"
-        imge_byte = await self.download_image(url)
-        logger.info("图片二进制数据下载成功")
-        if imge_byte is None:
-            logger.info("图片二进制数据下载下载失败")
-            return None
-        progress = await self.signature_image(post_url,image_name)
-        logger.info("图片上传请求发起成功")
-        if progress is None:
-            logger.info("图片上传请求发起失败,未获得签名数据")
-            return None
-        get_url = await self.upload_image(progress,image_file,imge_byte)
-        logger.info("图片上传成功,图片链接为："+get_url)
-        if get_url is None:
-            logger.info("图片上传失败,未能获取到图片链接")
-            return None
-        return get_url
+        图片边下载边上传，同一张图片在缓存有效期内只上传一次
+        """
+        return await self.uploader.upload_from_url(url)
 
     async def exextract_letters(self,text):
         latters = re.findall(r"[a-zA-Z]", text)
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+
+from astrbot.api import logger
+
+from .jobs import LiblibClient
+
+SIGNATURE_PATH = "/api/generate/upload/signature"
+CHUNK_SIZE = 64 * 1024
+# 小图片留在内存里，超过这个大小才落到临时文件
+SPOOL_SIZE = 4 * 1024 * 1024
+MAX_IMAGE_SIZE = 30 * 1024 * 1024
+
+
+class ExpiringCache:
+    """带过期时间的 LRU 缓存"""
+
+    def __init__(self, ttl: float, max_entries: int = 512):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> str | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        if self.ttl <= 0:
+            return
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+
+class ImageUploader:
+    """把消息平台的图片转存到 liblib 的 OSS
+
+    下载时边读边算 sha256 并写入 SpooledTemporaryFile。小图片留在内存里，上传时直接
+    取出内存缓冲区的内容；超过 SPOOL_SIZE 已经落盘的图片把文件对象交给 httpx 分块读取。
+    httpx 会对文件对象调用 fileno()，这会让还在内存里的 spool 被迫写到磁盘，
+    所以内存里的图片不能以文件对象的形式上传。上传得到的链接按内容哈希
+    缓存，同一张图片再次使用时跳过签名和上传；同一个平台链接还会记住它的哈希，
+    连下载也一起跳过。同一张图片的并发请求共用一次上传。
+    """
+
+    def __init__(self, client: LiblibClient, ttl: float = 3600):
+        self.client = client
+        self.uploaded = ExpiringCache(ttl)
+        self.source_hashes = ExpiringCache(ttl)
+        self.pending: dict[str, asyncio.Future] = {}
+
+    async def upload_from_url(self, url: str) -> str | None:
+        digest = self.source_hashes.get(url)
+        if digest is not None:
+            cached = self.uploaded.get(digest)
+            if cached is not None:
+                logger.info("图片链接命中缓存，跳过下载和上传")
+                return cached
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+            digest = await self._download(url, spool)
+            if digest is None:
+                return None
+            self.source_hashes.set(url, digest)
+
+            cached = self.uploaded.get(digest)
+            if cached is not None:
+                logger.info("图片内容命中缓存，跳过上传")
+                return cached
+
+            pending = self.pending.get(digest)
+            if pending is not None:
+                return await asyncio.shield(pending)
+
+            future = asyncio.get_running_loop().create_future()
+            self.pending[digest] = future
+            try:
+                result = await self._upload(spool)
+                if result is not None:
+                    self.uploaded.set(digest, result)
+                future.set_result(result)
+                return result
+            except BaseException as e:
+                future.set_exception(e)
+                # 没有其他等待者时也要取走异常，避免 "exception was never retrieved"
+                future.exception()
+                raise
+            finally:
+                self.pending.pop(digest, None)
+
+    async def _download(self, url: str, spool) -> str | None:
+        """流式下载到 spool，返回内容的 sha256"""
+        sha = hashlib.sha256()
+        size = 0
+        try:
+            async with self.client.http.stream("GET", url) as response:
+                response.raise_for_status()
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > MAX_IMAGE_SIZE:
+                        logger.info(f"图片超过{MAX_IMAGE_SIZE // 1024 // 1024}MB，放弃下载")
+                        return None
+                    sha.update(chunk)
+                    spool.write(chunk)
+        except Exception as e:
+            logger.info(f"图片下载失败，原因：{e}")
+            return None
+        if size == 0:
+            logger.info("图片下载失败，内容为空")
+            return None
+        spool.seek(0)
+        logger.info(f"图片下载成功，大小{size}字节")
+        return sha.hexdigest()
+
+    async def _upload(self, spool) -> str | None:
+        """获取签名后把 spool 上传到 OSS，返回图片链接"""
+        image_name = "image" + uuid.uuid4().hex
+        try:
+            progress = await self.client.post_api(SIGNATURE_PATH, {"name": image_name, "extension": "png"})
+        except Exception as e:
+            logger.info(f"图片上传请求发起失败，原因：{e}")
+            return None
+        signature = progress.get("data")
+        if progress.get("code") != 0 or not signature:
+            logger.info(f"图片上传请求发起失败，未获得签名数据：{progress.get('msg')}")
+            return None
+
+        data = {
+            "key": signature["key"],
+            "policy": signature["policy"],
+            "x-oss-date": signature["xOssDate"],
+            "x-oss-expires": signature["xOssExpires"],
+            "x-oss-signature": signature["xOssSignature"],
+            "x-oss-credential": signature["xOssCredential"],
+            "x-oss-signature-version": signature["xOssSignatureVersion"],
+        }
+        # 没有落盘时 _file 是 BytesIO，getvalue() 和缓冲区共享内存，不会复制也不会触发 rollover
+        content = spool if spool._rolled else spool._file.getvalue()
+        files = {"file": (image_name + ".png", content, "image/png")}
+        try:
+            response = await self.client.http.post(signature["postUrl"], data=data, files=files)
+            response.raise_for_status()
+        except Exception as e:
+            logger.info(f"图片上传失败，原因：{e}")
+            return None
+        url = signature["postUrl"] + "/" + signature["key"]
+        logger.info("图片上传成功,图片链接为：" + url)
+        return url
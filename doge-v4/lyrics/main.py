@@ -25,6 +25,7 @@ class LyricNextPlugin(Star):
         
         self.lyrics_index = {}  # 歌词句子 -> [(下一句, 歌名), ...]
         self.lyrics_info = {}  # 歌名 -> 歌曲信息(作者等)
+        self.lyrics_fetcher = None  # 异步歌词获取器，首次搜索时创建
 
         # 确保用户歌词目录存在 - 这是主要的歌词加载目录
         os.makedirs(self.lyrics_dir, exist_ok=True)
@@ -394,11 +395,16 @@ class LyricNextPlugin(Star):
             if tool_path not in sys.path:
                 sys.path.append(tool_path)
 
-            from search_lyrics import search_and_save_lyrics
+            from async_lyrics import AsyncLyricsFetcher
+
+            # 复用同一个异步获取器（连接池），各平台并发查询
+            if self.lyrics_fetcher is None:
+                self.lyrics_fetcher = AsyncLyricsFetcher()
 
             # 执行搜索，传入用户歌词目录
             logger.info(f"开始搜索歌词, 歌名:{song_name}, 歌手:{artist_name}, 音乐源:{music_source}")
-            success, file_path, preview = search_and_save_lyrics(song_name, artist_name, music_source, self.lyrics_dir)
+            success, file_path, preview = await self.lyrics_fetcher.search_and_save_lyrics(
+                song_name, artist_name, music_source, self.lyrics_dir)
             logger.info(f"搜索结果: 成功={success}, 文件路径={file_path}")
             if success:
                 # 重新加载歌词库以包含新添加的歌词
@@ -501,4 +507,6 @@ class LyricNextPlugin(Star):
 
     async def terminate(self):
         """插件终止时的清理工作"""
+        if self.lyrics_fetcher is not None:
+            await self.lyrics_fetcher.close()
         logger.info("LyricNext 插件已终止")
@@ -0,0 +1,463 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import re
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from search_lyrics import _filter_lyrics_for_storage
+
+# 设置请求头，模拟浏览器行为
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Referer': 'https://www.google.com/',
+}
+
+# 各平台接口地址，测试时可整体替换为本地桩服务器
+DEFAULT_ENDPOINTS = {
+    'netease_search': 'https://music.163.com/api/search/get',
+    'netease_lyric': 'https://music.163.com/api/song/lyric',
+    'netease_artist': 'https://music.163.com/api/v1/artist/{artist_id}',
+    'qq_musicu': 'https://u.y.qq.com/cgi-bin/musicu.fcg',
+    'qq_lyric': 'https://c.y.qq.com/lyric/fcgi-bin/fcg_query_lyric_new.fcg',
+    'kugou_search': 'http://mobilecdn.kugou.com/api/v3/search/song',
+    'kugou_krcs': 'http://krcs.kugou.com/search',
+    'kugou_download': 'http://lyrics.kugou.com/download',
+}
+
+SOURCE_ALIASES = {
+    'netease': 'netease', '网易云': 'netease', '网易': 'netease',
+    'qq': 'qq', 'qq音乐': 'qq', 'qqmusic': 'qq',
+    'kugou': 'kugou', '酷狗': 'kugou', '酷狗音乐': 'kugou',
+}
+
+ALL_SOURCES = ('netease', 'qq', 'kugou')
+
+
+def _strip_lrc(raw_lyrics):
+    """去除 LRC 时间标签和元数据行"""
+    processed_lyrics = []
+    for line in raw_lyrics.split('\n'):
+        line = re.sub(r'\[\d+:\d+\.\d+\]', '', line).strip()
+        if line and not line.startswith('['):
+            processed_lyrics.append(line)
+    return '\n'.join(processed_lyrics)
+
+
+def _artist_matches(artist_name, found_artist_name):
+    """宽松的歌手匹配：互相包含或任意分词命中"""
+    artist = artist_name.lower()
+    found = found_artist_name.lower()
+    return (artist in found or found in artist or
+            any(word in found for word in artist.split()))
+
+
+class HostRateLimiter:
+    """按主机限速：同一主机两次请求之间至少间隔 min_interval 秒（带随机抖动）"""
+
+    def __init__(self, min_interval=0.0, jitter=0.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url):
+        if self.min_interval <= 0 and self.jitter <= 0:
+            return
+        host = urlsplit(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.min_interval + random.uniform(0, self.jitter)
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class AsyncLyricsFetcher:
+    """基于 aiohttp 的异步歌词获取器
+
+    - 单首搜索时并发查询网易云/QQ/酷狗，返回最先成功的结果
+    - 批量下载歌手作品时用信号量限制并发，并按主机限速
+    - 复用同一个连接池会话，调用方负责在结束时 close()
+    """
+
+    def __init__(self, endpoints=None, concurrency=4, host_interval=0.5, host_jitter=0.5,
+                 limit_per_host=4, timeout=15):
+        self.endpoints = dict(DEFAULT_ENDPOINTS)
+        if endpoints:
+            self.endpoints.update(endpoints)
+        self.concurrency = max(1, concurrency)
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(host_interval, host_jitter)
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency * 4, limit_per_host=self.limit_per_host)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=HEADERS,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _get_json(self, url, params=None, referer=None):
+        """GET 并解析 JSON，各平台的 Content-Type 不规范，统一按文本解析"""
+        await self.rate_limiter.wait(url)
+        session = await self._get_session()
+        headers = {'Referer': referer} if referer else None
+        async with session.get(url, params=params, headers=headers) as response:
+            text = await response.text()
+        if not text or not text.strip():
+            return None
+        return json.loads(text)
+
+    # ---------- 网易云音乐 ----------
+
+    async def _netease_lyrics(self, song_id):
+        params = {'id': song_id, 'lv': 1, 'kv': 1, 'tv': -1}
+        data = await self._get_json(self.endpoints['netease_lyric'], params)
+        if data and 'lrc' in data and 'lyric' in data['lrc']:
+            return _strip_lrc(data['lrc']['lyric'])
+        return None
+
+    async def search_netease(self, song_name, artist_name=None):
+        """从网易云音乐搜索歌词"""
+        search_term = f"{song_name} {artist_name if artist_name else ''}"
+        params = {'s': search_term, 'type': 1, 'limit': 10}
+        data = await self._get_json(self.endpoints['netease_search'], params)
+        songs = (data or {}).get('result', {}).get('songs') or []
+        for song in songs:
+            found_artist_name = song['artists'][0]['name'] if song.get('artists') else ''
+            if artist_name and artist_name.lower() not in found_artist_name.lower():
+                continue
+            lyrics = await self._netease_lyrics(song['id'])
+            if lyrics:
+                return lyrics
+        return None
+
+    async def get_netease_artist_songs(self, artist_name):
+        """从网易云音乐获取歌手的热门歌曲列表"""
+        params = {'s': artist_name, 'type': 100, 'limit': 1}
+        data = await self._get_json(self.endpoints['netease_search'], params)
+        artists = (data or {}).get('result', {}).get('artists') or []
+        if not artists:
+            return []
+        url = self.endpoints['netease_artist'].format(artist_id=artists[0]['id'])
+        data = await self._get_json(url)
+        songs = []
+        for song in (data or {}).get('hotSongs', []):
+            song_id = song.get('id')
+            song_name = song.get('name', '').strip()
+            if song_id and song_name:
+                songs.append({'id': song_id, 'name': song_name})
+        return songs
+
+    # ---------- QQ 音乐 ----------
+
+    async def _qq_lyrics(self, song_mid):
+        params = {
+            'songmid': song_mid,
+            'g_tk': '5381',
+            'loginUin': '0',
+            'hostUin': '0',
+            'format': 'json',
+            'inCharset': 'utf8',
+            'outCharset': 'utf-8',
+            'notice': '0',
+            'platform': 'yqq.json',
+            'needNewCode': '0'
+        }
+        data = await self._get_json(self.endpoints['qq_lyric'], params, referer='https://y.qq.com/')
+        if data and 'lyric' in data and data.get('retcode', -1) == 0:
+            # QQ 音乐返回的歌词是 Base64 编码的
+            return _strip_lrc(base64.b64decode(data['lyric']).decode('utf-8'))
+        return None
+
+    async def _qq_musicu(self, payload):
+        params = {'data': json.dumps(payload)}
+        return await self._get_json(self.endpoints['qq_musicu'], params, referer='https://y.qq.com/') or {}
+
+    async def search_qq(self, song_name, artist_name=None):
+        """从 QQ 音乐搜索歌词"""
+        search_term = f"{song_name} {artist_name if artist_name else ''}"
+        data = await self._qq_musicu({
+            "req_0": {
+                "method": "DoSearchForQQMusicDesktop",
+                "module": "music.search.SearchCgiService",
+                "param": {"query": search_term, "page_num": 1, "num_per_page": 20, "search_type": 0}
+            }
+        })
+        song_list = data.get('req_0', {}).get('data', {}).get('body', {}).get('song', {}).get('list') or []
+        for song in song_list:
+            if artist_name:
+                singer_names = ' '.join(s.get('name', '') for s in song.get('singer', []))
+                if not _artist_matches(artist_name, singer_names):
+                    continue
+            if song_name.lower() not in song.get('title', '').lower():
+                continue
+            try:
+                lyrics = await self._qq_lyrics(song.get('mid', ''))
+            except (ValueError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"QQ音乐: 解析歌词失败: {str(e)}")
+                continue
+            if lyrics and lyrics.strip():
+                return lyrics
+        return None
+
+    async def get_qq_artist_songs(self, artist_name):
+        """从 QQ 音乐获取歌手的歌曲列表"""
+        data = await self._qq_musicu({
+            "req_0": {
+                "method": "DoSearchForQQMusicDesktop",
+                "module": "music.search.SearchCgiService",
+                "param": {"query": artist_name, "page_num": 1, "num_per_page": 20, "search_type": 9}
+            }
+        })
+        singer_list = data.get('req_0', {}).get('data', {}).get('body', {}).get('singer', {}).get('list') or []
+        singer_mid = None
+        for singer in singer_list:
+            if artist_name.lower() in singer.get('name', '').lower():
+                singer_mid = singer.get('mid')
+                break
+        if not singer_mid and singer_list:
+            singer_mid = singer_list[0].get('mid')
+        if not singer_mid:
+            return []
+
+        data = await self._qq_musicu({
+            "comm": {"ct": 24, "cv": 0},
+            "singer": {
+                "method": "GetSingerSongList",
+                "param": {"singermid": singer_mid, "order": 1, "begin": 0, "num": 100},
+                "module": "musichall.song_list_server"
+            }
+        })
+        songs = []
+        for song in data.get('singer', {}).get('data', {}).get('songlist', []):
+            song_mid = song.get('mid', '')
+            song_name = song.get('name', '').strip()
+            if song_name and song_mid:
+                songs.append({'id': song.get('id', 0), 'mid': song_mid, 'name': song_name})
+        return songs
+
+    # ---------- 酷狗音乐 ----------
+
+    async def _kugou_lyrics(self, song_hash, keyword=None, duration=None):
+        params = {'ver': 1, 'man': 'yes', 'client': 'mobi', 'hash': song_hash}
+        if keyword:
+            params['keyword'] = keyword
+        if duration:
+            params['duration'] = duration
+        referer = 'https://www.kugou.com/'
+        data = await self._get_json(self.endpoints['kugou_krcs'], params, referer=referer)
+        candidates = (data or {}).get('candidates') or []
+        if not candidates:
+            return None
+        lyrics_id = candidates[0].get('id')
+        access_key = candidates[0].get('accesskey')
+        if not (lyrics_id and access_key):
+            return None
+
+        download_params = {
+            'ver': 1,
+            'client': 'pc',
+            'id': lyrics_id,
+            'accesskey': access_key,
+            'fmt': 'lrc',
+            'charset': 'utf8'
+        }
+        data = await self._get_json(self.endpoints['kugou_download'], download_params, referer=referer)
+        if data and data.get('status') == 200 and 'content' in data:
+            # 解码 Base64 编码的歌词
+            return _strip_lrc(base64.b64decode(data['content']).decode('utf-8'))
+        return None
+
+    async def _kugou_search(self, keyword, page=1, pagesize=20):
+        params = {'format': 'json', 'keyword': keyword, 'page': page, 'pagesize': pagesize, 'showtype': 1}
+        data = await self._get_json(self.endpoints['kugou_search'], params, referer='https://www.kugou.com/')
+        if data and data.get('status') == 1:
+            return data.get('data', {}).get('info') or []
+        return []
+
+    async def search_kugou(self, song_name, artist_name=None):
+        """从酷狗音乐搜索歌词"""
+        search_term = f"{song_name} {artist_name if artist_name else ''}"
+        for song in await self._kugou_search(search_term):
+            found_song_name = song.get('songname', '')
+            found_artist_name = song.get('singername', '')
+            if artist_name and not _artist_matches(artist_name, found_artist_name):
+                continue
+            if song_name.lower() not in found_song_name.lower():
+                continue
+            try:
+                lyrics = await self._kugou_lyrics(song.get('hash', ''),
+                                                  keyword=f"{found_song_name} {found_artist_name}",
+                                                  duration=song.get('duration', ''))
+            except (ValueError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"酷狗音乐: 解析歌词失败: {str(e)}")
+                continue
+            if lyrics and lyrics.strip():
+                return lyrics
+        return None
+
+    async def get_kugou_artist_songs(self, artist_name, pages=3):
+        """从酷狗音乐获取歌手的歌曲列表，多页并发拉取"""
+        results = await asyncio.gather(
+            *(self._kugou_search(artist_name, page=page, pagesize=50) for page in range(1, pages + 1)),
+            return_exceptions=True,
+        )
+        songs = []
+        seen = set()
+        for song_list in results:
+            if isinstance(song_list, BaseException):
+                continue
+            for song in song_list:
+                song_name = song.get('songname', '').strip()
+                singer_name = song.get('singername', '')
+                hash_value = song.get('hash', '')
+                if (artist_name.lower() in singer_name.lower() and
+                        song_name and hash_value and hash_value not in seen):
+                    seen.add(hash_value)
+                    songs.append({'id': hash_value, 'name': song_name, 'singer': singer_name})
+        return songs
+
+    # ---------- 统一入口 ----------
+
+    def _resolve_sources(self, music_source):
+        if not music_source:
+            return list(ALL_SOURCES)
+        source = SOURCE_ALIASES.get(music_source.lower())
+        return [source] if source else []
+
+    async def search_song_lyrics(self, song_name, music_source=None, artist_name=None):
+        """并发查询各平台，返回 (平台, 歌词)；全部失败时返回 (None, None)"""
+        searchers = {
+            'netease': self.search_netease,
+            'qq': self.search_qq,
+            'kugou': self.search_kugou,
+        }
+        pending = {
+            asyncio.ensure_future(searchers[source](song_name, artist_name)): source
+            for source in self._resolve_sources(music_source)
+        }
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    source = pending.pop(task)
+                    try:
+                        lyrics = task.result()
+                    except Exception as e:
+                        print(f"{source}搜索出错: {str(e)}")
+                        continue
+                    if lyrics and lyrics.strip():
+                        return source, lyrics
+        finally:
+            for task in pending:
+                task.cancel()
+        return None, None
+
+    async def search_and_save_lyrics(self, song_name, artist_name=None, music_source=None, lyrics_dir=None):
+        """搜索歌词并保存到歌词库，返回 (是否成功, 文件路径, 预览内容)"""
+        _, lyrics = await self.search_song_lyrics(song_name, music_source, artist_name)
+        if not lyrics:
+            return False, None, None
+
+        filtered_lyrics = _filter_lyrics_for_storage(lyrics)
+        file_name = f"{song_name} - {artist_name}" if artist_name else song_name
+        file_name = re.sub(r'[\\/:*?"<>|]', '_', file_name)
+        file_path = os.path.join(lyrics_dir, f"{file_name}.txt")
+
+        try:
+            await asyncio.to_thread(_write_text, file_path, filtered_lyrics)
+        except OSError as e:
+            print(f"保存歌词失败: {str(e)}")
+            return False, None, filtered_lyrics
+
+        lines = filtered_lyrics.split('\n')
+        preview = '\n'.join(lines[:5])
+        if len(lines) > 5:
+            preview += '\n...'
+        return True, file_path, preview
+
+    async def get_artist_songs(self, artist_name, source='netease'):
+        listers = {
+            'netease': self.get_netease_artist_songs,
+            'qq': self.get_qq_artist_songs,
+            'kugou': self.get_kugou_artist_songs,
+        }
+        return await listers[source](artist_name)
+
+    async def _song_lyrics(self, song, source):
+        if source == 'netease':
+            return await self._netease_lyrics(song['id'])
+        if source == 'qq':
+            return await self._qq_lyrics(song.get('mid', ''))
+        return await self._kugou_lyrics(song['id'])
+
+    async def download_artist_lyrics(self, artist_name, lyrics_dir, source='netease', songs=None, limit=None,
+                                     progress=None):
+        """批量下载歌手作品歌词，返回 (成功数, 总数)
+
+        并发数由 concurrency 限制，同一主机的请求间隔由 rate_limiter 控制。
+        progress 为可选回调 progress(done, total, song_name, ok)。
+        """
+        if songs is None:
+            songs = await self.get_artist_songs(artist_name, source)
+        if limit:
+            songs = songs[:limit]
+        if not songs:
+            return 0, 0
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done_count = 0
+
+        async def worker(song):
+            nonlocal done_count
+            async with semaphore:
+                try:
+                    lyrics = await self._song_lyrics(song, source)
+                except Exception as e:
+                    print(f"获取《{song['name']}》歌词出错: {str(e)}")
+                    lyrics = None
+                ok = False
+                if lyrics:
+                    safe_song_name = re.sub(r'[\\/:*?"<>|]', '_', song['name'])
+                    file_path = os.path.join(lyrics_dir, f"{safe_song_name}.txt")
+                    try:
+                        await asyncio.to_thread(_write_text, file_path, _filter_lyrics_for_storage(lyrics))
+                        ok = True
+                    except OSError as e:
+                        print(f"× 保存歌词失败: {str(e)}")
+            done_count += 1
+            if progress:
+                progress(done_count, len(songs), song['name'], ok)
+            return ok
+
+        results = await asyncio.gather(*(worker(song) for song in songs))
+        return sum(results), len(songs)
+
+
+def _write_text(file_path, content):
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(content)
@@ -1,18 +1,12 @@
+import asyncio
 import json
 import os
 import random
-import re
 import time
 
 import requests
 
-
-def contains_chinese(text):
-    """检测文本是否包含汉字"""
-    for char in text:
-        if '\u4e00' <= char <= '\u9fff':
-            return True
-    return False
+from async_lyrics import AsyncLyricsFetcher
 
 
 # 设置歌词保存目录
@@ -74,39 +68,6 @@ def get_artist_songs(artist_name="周杰伦"):
         return []
 
 
-def get_song_lyrics(song_id):
-    """从网易云音乐获取歌曲歌词"""
-    lyrics_url = f"https://music.163.com/api/song/lyric"
-    params = {
-        'id': song_id,
-        'lv': 1,
-        'kv': 1,
-        'tv': -1
-    }
-
-    try:
-        response = requests.get(lyrics_url, headers=HEADERS, params=params)
-        data = response.json()
-
-        if 'lrc' in data and 'lyric' in data['lrc']:
-            raw_lyrics = data['lrc']['lyric']
-
-            # 处理歌词格式，去除时间标签
-            processed_lyrics = []
-            for line in raw_lyrics.split('\n'):
-                # 去除时间标签 [00:00.000]
-                line = re.sub(r'\[\d+:\d+\.\d+\]', '', line).strip()
-                if line and not line.startswith('['):
-                    processed_lyrics.append(line)
-
-            return '\n'.join(processed_lyrics)
-        else:
-            return None
-    except Exception as e:
-        print(f"网易云音乐: 获取歌词出错: {str(e)}")
-        return None
-
-
 def get_qq_music_songs(artist_name="周杰伦"):
     """从 QQ 音乐获取歌手的所有歌曲列表"""
     print(f"正在从 QQ 音乐获取{artist_name}的歌曲列表...")
@@ -208,49 +169,6 @@ def get_qq_music_songs(artist_name="周杰伦"):
         return []
 
 
-def get_qq_music_lyrics(song_mid):
-    """从 QQ 音乐获取歌曲歌词"""
-    lyrics_url = "https://c.y.qq.com/lyric/fcgi-bin/fcg_query_lyric_new.fcg"
-    params = {
-        'songmid': song_mid,
-        'g_tk': '5381',
-        'loginUin': '0',
-        'hostUin': '0',
-        'format': 'json',
-        'inCharset': 'utf8',
-        'outCharset': 'utf-8',
-        'notice': '0',
-        'platform': 'yqq.json',
-        'needNewCode': '0'
-    }
-
-    qq_headers = HEADERS.copy()
-    qq_headers['Referer'] = 'https://y.qq.com/'
-
-    try:
-        response = requests.get(lyrics_url, headers=qq_headers, params=params)
-        data = response.json()
-
-        if 'lyric' in data and data.get('retcode', -1) == 0:
-            # QQ 音乐返回的歌词是 Base64 编码的
-            import base64
-            raw_lyrics = base64.b64decode(data['lyric']).decode('utf-8')
-
-            # 处理歌词格式，去除时间标签
-            processed_lyrics = []
-            for line in raw_lyrics.split('\n'):
-                line = re.sub(r'\[\d+:\d+\.\d+\]', '', line).strip()
-                if line and not line.startswith('['):
-                    processed_lyrics.append(line)
-
-            return '\n'.join(processed_lyrics)
-        else:
-            return None
-    except Exception as e:
-        print(f"QQ 音乐: 获取歌词出错: {str(e)}")
-        return None
-
-
 def get_kugou_songs(artist_name="周杰伦"):
     """从酷狗音乐获取歌手的所有歌曲列表"""
     print(f"正在从酷狗音乐获取{artist_name}的歌曲列表...")
@@ -326,111 +244,6 @@ def get_kugou_songs(artist_name="周杰伦"):
         return []
 
 
-def get_kugou_lyrics(song_hash):
-    """从酷狗音乐获取歌曲歌词"""
-    headers = HEADERS.copy()
-    headers['Referer'] = 'https://www.kugou.com/'
-
-    try:
-        # 获取歌词
-        lyrics_url = "http://krcs.kugou.com/search"
-        lyrics_params = {
-            'ver': 1,
-            'man': 'yes',
-            'client': 'mobi',
-            'hash': song_hash
-        }
-
-        response = requests.get(lyrics_url, headers=headers, params=lyrics_params)
-        data = response.json()
-
-        if 'candidates' in data and len(data['candidates']) > 0:
-            # 获取第一个候选歌词
-            candidate = data['candidates'][0]
-            lyrics_id = candidate.get('id')
-            access_key = candidate.get('accesskey')
-
-            if lyrics_id and access_key:
-                # 获取具体歌词内容
-                download_url = "http://lyrics.kugou.com/download"
-                download_params = {
-                    'ver': 1,
-                    'client': 'pc',
-                    'id': lyrics_id,
-                    'accesskey': access_key,
-                    'fmt': 'lrc',
-                    'charset': 'utf8'
-                }
-
-                download_response = requests.get(download_url, headers=headers, params=download_params)
-                download_data = download_response.json()
-
-                if download_data.get('status') == 200 and 'content' in download_data:
-                    import base64
-                    # 解码 Base64 编码的歌词
-                    encoded_lyrics = download_data['content']
-                    raw_lyrics = base64.b64decode(encoded_lyrics).decode('utf-8')
-
-                    # 处理歌词格式，去除时间标签
-                    processed_lyrics = []
-                    for line in raw_lyrics.split('\n'):
-                        line = re.sub(r'\[\d+:\d+\.\d+\]', '', line).strip()
-                        if line and not line.startswith('['):
-                            processed_lyrics.append(line)
-
-                    return '\n'.join(processed_lyrics)
-
-        return None
-    except Exception as e:
-        print(f"酷狗音乐: 获取歌词出错: {str(e)}")
-        return None
-
-
-def _filter_lyrics_for_storage(lyrics):
-    """过滤歌词用于存储，去除作词作曲等信息行，保持歌词文件纯粹"""
-    lines = lyrics.split('\n')
-    filtered_lines = []
-
-    for line in lines:
-        line = line.strip()
-        if not line:  # 跳过空行
-            continue
-
-        # 过滤掉信息行
-        if (':' in line or '：' in line or  # 包含冒号的信息行（作词：、作曲：等）
-                ' - ' in line or  # 包含连字符的标题行（歌曲-歌手）
-                '(' in line and ')' in line or  # 包含括号的标题行
-                re.match(r'^[A-Za-z\s:]+$', line)):  # 纯英文信息行
-            continue
-            # 检测行内是否有空格分隔的多句歌词
-        if ' ' in line:
-            # 只有包含汉字的歌词才进行空格拆分，英文歌不拆分
-            if contains_chinese(line):
-                # 将一行拆分成多句，但只有当看起来像歌词时才拆分
-                # 避免拆分普通的句子
-                parts = [part.strip() for part in line.split(' ') if part.strip()]
-                # 如果拆分后的部分都比较短且没有特殊字符，认为是多句歌词
-                if all(len(part) < 20 and not any(c in part for c in ':：()[]{}') for part in parts):
-                    filtered_lines.extend(parts)
-                else:
-                    filtered_lines.append(line)
-            else:
-                filtered_lines.append(line)
-        else:
-            filtered_lines.append(line)
-
-    # 进一步过滤无效句子
-    final_lines = []
-    for line in filtered_lines:
-        if (line and
-                len(line) > 1 and  # 过滤单字符
-                not line.isdigit() and  # 过滤纯数字
-                not all(c in '()[]{}' for c in line)):  # 过滤纯括号
-            final_lines.append(line)
-
-    return '\n'.join(final_lines)
-
-
 def main():
     """主函数，爬取指定歌手的所有歌词"""
     # 让用户输入歌手名称
@@ -479,45 +292,21 @@ def main():
             pass
     print(f"请求间隔时间设置为: {delay_min}-{delay_max}秒")
 
-    success_count = 0
-    for i, song in enumerate(songs):
-        song_name = song['name']
-        song_id = song['id']
-
-        # 处理歌名中的非法字符，防止保存文件出错
-        safe_song_name = re.sub(r'[\\/:*?"<>|]', '_', song_name)
-
-        # 避免频繁请求被封 IP
-        time.sleep(random.uniform(delay_min, delay_max))
-
-        # 根据不同来源获取歌词
-        lyrics = None
-        if source == "1":
-            lyrics = get_song_lyrics(song_id)
-        elif source == "2":
-            lyrics = get_qq_music_lyrics(song.get('mid', ''))
-        elif source == "3":
-            lyrics = get_kugou_lyrics(song_id)
-
-        if lyrics:
-            # 过滤歌词，去除作词作曲等信息
-            filtered_lyrics = _filter_lyrics_for_storage(lyrics)
-
-            # 保存歌词到文件
-            file_path = os.path.join(LYRICS_DIR, f"{safe_song_name}.txt")
-            try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(filtered_lyrics)
-                print(f"✓ 歌词已保存到: {file_path}")
-                success_count += 1
-            except Exception as e:
-                print(f"× 保存歌词失败: {str(e)}")
-        else:
-            print(f"× 未找到歌曲《{song_name}》的歌词")
+    source_names = {"1": "netease", "2": "qq", "3": "kugou"}
+    fetcher = AsyncLyricsFetcher(host_interval=delay_min, host_jitter=delay_max - delay_min)
+
+    def report(done, total, song_name, ok):
+        mark = "✓ 已保存" if ok else "× 未找到"
+        print(f"{mark}《{song_name}》 当前进度: {done / total * 100:.1f}%")
+
+    async def run():
+        async with fetcher:
+            return await fetcher.download_artist_lyrics(
+                artist_name, LYRICS_DIR, source=source_names.get(source, "netease"), songs=songs,
+                progress=report)
 
-        # 显示进度
-        progress = (i + 1) / len(songs) * 100
-        print(f"当前进度: {progress:.1f}%")
+    # 按主机限速并发下载，避免频繁请求被封 IP
+    success_count, _ = asyncio.run(run())
 
     print(f"\n爬取完成！共成功获取 {success_count}/{len(songs)} 首歌曲的歌词")
     print(f"歌词文件已保存在: {LYRICS_DIR}")
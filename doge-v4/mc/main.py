@@ -1,21 +1,25 @@
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from pathlib import Path
 import astrbot.core.message.components as Comp
 from astrbot.api.event import filter, AstrMessageEvent, MessageEventResult
 from astrbot.api.star import Context, Star, register, StarTools
-from astrbot.api import logger
+from astrbot.api import logger, AstrBotConfig
 from .script.get_server_info import get_server_status
-from .script.get_img import generate_server_info_image
+from .script.get_img import render_server_info_image, render_offline_image, compose_grid, render_trend_image
+from .script.status_cache import StatusCache
 from .script.json_operate import (
     read_json, add_data, del_data, update_data, 
     get_all_servers, get_server_info, get_server_by_name,
-    update_server_status, auto_cleanup_servers
+    update_servers_status, auto_cleanup_servers
 )
 import asyncio
 import re
 from datetime import datetime
 
 # 常量定义
+SERVER_TIMEOUT = 6  # 单个服务器的查询超时（秒）
+TOTAL_TIMEOUT = 15  # /mc 查询所有服务器的总超时（秒）
+
 HELP_INFO = """
 /mchelp 
 --查看帮助
@@ -41,22 +45,41 @@ HELP_INFO = """
 
 /mccleanup
 --手动触发自动清理（删除10天未查询成功的服务器）
+
+/mctrend 服务器名称/ID
+--查看服务器在线人数趋势
 """
 
 @register("astrbot_mcgetter", "QiChen", "查询mc服务器信息和玩家列表,渲染为图片", "1.4.0")
 class MyPlugin(Star):
     """Minecraft服务器信息查询插件"""
     
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, config: Optional[AstrBotConfig] = None):
         """
         初始化插件
 
         Args:
             context: 插件上下文
+            config: 插件配置
         """
         super().__init__(context)
+        self.config = config or {}
+        self.status = StatusCache(
+            get_server_status,
+            freshness=float(self.config.get("snapshot_freshness", 30)),
+            history_size=int(self.config.get("history_size", 288)),
+            poll_interval=float(self.config.get("poll_interval", 300)),
+        )
         logger.info("MyPlugin 初始化完成")
 
+    async def initialize(self):
+        """开启后台轮询时定期刷新所有群登记的服务器"""
+        if self.config.get("background_poll", False):
+            self.status.start(StarTools.get_data_dir("astrbot_mcgetter"), SERVER_TIMEOUT)
+
+    async def terminate(self):
+        await self.status.stop()
+
     @filter.command("mchelp")
     async def get_help(self, event: AstrMessageEvent) -> MessageEventResult:
         """
@@ -112,28 +135,45 @@ class MyPlugin(Star):
                     yield event.plain_result("所有服务器已被清理，请重新添加服务器")
                     return
             
-            message_chain: List[Comp.Image] = []
             servers = json_data.get("servers", {})
-            
-            for server_id, server_info in servers.items():
-                try:
-                    logger.info(f"正在处理服务器: {server_info['name']} (ID: {server_id}), 信息: {server_info}")
-                    mcinfo_img = await self.get_img(server_info['name'], server_info['host'], server_id, str(json_path))
-                    if mcinfo_img:
-                        message_chain.append(Comp.Image.fromBase64(mcinfo_img))
-                        logger.info(f"成功添加图片到消息链，服务器名称: {server_info['name']} (ID: {server_id})")
-                    else:
-                        logger.warning(f"获取服务器 {server_info['name']} (ID: {server_id}) 的图片失败")
-                except Exception as e:
-                    logger.error(f"处理服务器 {server_info['name']} (ID: {server_id}) 时出错: {e}")
-                    continue
-
-            if message_chain:
-                logger.info(f"成功生成消息链，包含 {len(message_chain)} 张图片")
-                yield event.chain_result(message_chain)
-            else:
+
+            # 所有服务器同时查询，单个服务器和整体都有超时
+            tasks = {
+                server_id: asyncio.create_task(self.get_img(server_info['name'], server_info['host'], server_id))
+                for server_id, server_info in servers.items()
+            }
+            done, pending = await asyncio.wait(tasks.values(), timeout=TOTAL_TIMEOUT)
+            for task in pending:
+                task.cancel()
+
+            cards = []
+            results: Dict[str, bool] = {}
+            for server_id, task in tasks.items():
+                server_info = servers[server_id]
+                display_name = f"[{server_id}]{server_info['name']}"
+                if task in done and task.exception() is None:
+                    card, success = task.result()
+                else:
+                    reason = "查询超时"
+                    if task in done:
+                        logger.error(f"处理服务器 {server_info['name']} (ID: {server_id}) 时出错: {task.exception()}")
+                        reason = "查询出错"
+                    card = render_offline_image(display_name, server_info['host'], reason)
+                    success = False
+                cards.append(card)
+                results[server_id] = success
+
+            # 查询状态统一写入一次
+            await update_servers_status(str(json_path), results)
+
+            if not any(results.values()):
                 logger.warning("没有可用的服务器信息")
                 yield event.plain_result("没有可用的服务器信息，请检查服务器是否在线")
+                return
+
+            grid = await asyncio.to_thread(compose_grid, cards)
+            logger.info(f"成功生成服务器信息图片，共 {len(cards)} 个服务器，{sum(results.values())} 个在线")
+            yield event.chain_result([Comp.Image.fromBytes(grid)])
                 
         except Exception as e:
             logger.error(f"执行 mc 命令时出错: {e}")
@@ -337,55 +377,72 @@ class MyPlugin(Star):
             logger.error(f"执行 mccleanup 命令时出错: {e}")
             yield event.plain_result("自动清理时发生错误")
 
-    async def get_img(self, server_name: str, host: str, server_id: Optional[str] = None, json_path: Optional[str] = None) -> Optional[str]:
+    @filter.command("mctrend")
+    async def mctrend(self, event: AstrMessageEvent, identifier: str) -> MessageEventResult:
+        """
+        绘制服务器在线人数趋势图（支持通过名称或ID查找）
+        """
+        logger.info(f"开始执行 mctrend 命令: {identifier}")
+        try:
+            group_id = event.get_group_id()
+            json_path = await self.get_json_path(group_id)
+
+            server_info = await get_server_info(json_path, identifier)
+            if not server_info:
+                yield event.plain_result(f"没有找到服务器 {identifier}")
+                return
+
+            samples = list(self.status.history.get(server_info['host'], ()))
+            if len(samples) < 2:
+                yield event.plain_result("该服务器的历史记录还不够，请稍后再试（开启后台轮询可以自动记录）")
+                return
+
+            display_name = f"[{server_info['id']}]{server_info['name']}"
+            trend_img = await asyncio.to_thread(render_trend_image, display_name, samples)
+            yield event.chain_result([Comp.Image.fromBytes(trend_img)])
+
+        except Exception as e:
+            logger.error(f"执行 mctrend 命令时出错: {e}")
+            yield event.plain_result("绘制趋势图时发生错误")
+
+    async def get_img(self, server_name: str, host: str, server_id: Optional[str] = None) -> Tuple[Any, bool]:
         """
-        获取服务器信息图片
+        查询服务器状态并生成信息卡片
 
         Args:
             server_name: 服务器名称
             host: 服务器地址
             server_id: 服务器ID（可选）
-            json_path: JSON文件路径（用于更新状态）
 
         Returns:
-            图片的base64编码字符串，如果获取失败则返回None
+            (卡片图片, 是否查询成功)，查询失败时返回离线卡片
         """
         logger.info(f"开始获取服务器 {server_name} 的图片，主机地址: {host}")
+        # 如果有服务器ID，则在名称前添加ID
+        display_name = f"[{server_id}]{server_name}" if server_id else server_name
         try:
-            info = await get_server_status(host)
-            if not info:
-                logger.error(f"无法获取服务器 {server_name} 的状态信息")
-                # 更新查询失败状态
-                if json_path and server_id:
-                    await update_server_status(json_path, server_id, False)
-                return None
-
-            # 更新查询成功状态
-            if json_path and server_id:
-                await update_server_status(json_path, server_id, True)
-
-            info['server_name'] = server_name
-            # 如果有服务器ID，则在名称前添加ID
-            display_name = f"[{server_id}]{server_name}" if server_id else server_name
-            
-            mcinfo_img = await generate_server_info_image(
-                players_list=info['players_list'],
-                latency=info['latency'],
-                server_name=display_name,
-                plays_max=info['plays_max'],
-                plays_online=info['plays_online'],
-                server_version=info['server_version'],
-                icon_base64=info['icon_base64']
-            )
-            logger.info(f"成功生成服务器 {server_name} 的图片")
-            return mcinfo_img
-            
-        except Exception as e:
-            logger.error(f"获取服务器 {server_name} 的图片时出错: {e}")
-            # 更新查询失败状态
-            if json_path and server_id:
-                await update_server_status(json_path, server_id, False)
-            return None
+            # 新鲜度窗口内直接使用快照
+            info = (await self.status.query(host, SERVER_TIMEOUT)).info
+        except asyncio.TimeoutError:
+            logger.error(f"查询服务器 {server_name} 超时")
+            return render_offline_image(display_name, host, "查询超时"), False
+
+        if not info:
+            logger.error(f"无法获取服务器 {server_name} 的状态信息")
+            return render_offline_image(display_name, host, "无法连接服务器"), False
+
+        card = await asyncio.to_thread(
+            render_server_info_image,
+            players_list=info['players_list'],
+            latency=info['latency'],
+            server_name=display_name,
+            plays_max=info['plays_max'],
+            plays_online=info['plays_online'],
+            server_version=info['server_version'],
+            icon_base64=info['icon_base64']
+        )
+        logger.info(f"成功生成服务器 {server_name} 的图片")
+        return card, True
 
     async def get_json_path(self, group_id: str) -> Path:
         """
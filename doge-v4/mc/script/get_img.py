@@ -1,54 +1,135 @@
+"""
+服务器信息卡片渲染
+
+字体、默认图标、图标遮罩和卡片背景都只生成一次；服务器图标按内容哈希放进 LRU，
+同一个服务器重复查询时不再重复解码和缩放。渲染函数都是同步的，
+由调用方放到线程池里执行，最终直接返回 PNG 字节。
+"""
 from PIL import Image, ImageDraw, ImageFont
-import asyncio
 import io
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
 import base64
-from typing import Optional
+from typing import List, Optional, Tuple
+
+RESOURCE_DIR = Path(__file__).resolve().parent.parent / 'resource'
+DEFAULT_ICON_PATH = RESOURCE_DIR / 'default_icon.png'
+
+# 配色
+BG_COLOR = (34, 34, 34)
+TEXT_COLOR = (255, 255, 255)
+ACCENT_COLOR = (85, 255, 85)
+WARNING_COLOR = (255, 170, 0)
+ERROR_COLOR = (255, 85, 85)
+
+# 卡片和拼图参数
+CARD_WIDTH = 600
+ICON_SIZE = 64
+LINE_HEIGHT = 30
+GRID_COLUMNS = 2
+GRID_GAP = 10
+ICON_CACHE_SIZE = 256
 
-async def load_font(font_size):
+
+@lru_cache(maxsize=None)
+def load_font(font_size: int) -> ImageFont.ImageFont:
     # 尝试多路径加载
     font_paths = [
-        Path(__file__).resolve().parent.parent/'resource'/'msyh.ttf',
+        RESOURCE_DIR / 'msyh.ttf',
         'msyh.ttf',  # 当前目录
         '/usr/share/fonts/zh_CN/msyh.ttf',  # Linux常见路径
         'C:/Windows/Fonts/msyh.ttc',  # Windows路径
         '/System/Library/Fonts/Supplemental/Songti.ttc'  # macOS路径
     ]
-    
+
     for path in font_paths:
         try:
-            return ImageFont.truetype(path, font_size)
+            return ImageFont.truetype(str(path), font_size)
         except OSError:
             continue
-    
-    # 全部失败时使用默认字体（添加中文支持）
+
+    # 全部失败时使用默认字体
     try:
-        # 尝试加载PIL的默认中文字体
-        return ImageFont.load_default().font_variant(size=font_size)
-    except:
+        return ImageFont.load_default(font_size)
+    except TypeError:
         return ImageFont.load_default()
 
-# 在代码中替换字体加载部分
-title_font = load_font(30)
-text_font = load_font(20)
-small_font = load_font(18)
 
-async def fetch_icon(icon_base64: Optional[str] = None) -> Optional[Image.Image]:
-    """处理Base64编码的服务器图标"""
-    if not icon_base64:
-        return None
-    
-    try:
+class IconCache:
+    """按图标内容哈希缓存解码并缩放好的服务器图标"""
+
+    def __init__(self, max_entries: int = ICON_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, Image.Image] = OrderedDict()
+        # 渲染在线程池里并发执行
+        self.lock = threading.Lock()
+
+    def get(self, icon_base64: Optional[str]) -> Image.Image:
+        if not icon_base64:
+            return default_icon()
         # 去除可能的Base64前缀
         if "," in icon_base64:
             icon_base64 = icon_base64.split(",", 1)[1]
-        icon_data = base64.b64decode(icon_base64)
-        return Image.open(io.BytesIO(icon_data)).convert("RGBA")
-    except Exception as e:
-        print(f"Base64图标解码失败: {str(e)}")
-        return None
+        key = hashlib.sha1(icon_base64.encode("ascii", "ignore")).hexdigest()
+        with self.lock:
+            icon = self.entries.get(key)
+            if icon is not None:
+                self.entries.move_to_end(key)
+                return icon
+        try:
+            icon = decode_icon(base64.b64decode(icon_base64))
+        except Exception as e:
+            print(f"Base64图标解码失败: {str(e)}")
+            return default_icon()
+        with self.lock:
+            self.entries[key] = icon
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return icon
+
+
+icon_cache = IconCache()
+
+
+def decode_icon(data: bytes) -> Image.Image:
+    with Image.open(io.BytesIO(data)) as img:
+        icon = img.convert("RGBA")
+    icon.thumbnail((ICON_SIZE, ICON_SIZE))
+    return icon
+
 
-async def generate_server_info_image(
+@lru_cache(maxsize=1)
+def default_icon() -> Image.Image:
+    return decode_icon(DEFAULT_ICON_PATH.read_bytes())
+
+
+@lru_cache(maxsize=1)
+def icon_mask() -> Image.Image:
+    mask = Image.new("L", (ICON_SIZE, ICON_SIZE), 0)
+    ImageDraw.Draw(mask).rounded_rectangle((0, 0, ICON_SIZE, ICON_SIZE), radius=10, fill=255)
+    return mask
+
+
+@lru_cache(maxsize=32)
+def card_background(height: int, outline: Tuple[int, int, int]) -> Image.Image:
+    """带圆角边框的卡片底图，使用时复制一份"""
+    img = Image.new("RGB", (CARD_WIDTH, height), color=BG_COLOR)
+    ImageDraw.Draw(img).rounded_rectangle(
+        [10, 10, CARD_WIDTH - 10, height - 10], radius=10, outline=outline, width=2
+    )
+    return img
+
+
+def image_to_png(img: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def generate_server_info_image(
     players_list: list,
     latency: int,
     server_name: str,
@@ -56,83 +137,155 @@ async def generate_server_info_image(
     plays_online: int,
     server_version: str,
     icon_base64: Optional[str] = None
-) -> str:
-    """生成服务器信息图片并返回base64编码"""
-    
-    # 异步获取图标
-    server_icon = await fetch_icon(icon_base64)
-    
-    # 配置参数
-    BG_COLOR = (34, 34, 34)
-    TEXT_COLOR = (255, 255, 255)
-    ACCENT_COLOR = (85, 255, 85)
-    WARNING_COLOR = (255, 170, 0)
-    ERROR_COLOR = (255, 85, 85)
-    
-    # 字体配置
-    try:
-        title_font = await load_font(30)
-        text_font = await load_font(20)
-        small_font = await load_font(18)
-    except IOError:
-        title_font = ImageFont.load_default(30)
-        text_font = ImageFont.load_default(20)
-        small_font = ImageFont.load_default(18)
-    
+) -> bytes:
+    """生成服务器信息图片并返回PNG字节"""
+    return image_to_png(render_server_info_image(
+        players_list, latency, server_name, plays_max, plays_online, server_version, icon_base64
+    ))
+
+
+def render_server_info_image(
+    players_list: list,
+    latency: int,
+    server_name: str,
+    plays_max: int,
+    plays_online: int,
+    server_version: str,
+    icon_base64: Optional[str] = None
+) -> Image.Image:
+    """生成单个服务器的信息卡片，没有图标时使用默认图标"""
+    server_icon = icon_cache.get(icon_base64)
+    title_font = load_font(30)
+    text_font = load_font(20)
+    small_font = load_font(18)
+
     # 计算布局参数
-    icon_size = 64 if server_icon else 0
     base_y = 20
-    text_x = 20 + icon_size + 20
-    
+    text_x = 20 + ICON_SIZE + 20
+
     # 自动计算图片高度
-    line_height = 30
     player_lines = (len(players_list) // 4) + 1
-    img_height = 180 + (player_lines * line_height) + (20 if server_icon else 0)
-    
-    # 创建画布
-    img = Image.new("RGB", (600, img_height), color=BG_COLOR)
+    img_height = 180 + (player_lines * LINE_HEIGHT) + 20
+
+    img = card_background(img_height, ACCENT_COLOR).copy()
     draw = ImageDraw.Draw(img)
-    
+
     # 绘制服务器图标
-    if server_icon:
-        icon_mask = Image.new("L", (64, 64), 0)
-        mask_draw = ImageDraw.Draw(icon_mask)
-        mask_draw.rounded_rectangle((0, 0, 64, 64), radius=10, fill=255)
-        server_icon.thumbnail((64, 64))
-        img.paste(server_icon, (20, base_y), icon_mask)
-    
-    # 服务器信息绘制（保持原有绘制逻辑不变）
+    img.paste(server_icon, (20, base_y), icon_mask().crop((0, 0) + server_icon.size))
+
+    # 服务器信息绘制
     draw.text((text_x, base_y), server_name, font=title_font, fill=ACCENT_COLOR)
     base_y += 40
-    
+
     version_text = f"版本: {server_version}"
     latency_color = ACCENT_COLOR if latency < 100 else WARNING_COLOR if latency < 200 else ERROR_COLOR
     latency_text = f"延迟: {latency}ms"
-    
+
     draw.text((text_x, base_y), version_text, font=text_font, fill=TEXT_COLOR)
     draw.text((400, base_y), latency_text, font=text_font, fill=latency_color)
     base_y += 40
-    
+
     online_text = f"在线玩家 ({plays_online}/{plays_max})"
     draw.text((text_x, base_y), online_text, font=text_font, fill=ACCENT_COLOR)
     base_y += 40
-    
+
     if players_list:
         chunks = [players_list[i:i+4] for i in range(0, len(players_list), 4)]
         for chunk in chunks:
             players_line = " • ".join(chunk)
             draw.text((text_x + 20, base_y), players_line, font=small_font, fill=TEXT_COLOR)
-            base_y += line_height
+            base_y += LINE_HEIGHT
     else:
         draw.text((text_x + 20, base_y), "暂无玩家在线", font=small_font, fill=TEXT_COLOR)
-        base_y += line_height
-    
-    draw.rounded_rectangle([10, 10, img.width-10, img.height-10], radius=10, outline=ACCENT_COLOR, width=2)
-    
-    # 转换为base64
-    buffer = io.BytesIO()
-    img.save(buffer, format="PNG")
-    img_base64 = base64.b64encode(buffer.getvalue()).decode("utf-8")
+        base_y += LINE_HEIGHT
+
+    return img
+
+
+def render_offline_image(server_name: str, host: str, reason: str) -> Image.Image:
+    """查询失败或超时的服务器卡片"""
+    title_font = load_font(30)
+    text_font = load_font(20)
+
+    img = card_background(140, ERROR_COLOR).copy()
+    draw = ImageDraw.Draw(img)
+    draw.text((40, 20), server_name, font=title_font, fill=ERROR_COLOR)
+    draw.text((40, 60), f"地址: {host}", font=text_font, fill=TEXT_COLOR)
+    draw.text((40, 95), reason, font=text_font, fill=ERROR_COLOR)
+    return img
+
+
+def compose_grid(cards: List[Image.Image], columns: int = GRID_COLUMNS) -> bytes:
+    """把多张服务器卡片按行拼成一张图片，每行高度取该行最高的卡片，返回PNG字节"""
+    columns = max(1, min(columns, len(cards)))
+    rows = [cards[i:i + columns] for i in range(0, len(cards), columns)]
+    row_heights = [max(card.height for card in row) for row in rows]
+    width = columns * CARD_WIDTH + (columns + 1) * GRID_GAP
+    height = sum(row_heights) + (len(rows) + 1) * GRID_GAP
+
+    grid = Image.new("RGB", (width, height), color=BG_COLOR)
+    y = GRID_GAP
+    for row, row_height in zip(rows, row_heights):
+        x = GRID_GAP
+        for card in row:
+            grid.paste(card, (x, y))
+            x += CARD_WIDTH + GRID_GAP
+        y += row_height + GRID_GAP
+    return image_to_png(grid)
+
+
+def render_trend_image(server_name: str, samples: List[tuple]) -> bytes:
+    """
+    绘制在线人数趋势图，返回PNG字节
+
+    samples 为 (时间戳, 在线人数, 延迟) 列表，延迟为 -1 表示该次查询失败
+    """
+    title_font = load_font(24)
+    small_font = load_font(16)
+
+    width, height = CARD_WIDTH, 300
+    left, right, top, bottom = 60, width - 20, 60, height - 40
+    img = Image.new("RGB", (width, height), color=BG_COLOR)
+    draw = ImageDraw.Draw(img)
+    draw.text((20, 15), f"{server_name} 在线人数趋势", font=title_font, fill=ACCENT_COLOR)
+
+    start, end = samples[0][0], samples[-1][0]
+    span = max(end - start, 1)
+    peak = max(max(online for _, online, _ in samples), 1)
+
+    # 坐标轴和刻度
+    draw.line([(left, top), (left, bottom), (right, bottom)], fill=TEXT_COLOR, width=1)
+    for value in (0, peak):
+        y = bottom - (bottom - top) * value / peak
+        draw.text((left - 10, y), str(value), font=small_font, fill=TEXT_COLOR, anchor="rm")
+        if value:
+            draw.line([(left, y), (right, y)], fill=(70, 70, 70), width=1)
+
+    def point(ts, online):
+        x = left + (right - left) * (ts - start) / span if len(samples) > 1 else (left + right) / 2
+        return x, bottom - (bottom - top) * online / peak
+
+    # 连续在线的采样连成折线，查询失败的采样画成红点并断开折线
+    segment = []
+    for ts, online, latency in samples:
+        if latency < 0:
+            if len(segment) > 1:
+                draw.line(segment, fill=ACCENT_COLOR, width=2)
+            segment = []
+            x, y = point(ts, 0)
+            draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=ERROR_COLOR)
+        else:
+            segment.append(point(ts, online))
+    if len(segment) > 1:
+        draw.line(segment, fill=ACCENT_COLOR, width=2)
+    elif len(segment) == 1:
+        x, y = segment[0]
+        draw.ellipse([x - 3, y - 3, x + 3, y + 3], fill=ACCENT_COLOR)
 
-    # 返回base64 bytes
-    return img_base64
+    online_latency = [latency for _, _, latency in samples if latency >= 0]
+    minutes = span // 60
+    summary = f"最近{minutes}分钟 {len(samples)}次采样  峰值{peak}人"
+    if online_latency:
+        summary += f"  平均延迟{sum(online_latency) // len(online_latency)}ms"
+    draw.text((left, bottom + 10), summary, font=small_font, fill=TEXT_COLOR)
+    return image_to_png(img)
@@ -2,8 +2,6 @@ import asyncio
 import aiohttp
 from mcstatus import JavaServer
 import socket
-import base64
-from pathlib import Path
 import re
 from astrbot.api import logger
 
@@ -23,18 +21,8 @@ async def get_server_status(host):
         plays_online = status.players.online
         server_version = status.version.name
 
-        # 保存服务器图标
-        if status.icon:
-            icon_data = status.icon.split(",")[1]
-        else:
-            image_path = Path(__file__).resolve().parent.parent / 'resource' / 'default_icon.png'
-            with open(image_path, 'rb') as image_file:
-                # 读取图片文件内容
-                image_data = image_file.read()
-                # 对图片数据进行 Base64 编码
-                base64_encoded = base64.b64encode(image_data)
-            # 将编码后的字节数据转换为字符串
-            icon_data = base64_encoded.decode('utf-8')
+        # 保存服务器图标，没有图标时由渲染模块使用缓存的默认图标
+        icon_data = status.icon.split(",", 1)[-1] if status.icon else None
 
         # 查询服务器状态
         if status.players.sample:
@@ -54,7 +42,7 @@ async def get_server_status(host):
             "plays_max": plays_max,  # 最大玩家数
             "plays_online": plays_online,  # 在线玩家数
             "server_version": server_version,  # 服务器游戏版本
-            "icon_base64": icon_data,  # 服务器图标base64
+            "icon_base64": icon_data,  # 服务器图标base64，没有图标时为None
         }
 
     except (socket.gaierror, ConnectionRefusedError) as e:
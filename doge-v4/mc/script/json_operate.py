@@ -385,6 +385,43 @@ async def update_server_status(json_path: str, identifier: str, success: bool) -
         logger.error(f"更新服务器状态失败: {e}")
         return False
 
+async def update_servers_status(json_path: str, results: Dict[str, bool]) -> bool:
+    """
+    批量更新多个服务器的查询状态，只读写一次文件
+
+    Args:
+        json_path: JSON文件路径
+        results: {服务器ID: 查询是否成功}
+
+    Returns:
+        bool: 更新是否成功
+    """
+    if not results:
+        return True
+    try:
+        data = await read_json(json_path)
+        servers = data.get("servers", {})
+        current_time = int(time.time())
+
+        for server_id, success in results.items():
+            server_info = servers.get(server_id)
+            if not server_info:
+                logger.warning(f"服务器不存在: {server_id}")
+                continue
+            if success:
+                server_info["last_success_time"] = current_time
+                server_info["failed_count"] = 0
+            else:
+                server_info["last_failed_time"] = current_time
+                server_info["failed_count"] = server_info.get("failed_count", 0) + 1
+
+        await write_json(json_path, data)
+        logger.info(f"批量更新 {len(results)} 个服务器的查询状态")
+        return True
+    except Exception as e:
+        logger.error(f"批量更新服务器状态失败: {e}")
+        return False
+
 async def auto_cleanup_servers(json_path: str) -> List[Dict[str, Any]]:
     """
     自动清理长时间未查询成功的服务器
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from astrbot.api import logger
+
+# 查询失败时历史记录里的延迟
+OFFLINE = -1
+
+
+@dataclass
+class ServerSnapshot:
+    """某个地址最近一次的查询结果，info 为 None 表示查询失败"""
+    host: str
+    info: Optional[Dict[str, Any]]
+    time: float = field(default_factory=time.time)
+
+    @property
+    def ok(self) -> bool:
+        return self.info is not None
+
+
+class StatusCache:
+    """
+    服务器状态快照和历史记录
+
+    按服务器地址保存最近一次查询结果，新鲜度窗口内的 /mc 直接使用快照；
+    每个地址另外保存一个定长环形缓冲区 (时间, 在线人数, 延迟)，用于绘制在线人数趋势。
+    同一地址同时只会有一个查询在进行，其他请求等待同一个结果。
+    开启后台轮询时，会定期刷新所有群配置文件里登记的服务器。
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Optional[Dict[str, Any]]]],
+        freshness: float = 30,
+        history_size: int = 288,
+        poll_interval: float = 300,
+        concurrency: int = 16,
+    ):
+        self.fetch = fetch
+        self.freshness = freshness
+        self.history_size = max(1, history_size)
+        self.poll_interval = max(10.0, poll_interval)
+        self.concurrency = max(1, concurrency)
+        self.snapshots: Dict[str, ServerSnapshot] = {}
+        self.history: Dict[str, Deque[Tuple[int, int, int]]] = {}
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.poller: Optional[asyncio.Task] = None
+
+    def fresh_snapshot(self, host: str) -> Optional[ServerSnapshot]:
+        snapshot = self.snapshots.get(host)
+        if snapshot and time.time() - snapshot.time <= self.freshness:
+            return snapshot
+        return None
+
+    def record(self, host: str, info: Optional[Dict[str, Any]]) -> ServerSnapshot:
+        snapshot = ServerSnapshot(host, info)
+        self.snapshots[host] = snapshot
+        samples = self.history.get(host)
+        if samples is None:
+            samples = self.history[host] = deque(maxlen=self.history_size)
+        if info is None:
+            samples.append((int(snapshot.time), 0, OFFLINE))
+        else:
+            samples.append((int(snapshot.time), int(info['plays_online']), int(info['latency'])))
+        return snapshot
+
+    async def query(self, host: str, timeout: float) -> ServerSnapshot:
+        """新鲜度窗口内返回快照，否则实时查询；超时抛出 asyncio.TimeoutError"""
+        snapshot = self.fresh_snapshot(host)
+        if snapshot is not None:
+            return snapshot
+
+        future = self.inflight.get(host)
+        if future is None:
+            future = asyncio.ensure_future(self._refresh(host))
+            self.inflight[host] = future
+            future.add_done_callback(lambda _: self.inflight.pop(host, None))
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    async def _refresh(self, host: str) -> ServerSnapshot:
+        try:
+            info = await self.fetch(host)
+        except Exception as e:
+            logger.error(f"查询服务器 {host} 失败: {e}")
+            info = None
+        return self.record(host, info)
+
+    # ---------- 后台轮询 ----------
+
+    def start(self, data_dir: Path, timeout: float):
+        if self.poller is None or self.poller.done():
+            self.poller = asyncio.create_task(self._poll_loop(data_dir, timeout))
+
+    async def stop(self):
+        if self.poller is not None:
+            self.poller.cancel()
+            self.poller = None
+
+    async def _poll_loop(self, data_dir: Path, timeout: float):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once(data_dir, timeout)
+            except Exception as e:
+                logger.error(f"后台刷新服务器状态失败: {e}")
+            await asyncio.sleep(max(0.0, self.poll_interval - (time.monotonic() - started)))
+
+    async def poll_once(self, data_dir: Path, timeout: float) -> int:
+        """刷新所有群里登记的服务器（同一地址只查询一次），返回查询的地址数"""
+        hosts = await asyncio.to_thread(collect_hosts, data_dir)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(host: str):
+            async with semaphore:
+                try:
+                    await asyncio.wait_for(self._refresh(host), timeout)
+                except asyncio.TimeoutError:
+                    self.record(host, None)
+
+        await asyncio.gather(*(refresh(host) for host in hosts))
+        logger.info(f"后台刷新了 {len(hosts)} 个服务器的状态")
+        return len(hosts)
+
+
+def collect_hosts(data_dir: Path) -> List[str]:
+    """读取所有群的配置文件，返回去重后的服务器地址"""
+    hosts: Dict[str, None] = {}
+    for json_path in sorted(Path(data_dir).glob("*.json")):
+        try:
+            data = json.loads(json_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        servers = data.get("servers", {}) if isinstance(data, dict) else {}
+        for server_info in servers.values():
+            if isinstance(server_info, dict) and server_info.get("host"):
+                hosts.setdefault(server_info["host"], None)
+    return list(hosts)
@@ -0,0 +1,231 @@
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable
+
+import aiohttp
+from astrbot import logger
+
+
+class MemoryLRU:
+    """内存 LRU 缓存，条目带 TTL，总大小按字节数限额"""
+
+    def __init__(self, ttl: float, max_bytes: int):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[Hashable, tuple[float, bytes]] = OrderedDict()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> bytes | None:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        stored_at, data = item
+        if time.time() - stored_at > self.ttl:
+            self._drop(key)
+            return None
+        self._items.move_to_end(key)
+        return data
+
+    def put(self, key: Hashable, data: bytes, stored_at: float | None = None):
+        if len(data) > self.max_bytes:
+            return
+        if key in self._items:
+            self._drop(key)
+        self._items[key] = (time.time() if stored_at is None else stored_at, data)
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._items)))
+
+    def clear(self):
+        self._items.clear()
+        self.size = 0
+
+    def _drop(self, key: Hashable):
+        _, data = self._items.pop(key)
+        self.size -= len(data)
+
+
+class ImageCache:
+    """图片下载缓存：共享 HTTP 会话 + 内存 LRU + 磁盘缓存，均带 TTL 并按字节数限额"""
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        ttl: float = 3600,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        max_disk_bytes: int = 256 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self.cache_dir = cache_dir
+
+        self._memory = MemoryLRU(ttl, max_memory_bytes)
+        self._disk_index: dict[str, tuple[float, int]] = {}  # 文件名 -> (mtime, size)
+        self._disk_bytes = 0
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._session: aiohttp.ClientSession | None = None
+
+        # coalesced: 同一链接正在下载时加入等待的请求，不计入命中率
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "errors": 0, "coalesced": 0}
+
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file():
+                    st = entry.stat()
+                    self._disk_index[entry.name] = (st.st_mtime, st.st_size)
+                    self._disk_bytes += st.st_size
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=8),
+                timeout=aiohttp.ClientTimeout(total=15),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"命中率: {self.hit_rate():.1%}\n"
+            f"内存命中: {self.stats['memory_hits']}，磁盘命中: {self.stats['disk_hits']}，"
+            f"未命中: {self.stats['misses']}，合并请求: {self.stats['coalesced']}，失败: {self.stats['errors']}\n"
+            f"内存占用: {len(self._memory)} 张 / {self._memory.size / 1024 / 1024:.1f}MB\n"
+            f"磁盘占用: {len(self._disk_index)} 张 / {self._disk_bytes / 1024 / 1024:.1f}MB"
+        )
+
+    # ---------- 磁盘层 ----------
+
+    def _disk_read(self, name: str) -> bytes | None:
+        assert self.cache_dir is not None
+        try:
+            return (self.cache_dir / name).read_bytes()
+        except OSError:
+            return None
+
+    def _disk_write(self, name: str, data: bytes) -> float:
+        assert self.cache_dir is not None
+        path = self.cache_dir / name
+        path.write_bytes(data)
+        return path.stat().st_mtime
+
+    def _disk_remove(self, names: list[str]):
+        assert self.cache_dir is not None
+        for name in names:
+            try:
+                (self.cache_dir / name).unlink()
+            except OSError:
+                pass
+
+    def _disk_forget(self, name: str) -> str:
+        _, size = self._disk_index.pop(name)
+        self._disk_bytes -= size
+        return name
+
+    async def _disk_get(self, name: str) -> tuple[float, bytes] | None:
+        entry = self._disk_index.get(name)
+        if entry is None:
+            return None
+        mtime, _ = entry
+        if time.time() - mtime > self.ttl:
+            await asyncio.to_thread(self._disk_remove, [self._disk_forget(name)])
+            return None
+        data = await asyncio.to_thread(self._disk_read, name)
+        if data is None:
+            self._disk_forget(name)
+            return None
+        return mtime, data
+
+    async def _disk_put(self, name: str, data: bytes):
+        if len(data) > self.max_disk_bytes:
+            return
+        if name in self._disk_index:
+            self._disk_forget(name)
+        mtime = await asyncio.to_thread(self._disk_write, name, data)
+        self._disk_index[name] = (mtime, len(data))
+        self._disk_bytes += len(data)
+        if self._disk_bytes > self.max_disk_bytes:
+            # 按修改时间从旧到新淘汰
+            evicted = []
+            for old in sorted(self._disk_index, key=lambda n: self._disk_index[n][0]):
+                if self._disk_bytes <= self.max_disk_bytes:
+                    break
+                evicted.append(self._disk_forget(old))
+            await asyncio.to_thread(self._disk_remove, evicted)
+
+    # ---------- 对外接口 ----------
+
+    async def get(self, url: str, cache: bool = True) -> bytes | None:
+        """获取图片字节，优先走缓存；同一 URL 的并发请求只下载一次"""
+        if not cache:
+            self.stats["misses"] += 1
+            return await self._download(url)
+
+        if (data := self._memory.get(url)) is not None:
+            self.stats["memory_hits"] += 1
+            return data
+
+        if url in self._inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self._inflight[url])
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            data = await self._fetch(url)
+            future.set_result(data)
+            return data
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # 标记已取出，避免无人等待时告警
+            raise
+        finally:
+            del self._inflight[url]
+
+    async def _fetch(self, url: str) -> bytes | None:
+        name = hashlib.sha1(url.encode()).hexdigest()
+        if self.cache_dir and (item := await self._disk_get(name)):
+            mtime, data = item
+            self.stats["disk_hits"] += 1
+            self._memory.put(url, data, mtime)
+            return data
+
+        self.stats["misses"] += 1
+        data = await self._download(url)
+        if data:
+            self._memory.put(url, data)
+            if self.cache_dir:
+                try:
+                    await self._disk_put(name, data)
+                except OSError as e:
+                    logger.warning(f"图片缓存写入失败: {e}")
+        return data
+
+    async def _download(self, url: str) -> bytes | None:
+        try:
+            async with self._get_session().get(url) as response:
+                response.raise_for_status()
+                return await response.read()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"图片下载失败: {e}")
+            return None
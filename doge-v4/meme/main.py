@@ -1,7 +1,7 @@
 import asyncio
 import base64
+import hashlib
 import random
-import aiohttp
 from meme_generator import (
     DeserializeError,
     ImageAssetMissing,
@@ -18,7 +18,7 @@ from meme_generator.resources import check_resources_in_background
 from meme_generator.tools import MemeProperties, MemeSortBy, render_meme_list
 from astrbot import logger
 from astrbot.api.event import filter
-from astrbot.api.star import Context, Star, register
+from astrbot.api.star import Context, Star, register, StarTools
 from astrbot.core import AstrBotConfig
 from astrbot.core.platform import AstrMessageEvent
 
@@ -26,7 +26,10 @@ import io
 from typing import List, Union
 import astrbot.core.message.components as Comp
 from astrbot.core.star.filter.event_message_type import EventMessageType
-from PIL import Image
+from PIL import Image, ImageSequence
+
+from .image_cache import ImageCache, MemoryLRU
+from .matcher import KeywordMatcher
 
 
 @register(
@@ -45,15 +48,29 @@ class MemePlugin(Star):
         self.sort_by_str: str = config.get("sort_by_str", "key")
 
         self.memes: list[Meme] = get_memes()
-        self.meme_keywords = [
-            keyword for meme in self.memes for keyword in meme.info.keywords
-        ]
+        # 关键词索引，禁用列表变化时重建
+        self.matcher = KeywordMatcher(self.memes, self.memes_disabled_list)
 
         self.prefix: str = config.get("prefix", "")
 
         self.fuzzy_match: int = config.get("fuzzy_match", True)
         self.is_compress_image: bool = config.get("is_compress_image", True)
 
+        # 头像与引用图片缓存，共享同一个 HTTP 会话
+        self.image_cache = ImageCache(
+            cache_dir=StarTools.get_data_dir() / "image_cache",
+            ttl=config.get("image_cache_ttl", 3600),
+            max_memory_bytes=config.get("image_cache_memory_mb", 32) * 1024 * 1024,
+            max_disk_bytes=config.get("image_cache_disk_mb", 256) * 1024 * 1024,
+        )
+
+        # meme 列表图缓存：(排序方式, 禁用列表) -> 图片
+        self._meme_list_cache: dict[tuple, bytes] = {}
+        # 生成结果短期缓存：相同 meme + 图片 + 文本 + 选项直接复用
+        self.result_cache = MemoryLRU(
+            ttl=config.get("result_cache_ttl", 300), max_bytes=64 * 1024 * 1024
+        )
+
         self.is_check_resources: bool = config.get("is_check_resources", True)
         if self.is_check_resources:
             logger.info("正在检查memes资源文件...")
@@ -71,21 +88,35 @@ class MemePlugin(Star):
         }
         sort_by = sort_by_map.get(self.sort_by_str) or MemeSortBy.KeywordsPinyin
 
-        meme_properties: dict[str, MemeProperties] = {}
-        for meme in self.memes:
-            properties = MemeProperties(disabled=False, hot=False, new=False)
-            meme_properties[meme.key] = properties
-
-        # 使用 asyncio.to_thread 来运行同步函数
-        output: bytes | None = await asyncio.to_thread(
-            render_meme_list,  # type: ignore
-            meme_properties=meme_properties,
-            exclude_memes=[],
-            sort_by=sort_by,
-            sort_reverse=False,
-            text_template="{index}. {keywords}",
-            add_category_icon=True,
-        )
+        disabled = set(self.memes_disabled_list)
+        cache_key = (self.sort_by_str, frozenset(disabled))
+        output = self._meme_list_cache.get(cache_key)
+        if output is None:
+            meme_properties: dict[str, MemeProperties] = {}
+            for meme in self.memes:
+                # 所有关键词都被禁用的 meme 标记为禁用
+                keywords = meme.info.keywords
+                is_disabled = bool(disabled) and bool(keywords) and all(
+                    k in disabled for k in keywords
+                )
+                properties = MemeProperties(disabled=is_disabled, hot=False, new=False)
+                meme_properties[meme.key] = properties
+
+            # 使用 asyncio.to_thread 来运行同步函数
+            output = await asyncio.to_thread(
+                render_meme_list,  # type: ignore
+                meme_properties=meme_properties,
+                exclude_memes=[],
+                sort_by=sort_by,
+                sort_reverse=False,
+                text_template="{index}. {keywords}",
+                add_category_icon=True,
+            )
+            if isinstance(output, bytes):
+                # 只保留当前配置对应的一张图
+                self._meme_list_cache = {cache_key: output}
+            else:
+                output = None
         if output:
             yield event.chain_result([Comp.Image.fromBytes(output)])
         else:
@@ -101,8 +132,7 @@ class MemePlugin(Star):
             yield event.plain_result("未指定要查看的meme")
             return
         keyword = str(keyword)
-        target_keyword = next((k for k in self.meme_keywords if k == keyword), None)
-        if target_keyword is None:
+        if keyword not in self.matcher.keywords:
             yield event.plain_result("未支持的meme关键词")
             return
 
@@ -166,13 +196,14 @@ class MemePlugin(Star):
         if not meme_name:
             yield event.plain_result("未指定要禁用的meme")
             return
-        if meme_name not in self.meme_keywords:
+        if meme_name not in self.matcher.keywords:
             yield event.plain_result(f"meme: {meme_name} 不存在")
             return
         if meme_name in self.memes_disabled_list:
             yield event.plain_result(f"meme: {meme_name} 已被禁用")
             return
         self.memes_disabled_list.append(meme_name)
+        self.matcher.rebuild(self.memes_disabled_list)
         self.config.save_config(replace_config=self.config)
         yield event.plain_result(f"已禁用meme: {meme_name}")
         logger.info(f"当前禁用meme: {self.config['memes_disabled_list']}")
@@ -185,13 +216,14 @@ class MemePlugin(Star):
         if not meme_name:
             yield event.plain_result("未指定要禁用的meme")
             return
-        if meme_name not in self.meme_keywords:
+        if meme_name not in self.matcher.keywords:
             yield event.plain_result(f"meme: {meme_name} 不存在")
             return
         if meme_name not in self.memes_disabled_list:
             yield event.plain_result(f"meme: {meme_name} 未被禁用")
             return
         self.memes_disabled_list.remove(meme_name)
+        self.matcher.rebuild(self.memes_disabled_list)
         self.config.save_config(replace_config=self.config)
         yield event.plain_result(f"已禁用meme: {meme_name}")
 
@@ -200,6 +232,11 @@ class MemePlugin(Star):
         """查看禁用的meme"""
         yield event.plain_result(f"当前禁用的meme: {self.memes_disabled_list}")
 
+    @filter.command("meme cache")
+    async def cache_stats(self, event: AstrMessageEvent):
+        """查看图片缓存命中情况"""
+        yield event.plain_result(self.image_cache.summary())
+
     @filter.event_message_type(EventMessageType.ALL)
     async def meme_handle(self, event: AstrMessageEvent):
         """
@@ -240,15 +277,13 @@ class MemePlugin(Star):
             return
 
         if self.fuzzy_match:
-            # 模糊匹配：检查关键词是否在消息字符串中
-            keyword = next((k for k in self.meme_keywords if k in message_str), None)
+            # 模糊匹配：消息中出现的最长的未禁用关键词
+            keyword = self.matcher.match_fuzzy(message_str)
         else:
             # 精确匹配：检查关键词是否等于消息字符串的第一个单词
-            keyword = next(
-                (k for k in self.meme_keywords if k == message_str.split()[0]), None
-            )
+            keyword = self.matcher.match_exact(message_str)
 
-        if not keyword or keyword in self.memes_disabled_list:
+        if not keyword:
             return
 
         # 匹配meme
@@ -258,31 +293,49 @@ class MemePlugin(Star):
             return
 
         # 收集参数
-        meme_images, texts, options = await self._get_parms(event, keyword, meme)
-
-        # 合成表情
-        image: bytes = await self._meme_generate(meme, meme_images, texts, options)
-
-        # 压缩图片
-        if self.is_compress_image:
-            try:
-                image = self.compress_image(image) or image
-            except:  # noqa: E722
-                pass
+        images, texts, options = await self._get_parms(event, keyword, meme)
+
+        cache_key = self._result_key(meme, images, texts, options)
+        image = self.result_cache.get(cache_key)
+        if image is None:
+            # 合成表情
+            meme_images = [MemeImage(name, data) for name, data in images]
+            image = await self._meme_generate(meme, meme_images, texts, options)
+
+            # 压缩图片
+            if self.is_compress_image:
+                try:
+                    image = await asyncio.to_thread(self.compress_image, image) or image
+                except:  # noqa: E722
+                    pass
+            self.result_cache.put(cache_key, image)
 
         # 发送图片
         chain = [Comp.Image.fromBytes(image)]
         yield event.chain_result(chain)  # type: ignore
 
+    @staticmethod
+    def _result_key(
+        meme: Meme, images: list[tuple[str, bytes]], texts: list[str], options: dict
+    ) -> tuple:
+        """生成结果缓存键：meme key + 图片摘要 + 文本 + 选项"""
+        image_digests = tuple(
+            (name, hashlib.sha1(data).hexdigest()) for name, data in images
+        )
+        return (
+            meme.key,
+            image_digests,
+            tuple(texts),
+            tuple(sorted((k, str(v)) for k, v in options.items())),
+        )
+
     def _find_meme(self, keyword: str) -> Meme | None:
         """根据关键词寻找meme"""
-        for meme in self.memes:
-            if keyword == meme.key or any(k == keyword for k in meme.info.keywords):
-                return meme
+        return self.matcher.find_meme(keyword)
 
     async def _get_parms(self, event: AstrMessageEvent, keyword: str, meme: Meme):
         """收集参数"""
-        meme_images: list[MemeImage] = []
+        meme_images: list[tuple[str, bytes]] = []
         texts: List[str] = []
         options: dict[str, Union[bool, str, int, float]] = {}
 
@@ -301,13 +354,16 @@ class MemePlugin(Star):
         target_ids: list[str] = []
         target_names: list[str] = []
 
+        # 并发预取本次需要的所有图片和头像，后续逐段处理时直接命中缓存
+        await self._prefetch_images(messages, send_id, self_id, max_images)
+
         async def _process_segment(_seg, name):
             """从消息段中获取参数"""
             if isinstance(_seg, Comp.Image):
                 if hasattr(_seg, "url") and _seg.url:
                     img_url = _seg.url
                     if file_content := await self.download_image(img_url):
-                        meme_images.append(MemeImage(name, file_content))
+                        meme_images.append((name, file_content))
 
                 elif hasattr(_seg, "file"):
                     file_content = _seg.file
@@ -316,7 +372,7 @@ class MemePlugin(Star):
                             file_content = file_content[len("base64://") :]
                         file_content = base64.b64decode(file_content)
                     if isinstance(file_content, bytes):
-                        meme_images.append(MemeImage(name, file_content))
+                        meme_images.append((name, file_content))
 
             elif isinstance(_seg, Comp.At):
                 seg_qq = str(_seg.qq)
@@ -328,7 +384,7 @@ class MemePlugin(Star):
                             nickname, sex = result
                             options["name"], options["gender"] = nickname, sex
                             target_names.append(nickname)
-                            meme_images.append(MemeImage(nickname, at_avatar))
+                            meme_images.append((nickname, at_avatar))
 
             elif isinstance(_seg, Comp.Plain):
                 plains: list[str] = _seg.text.strip().split()
@@ -359,10 +415,10 @@ class MemePlugin(Star):
         # 确保图片数量在min_images到max_images之间(尽可能地获取图片)
         if len(meme_images) < max_images:
             if use_avatar := await self.get_avatar(event, send_id):
-                meme_images.insert(0, MemeImage(sender_name, use_avatar))
+                meme_images.insert(0, (sender_name, use_avatar))
         if len(meme_images) < max_images:
             if bot_avatar := await self.get_avatar(event, self_id):
-                meme_images.insert(0, MemeImage("我", bot_avatar))
+                meme_images.insert(0, ("我", bot_avatar))
         meme_images = meme_images[:max_images]
 
         # 确保文本数量在min_texts到max_texts之间(文本参数足够即可)
@@ -437,15 +493,43 @@ class MemePlugin(Star):
         # TODO 适配更多消息平台
 
     @staticmethod
-    def compress_image(image: bytes, max_size: int = 512) -> bytes | None:
-        """压缩静态图片或GIF到max_size大小"""
+    def compress_image(
+        image: bytes, max_size: int = 512, max_frames: int = 60
+    ) -> bytes | None:
+        """压缩静态图片或GIF到max_size大小，GIF帧数过多时抽帧"""
         try:
             # 将输入的bytes加载为图片
             img = Image.open(io.BytesIO(image))
             output = io.BytesIO()
 
             if img.format == "GIF":
-                return
+                n_frames = getattr(img, "n_frames", 1)
+                oversized = img.width > max_size or img.height > max_size
+                if not oversized and n_frames <= max_frames:
+                    return
+                # 均匀抽帧，被丢弃帧的时长合并到保留帧上，保持总时长不变
+                step = -(-n_frames // max_frames)
+                frames: list[Image.Image] = []
+                durations: list[int] = []
+                for i, frame in enumerate(ImageSequence.Iterator(img)):
+                    duration = frame.info.get("duration", 100)
+                    if i % step:
+                        durations[-1] += duration
+                        continue
+                    frame = frame.convert("RGBA")
+                    if oversized:
+                        frame.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+                    frames.append(frame)
+                    durations.append(duration)
+                frames[0].save(
+                    output,
+                    format="GIF",
+                    save_all=True,
+                    append_images=frames[1:],
+                    duration=durations,
+                    loop=img.info.get("loop", 0),
+                    disposal=2,
+                )
             else:
                 # 如果是静态图片，检查尺寸并压缩
                 if img.width > max_size or img.height > max_size:
@@ -459,30 +543,52 @@ class MemePlugin(Star):
         except Exception as e:
             raise ValueError(f"图片压缩失败: {e}")
 
+    async def _prefetch_images(
+        self, messages: list, send_id: str, self_id: str, max_images: int
+    ):
+        """并发下载消息（含引用消息）中的图片、被@者头像，以及可能用到的发送者和bot头像"""
+        if max_images <= 0:
+            return
+        segments = list(messages)
+        reply_seg = next((seg for seg in messages if isinstance(seg, Comp.Reply)), None)
+        if reply_seg and reply_seg.chain:
+            segments.extend(reply_seg.chain)
+
+        urls: list[str] = []
+        for seg in segments:
+            if isinstance(seg, Comp.Image) and getattr(seg, "url", None):
+                urls.append(self._image_url(seg.url))
+            elif isinstance(seg, Comp.At) and str(seg.qq) != self_id:
+                urls.append(self._avatar_url(str(seg.qq)))
+        for user_id in (send_id, self_id):
+            if len(urls) < max_images and user_id.isdigit():
+                urls.append(self._avatar_url(user_id))
+
+        await asyncio.gather(
+            *(self.image_cache.get(url) for url in dict.fromkeys(urls)),
+            return_exceptions=True,
+        )
+
     @staticmethod
-    async def download_image(url: str) -> bytes | None:
-        """下载图片"""
-        url = url.replace("https://", "http://")
-        try:
-            async with aiohttp.ClientSession() as client:
-                response = await client.get(url)
-                img_bytes = await response.read()
-                return img_bytes
-        except Exception as e:
-            logger.error(f"图片下载失败: {e}")
+    def _image_url(url: str) -> str:
+        return url.replace("https://", "http://")
 
     @staticmethod
-    async def get_avatar(event: AstrMessageEvent, user_id: str) -> bytes | None:
+    def _avatar_url(user_id: str) -> str:
+        return f"https://q4.qlogo.cn/headimg_dl?dst_uin={user_id}&spec=640"
+
+    async def download_image(self, url: str) -> bytes | None:
+        """下载图片"""
+        return await self.image_cache.get(self._image_url(url))
+
+    async def get_avatar(self, event: AstrMessageEvent, user_id: str) -> bytes | None:
         """下载头像"""
         # if event.get_platform_name() == "aiocqhttp":
         if not user_id.isdigit():
+            # 随机头像不缓存
             user_id = "".join(random.choices("0123456789", k=9))
-        avatar_url = f"https://q4.qlogo.cn/headimg_dl?dst_uin={user_id}&spec=640"
-        try:
-            async with aiohttp.ClientSession() as client:
-                response = await client.get(avatar_url, timeout=10)
-                response.raise_for_status()
-                return await response.read()
-        except Exception as e:
-            logger.error(f"下载头像失败: {e}")
-            return None
+            return await self.image_cache.get(self._avatar_url(user_id), cache=False)
+        return await self.image_cache.get(self._avatar_url(user_id))
+
+    async def terminate(self):
+        await self.image_cache.close()
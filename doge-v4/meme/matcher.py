@@ -0,0 +1,98 @@
+from collections import deque
+from typing import Iterable
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机，一次扫描找出文本中出现的全部关键词"""
+
+    def __init__(self, patterns: Iterable[str]):
+        # 每个状态：转移表、失败指针、以该状态结尾的最长模式长度
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[str | None] = [None]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(None)
+            state = nxt
+        self._out[state] = pattern
+
+    def _build(self):
+        # 广度优先构造失败指针，并把失败链上最长的输出合并到当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                if self._out[nxt] is None:
+                    self._out[nxt] = self._out[self._fail[nxt]]
+
+    def longest_match(self, text: str) -> str | None:
+        """返回文本中出现的最长关键词，等长时取最先出现的"""
+        best: str | None = None
+        best_start = 0
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found = self._out[state]
+            if found is None:
+                continue
+            start = i - len(found) + 1
+            if best is None or len(found) > len(best) or (
+                len(found) == len(best) and start < best_start
+            ):
+                best, best_start = found, start
+        return best
+
+
+class KeywordMatcher:
+    """关键词 -> meme 的索引，精确匹配查字典，模糊匹配走 Aho-Corasick"""
+
+    def __init__(self, memes: list, disabled: Iterable[str] = ()):
+        self.keyword_map: dict = {}
+        for meme in memes:
+            for name in (meme.key, *meme.info.keywords):
+                self.keyword_map.setdefault(name, meme)
+        self.keywords: set[str] = {
+            keyword for meme in memes for keyword in meme.info.keywords
+        }
+        self.rebuild(disabled)
+
+    def rebuild(self, disabled: Iterable[str]):
+        """禁用列表变化后重建自动机"""
+        self.disabled = set(disabled)
+        self._automaton = AhoCorasick(
+            k for k in self.keywords if k not in self.disabled
+        )
+
+    def find_meme(self, keyword: str):
+        return self.keyword_map.get(keyword)
+
+    def match_exact(self, message: str) -> str | None:
+        words = message.split()
+        if not words:
+            return None
+        keyword = words[0]
+        if keyword in self.keywords and keyword not in self.disabled:
+            return keyword
+        return None
+
+    def match_fuzzy(self, message: str) -> str | None:
+        return self._automaton.longest_match(message)
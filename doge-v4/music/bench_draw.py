@@ -0,0 +1,70 @@
+"""
+歌词渲染基准测试：python bench_draw.py [字体路径]
+
+在插件目录下运行，需要能导入 astrbot；对比完整渲染、缓存命中和旧的逐像素渐变背景。
+"""
+import io
+import sys
+import time
+from pathlib import Path
+
+from PIL import Image
+
+import draw
+
+
+def _legacy_gradient(width, height, top_color, bottom_color) -> Image.Image:
+    """旧实现：逐像素 putpixel 填充渐变背景"""
+    img = Image.new("RGB", (width, height))
+    for y in range(height):
+        ratio = y / height
+        color = tuple(int(t * (1 - ratio) + b * ratio) for t, b in zip(top_color, bottom_color))
+        for x in range(width):
+            img.putpixel((x, y), color)
+    return img
+
+
+def _sample_lyrics(verses: int = 6) -> str:
+    """构造一首完整长度的 LRC 歌词：主歌、副歌交替，约 100 行"""
+    verse = ["夜色慢慢落在城市的尽头", "路灯把影子拉得很长很长", "我数着脚步走过旧的街口",
+             "风里还有那年夏天的味道", "你说过的话在耳边回响", "Some nights I still hear you calling my name"]
+    chorus = ["就让时间停在这一秒", "所有的遗憾都不必再说", "抬头看见星光在闪耀",
+              "我们曾经那样地爱过", "Hold on, hold on to the light", ""]
+    lines = []
+    for i in range(verses):
+        lines.extend(verse if i % 2 == 0 else chorus)
+        lines.extend(chorus)
+        lines.append("")
+    lines = [f"[{i // 20:02d}:{i % 60:02d}.{i * 7 % 100:02d}]{text}" for i, text in enumerate(lines * 2)]
+    return "\n".join(lines[:100])
+
+
+def benchmark(font: str | None = None, repeat: int = 3):
+    if font:
+        draw.font_path = Path(font)
+    lyrics = _sample_lyrics()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        draw._lyrics_cache.clear()
+        pages = draw.draw_lyrics(lyrics)
+    render = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    cached = draw.draw_lyrics(lyrics)
+    hit = time.perf_counter() - start
+    assert cached is pages
+
+    heights = [Image.open(io.BytesIO(page)).height for page in pages]
+    start = time.perf_counter()
+    _legacy_gradient(1000, sum(heights), (255, 250, 240), (235, 255, 247))
+    legacy_background = time.perf_counter() - start
+
+    print(f"歌词 {len(lyrics.splitlines())} 行，{len(pages)} 页，高度 {heights}")
+    print(f"完整渲染:       {render * 1000:.1f} ms")
+    print(f"缓存命中:       {hit * 1000:.3f} ms")
+    print(f"旧实现仅背景:   {legacy_background * 1000:.1f} ms (加速 {legacy_background / render:.0f} 倍)")
+
+
+if __name__ == "__main__":
+    benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -8,11 +8,81 @@ import aiofiles
 from io import BytesIO
 from bs4 import BeautifulSoup
 import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 from astrbot import logger
 
 
 font_path = Path("data/plugins/astrbot_plugin_music/simhei.ttf")
 
+TIMESTAMP_RE = re.compile(r"\[\d{2}:\d{2}(?:\.\d{2,3})?\]")
+# 单张图片的最大高度，超过后分页
+MAX_PAGE_HEIGHT = 4000
+PAGE_PADDING = 50
+# 相同歌词和参数的渲染结果缓存
+LYRICS_CACHE_SIZE = 32
+_lyrics_cache: "OrderedDict[tuple, list[bytes]]" = OrderedDict()
+_lyrics_cache_lock = threading.Lock()
+
+
+@lru_cache(maxsize=8)
+def _load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+
+@lru_cache(maxsize=32)
+def _gradient_strip(height: int, top_color: tuple, bottom_color: tuple) -> Image.Image:
+    """1 像素宽的竖向渐变条，使用时横向拉伸到图片宽度"""
+    data = bytearray()
+    for y in range(height):
+        ratio = y / height
+        data.extend(
+            int(top * (1 - ratio) + bottom * ratio)
+            for top, bottom in zip(top_color, bottom_color)
+        )
+    return Image.frombytes("RGB", (1, height), bytes(data))
+
+
+def _gradient(width: int, height: int, top_color: tuple, bottom_color: tuple) -> Image.Image:
+    return _gradient_strip(height, tuple(top_color), tuple(bottom_color)).resize(
+        (width, height), Image.NEAREST
+    )
+
+
+def _paginate(heights: list[int], line_spacing: int, target: float) -> list[tuple[int, int]]:
+    """贪心分页：下一行放进来会让本页内容超过 target 时换页"""
+    pages = []
+    start, used = 0, 0
+    for i, height in enumerate(heights):
+        if i > start and used + height > target:
+            pages.append((start, i))
+            start, used = i, 0
+        used += height + line_spacing
+    pages.append((start, len(heights)))
+    return pages
+
+
+def _split_pages(heights: list[int], line_spacing: int, max_height: int) -> list[tuple[int, int]]:
+    """
+    把行分成若干页，返回每页的 (起始行, 结束行)
+
+    每页连同上下边距不超过 max_height（单独一行就超过的除外），
+    在页数最少的前提下二分出最小的单页内容高度，让各页高度尽量均匀。
+    """
+    limit = max_height - 2 * PAGE_PADDING
+    page_count = len(_paginate(heights, line_spacing, limit))
+    low = max(heights, default=0)
+    high = max(limit, low)
+    while low < high:
+        middle = (low + high) // 2
+        if len(_paginate(heights, line_spacing, middle)) <= page_count:
+            high = middle
+        else:
+            low = middle + 1
+    return _paginate(heights, line_spacing, high)
+
+
 def draw_lyrics(
     lyrics: str,
     image_width=1000,
@@ -21,55 +91,62 @@ def draw_lyrics(
     top_color=(255, 250, 240),  # 暖白色
     bottom_color=(235, 255, 247),
     text_color=(70, 70, 70),
-) -> bytes:
+    max_page_height=MAX_PAGE_HEIGHT,
+) -> list[bytes]:
     """
-    渲染歌词为图片，背景为竖向渐变色，返回 JPEG 字节流。
+    渲染歌词为图片，背景为竖向渐变色，返回每一页的 JPEG 字节流。
+    歌词过长时按 max_page_height 分成多页。
     """
-    # 清除时间戳但保留空白行
-    lines = lyrics.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        cleaned = re.sub(r"\[\d{2}:\d{2}(?:\.\d{2,3})?\]", "", line)
-        cleaned_lines.append(cleaned if cleaned != "" else "")
-
-    # 加载字体
-    font = ImageFont.truetype(font_path, font_size)
-
-    # 计算总高度
-    dummy_img = Image.new("RGB", (image_width, 1))
-    draw = ImageDraw.Draw(dummy_img)
-    line_heights = [
-        draw.textbbox((0, 0), line if line.strip() else "　", font=font)[3]
-        for line in cleaned_lines
-    ]
-    total_height = int(sum(line_heights) + line_spacing * (len(cleaned_lines) - 1) + 100)
-
-    # 创建渐变背景图像
-    img = Image.new("RGB", (image_width, total_height))
-    for y in range(total_height):
-        ratio = y / total_height
-        r = int(top_color[0] * (1 - ratio) + bottom_color[0] * ratio)
-        g = int(top_color[1] * (1 - ratio) + bottom_color[1] * ratio)
-        b = int(top_color[2] * (1 - ratio) + bottom_color[2] * ratio)
-        for x in range(image_width):
-            img.putpixel((x, y), (r, g, b))
-
-    draw = ImageDraw.Draw(img)
-
-    # 绘制歌词文本（居中）
-    y = 50
-    for line, line_height in zip(cleaned_lines, line_heights):
-        text = line if line.strip() else "　"  # 全角空格占位
-        bbox = draw.textbbox((0, 0), text, font=font)
-        text_width = bbox[2] - bbox[0]
-        draw.text(((image_width - text_width) / 2, y), text, font=font, fill=text_color)
-        y += line_height + line_spacing
-
-    # 输出到字节流
-    img_bytes = io.BytesIO()
-    img.save(img_bytes, format="JPEG")
-    img_bytes.seek(0)
-    return img_bytes.getvalue()
+    key = (
+        hashlib.sha1(lyrics.encode("utf-8")).hexdigest(), str(font_path), image_width, font_size,
+        line_spacing, tuple(top_color), tuple(bottom_color), tuple(text_color), max_page_height,
+    )
+    with _lyrics_cache_lock:
+        if key in _lyrics_cache:
+            _lyrics_cache.move_to_end(key)
+            return _lyrics_cache[key]
+
+    # 清除时间戳，空白行用全角空格占位
+    texts = []
+    for line in lyrics.splitlines():
+        cleaned = TIMESTAMP_RE.sub("", line)
+        texts.append(cleaned if cleaned.strip() else "　")
+
+    font = _load_font(str(font_path), font_size)
+
+    # 相同的行（副歌等）只测量和光栅化一次，得到 (左边距, 文字遮罩)
+    glyphs = {}
+    for text in texts:
+        if text not in glyphs:
+            left, _, right, bottom = font.getbbox(text)
+            mask = Image.new("L", (max(right - left, 1), max(bottom, 1)), 0)
+            ImageDraw.Draw(mask).text((-left, 0), text, font=font, fill=255)
+            glyphs[text] = (left, mask)
+    heights = [glyphs[text][1].height for text in texts]
+
+    pages = []
+    for start, end in _split_pages(heights, line_spacing, max_page_height):
+        page_heights = heights[start:end]
+        total_height = int(sum(page_heights) + line_spacing * (len(page_heights) - 1) + 2 * PAGE_PADDING)
+        img = _gradient(image_width, total_height, top_color, bottom_color)
+
+        # 贴上歌词文本（居中）
+        y = PAGE_PADDING
+        for text, line_height in zip(texts[start:end], page_heights):
+            left, mask = glyphs[text]
+            img.paste(text_color, (int((image_width - mask.width) / 2 + left), y), mask)
+            y += line_height + line_spacing
+
+        # 输出到字节流
+        img_bytes = io.BytesIO()
+        img.save(img_bytes, format="JPEG")
+        pages.append(img_bytes.getvalue())
+
+    with _lyrics_cache_lock:
+        _lyrics_cache[key] = pages
+        while len(_lyrics_cache) > LYRICS_CACHE_SIZE:
+            _lyrics_cache.popitem(last=False)
+    return pages
 
 
 
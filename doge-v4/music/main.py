@@ -1,4 +1,5 @@
 
+import asyncio
 import random
 import traceback
 from astrbot.api.event import filter, AstrMessageEvent
@@ -188,8 +189,8 @@ class MusicPlugin(Star):
         # 发送歌词
         if self.enable_lyrics:
             lyrics = await self.api.fetch_lyrics(song_id=song["id"])
-            image = draw_lyrics(lyrics)
-            await event.send(MessageChain(chain=[Comp.Image.fromBytes(image)]))
+            pages = await asyncio.to_thread(draw_lyrics, lyrics)
+            await event.send(MessageChain(chain=[Comp.Image.fromBytes(page) for page in pages]))
 
 
 
@@ -0,0 +1,127 @@
+"""
+胜率（equity）计算
+
+剩余公共牌组合数不多时（转牌、河牌，通常也包括翻牌）精确枚举全部发牌；
+否则用 NumPy 向量化的蒙特卡洛模拟，按批抽样直到用完时间预算或样本上限，
+并给出 95% 置信区间。计算是纯 CPU 的同步函数，调用方应放到线程里执行。
+"""
+import itertools
+import math
+import time
+
+import numpy as np
+
+from .evaluator import CARD_BIT, CARD_KEY, FLUSH_TABLE, RANK_TABLE
+
+_CARD_KEY = np.array(CARD_KEY, dtype=np.int64)
+_CARD_BIT = np.array(CARD_BIT, dtype=np.int64)
+
+_FLUSH = np.zeros(1 << 13, dtype=np.int64)
+for _mask, _score in FLUSH_TABLE.items():
+    _FLUSH[_mask] = _score
+
+# 五进制键稀疏分布在 5**13 内，排序后用二分查找代替字典
+_RANK_KEYS = np.array(sorted(RANK_TABLE), dtype=np.int64)
+_RANK_SCORES = np.array([RANK_TABLE[k] for k in _RANK_KEYS.tolist()], dtype=np.int64)
+
+
+def evaluate_batch(cards: np.ndarray) -> np.ndarray:
+    """批量评分，cards 形状为 (N, 5~7)，返回 N 个分值"""
+    scores = _RANK_SCORES[np.searchsorted(_RANK_KEYS, _CARD_KEY[cards].sum(axis=1))]
+    suits = cards & 3
+    bits = _CARD_BIT[cards]
+    for suit in range(4):
+        # 同一花色内点数互不相同，求和即按位或
+        mask = np.where(suits == suit, bits, 0).sum(axis=1)
+        # 7 张牌成同花时不可能有四条或葫芦，同花分值必然更大
+        np.maximum(scores, _FLUSH[mask], out=scores)
+    return scores
+
+
+class EquityResult:
+    def __init__(self, players: int):
+        self.samples = 0
+        self.exact = False
+        self.wins = [0] * players
+        self.ties = [0] * players
+        self._share = np.zeros(players)
+        self._share_sq = np.zeros(players)
+
+    def add(self, scores: np.ndarray):
+        """累计一批发牌结果，scores 形状为 (玩家数, N)"""
+        best = scores.max(axis=0)
+        winners = scores == best
+        counts = winners.sum(axis=0)
+        share = winners / counts
+        self._share += share.sum(axis=1)
+        self._share_sq += (share ** 2).sum(axis=1)
+        solo = counts == 1
+        for i in range(len(self.wins)):
+            self.wins[i] += int((winners[i] & solo).sum())
+            self.ties[i] += int((winners[i] & ~solo).sum())
+        self.samples += scores.shape[1]
+
+    @property
+    def equities(self) -> list:
+        return (self._share / max(self.samples, 1)).tolist()
+
+    @property
+    def margins(self) -> list:
+        """95% 置信区间半宽，精确枚举时为 0"""
+        if self.exact or self.samples < 2:
+            return [0.0] * len(self.wins)
+        n = self.samples
+        mean = self._share / n
+        var = np.maximum(self._share_sq / n - mean ** 2, 0) * n / (n - 1)
+        return (1.96 * np.sqrt(var / n)).tolist()
+
+
+def calculate_equity(
+    hands: list,
+    board: list,
+    time_budget: float = 2.0,
+    max_samples: int = 500000,
+    exact_limit: int = 50000,
+    batch_size: int = 20000,
+    seed=None,
+) -> EquityResult:
+    """计算各玩家胜率
+
+    hands 为每名玩家的两张手牌，board 为已发出的 0~5 张公共牌，均为整数编码。
+    """
+    dead = {c for hand in hands for c in hand} | set(board)
+    deck = np.array([c for c in range(52) if c not in dead], dtype=np.int64)
+    missing = 5 - len(board)
+    result = EquityResult(len(hands))
+
+    hole = np.array(hands, dtype=np.int64)  # (P, 2)
+    fixed = np.array(board, dtype=np.int64)
+
+    def run(runouts: np.ndarray):
+        n = runouts.shape[0]
+        boards = np.concatenate([np.broadcast_to(fixed, (n, len(board))), runouts], axis=1)
+        scores = np.stack([
+            evaluate_batch(np.concatenate([np.broadcast_to(h, (n, 2)), boards], axis=1))
+            for h in hole
+        ])
+        result.add(scores)
+
+    if math.comb(len(deck), missing) <= exact_limit:
+        result.exact = True
+        runouts = np.array(
+            list(itertools.combinations(deck.tolist(), missing)), dtype=np.int64
+        ).reshape(-1, missing) if missing else np.empty((1, 0), dtype=np.int64)
+        for start in range(0, len(runouts), batch_size):
+            run(runouts[start:start + batch_size])
+        return result
+
+    rng = np.random.default_rng(seed)
+    deadline = time.monotonic() + time_budget
+    while result.samples < max_samples:
+        n = min(batch_size, max_samples - result.samples)
+        # 每行取随机数最小的 missing 个位置，即无放回抽样
+        picks = np.argpartition(rng.random((n, len(deck))), missing, axis=1)[:, :missing]
+        run(deck[picks])
+        if time.monotonic() >= deadline:
+            break
+    return result
@@ -0,0 +1,297 @@
+"""
+查表式德州扑克牌型评价
+
+牌编码为 0..51 的整数：rank * 4 + suit，rank 0..12 依次对应 2..A。
+5~7 张牌直接算出一个整数分值，分值越大牌越好，可直接比较：
+    分值 = 类别 << 20 | 最多 5 个关键点数（2..14，每个占 4 位，由高到低）
+类别定义与旧的 legacy_evaluate_5cards 相同（8 同花顺 ... 0 高牌）。
+
+非同花的牌型只取决于点数多重集，用五进制键 sum(5 ** rank) 查表；
+同花只取决于该花色的点数位掩码，用 13 位掩码查表。7 张牌里出现同花时
+不可能同时有四条或葫芦，所以同花可以直接返回。
+"""
+import itertools
+import random
+import sys
+import time
+
+RANKS = ["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
+SUITS = ["♠", "♥", "♦", "♣"]
+
+HAND_NAMES = ["高牌", "一对", "两对", "三条", "顺子", "同花", "葫芦", "四条", "同花顺"]
+
+_RANK_INDEX = {r: i for i, r in enumerate(RANKS)}
+_SUIT_INDEX = {s: i for i, s in enumerate(SUITS)}
+
+# 每张牌对应的五进制键和点数位
+CARD_KEY = [5 ** (c >> 2) for c in range(52)]
+CARD_BIT = [1 << (c >> 2) for c in range(52)]
+
+
+def card_to_int(card: str) -> int:
+    """'10♠' -> 整数编码"""
+    return _RANK_INDEX[card[:-1]] * 4 + _SUIT_INDEX[card[-1]]
+
+
+def int_to_card(card: int) -> str:
+    return RANKS[card >> 2] + SUITS[card & 3]
+
+
+def _pack(category: int, values) -> int:
+    score = category
+    for i in range(5):
+        score = (score << 4) | (values[i] if i < len(values) else 0)
+    return score
+
+
+def _straight_high(mask: int) -> int:
+    """点数位掩码中最大顺子的顶张（2..14），没有顺子返回 0"""
+    for top in range(12, 3, -1):
+        window = 0b11111 << (top - 4)
+        if mask & window == window:
+            return top + 2
+    if mask & 0b1000000001111 == 0b1000000001111:  # A-2-3-4-5
+        return 5
+    return 0
+
+
+def _top_values(mask: int, n: int) -> list:
+    values = []
+    for rank in range(12, -1, -1):
+        if mask >> rank & 1:
+            values.append(rank + 2)
+            if len(values) == n:
+                break
+    return values
+
+
+def _build_tables():
+    straight = [_straight_high(mask) for mask in range(1 << 13)]
+
+    # 同花表：只填 5 张及以上的掩码
+    flush = {}
+    for mask in range(1 << 13):
+        if bin(mask).count("1") < 5:
+            continue
+        high = straight[mask]
+        flush[mask] = _pack(8, [high]) if high else _pack(5, _top_values(mask, 5))
+
+    # 点数多重集表：枚举 5~7 张牌的所有点数组合（每个点数最多 4 张）
+    ranks_table = {}
+    for n in (5, 6, 7):
+        for combo in itertools.combinations_with_replacement(range(12, -1, -1), n):
+            # combo 按点数从大到小排列，统计成 (张数, 点数) 分组
+            groups = []
+            mask = key = 0
+            top = 1
+            for r in combo:
+                key += CARD_KEY[r << 2]
+                if mask >> r & 1:
+                    g = groups[-1]
+                    g[0] += 1
+                    if g[0] > top:
+                        top = g[0]
+                else:
+                    mask |= 1 << r
+                    groups.append([1, r + 2])
+            if top > 4:
+                continue
+            if top > 1:
+                groups.sort(key=lambda g: g[0], reverse=True)  # 稳定排序，同张数仍按点数降序
+            values = [v for _, v in groups]
+            if top == 4:
+                score = _pack(7, [values[0], max(values[1:])])
+            elif top == 3 and groups[1][0] >= 2:
+                score = _pack(6, values[:2])
+            elif straight[mask]:
+                score = _pack(4, [straight[mask]])
+            elif top == 3:
+                score = _pack(3, values[:3])
+            elif top == 2 and groups[1][0] == 2:
+                score = _pack(2, values[:2] + [max(values[2:])])
+            elif top == 2:
+                score = _pack(1, values[:4])
+            else:
+                score = _pack(0, values[:5])
+            ranks_table[key] = score
+    return flush, ranks_table
+
+
+FLUSH_TABLE, RANK_TABLE = _build_tables()
+
+
+def evaluate(cards) -> int:
+    """对 5~7 张整数编码的牌评分"""
+    key = 0
+    s0 = s1 = s2 = s3 = 0
+    for c in cards:
+        key += CARD_KEY[c]
+        suit = c & 3
+        if suit == 0:
+            s0 |= CARD_BIT[c]
+        elif suit == 1:
+            s1 |= CARD_BIT[c]
+        elif suit == 2:
+            s2 |= CARD_BIT[c]
+        else:
+            s3 |= CARD_BIT[c]
+    for mask in (s0, s1, s2, s3):
+        if mask in FLUSH_TABLE:
+            return FLUSH_TABLE[mask]
+    return RANK_TABLE[key]
+
+
+def evaluate_hand(cards: list) -> int:
+    """对 5~7 张字符串牌（如 '10♠'）评分"""
+    return evaluate([card_to_int(c) for c in cards])
+
+
+def hand_category(score: int) -> int:
+    return score >> 20
+
+
+def hand_name(score: int) -> str:
+    return HAND_NAMES[score >> 20]
+
+
+# -------------------------
+# 旧的字符串评价实现，仅作为等价性校验的参照
+# -------------------------
+def legacy_evaluate_5cards(cards: list) -> tuple:
+    rank_map = {"2":2, "3":3, "4":4, "5":5, "6":6, "7":7, "8":8, "9":9, "10":10, "J":11, "Q":12, "K":13, "A":14}
+    values = []
+    suits = []
+    for card in cards:
+        rank = card[:-1]
+        suit = card[-1]
+        values.append(rank_map[rank])
+        suits.append(suit)
+    values.sort(reverse=True)
+    freq = {}
+    for v in values:
+        freq[v] = freq.get(v, 0) + 1
+    counts = sorted(freq.values(), reverse=True)
+    flush = len(set(suits)) == 1
+    straight = False
+    high_straight = None
+    unique_vals = sorted(set(values))
+    if len(unique_vals) >= 5:
+        for i in range(len(unique_vals)-4):
+            seq = unique_vals[i:i+5]
+            if seq == list(range(seq[0], seq[0]+5)):
+                straight = True
+                high_straight = seq[-1]
+        if set([14,2,3,4,5]).issubset(set(values)):
+            straight = True
+            high_straight = 5
+    if flush and straight:
+        return (8, high_straight, values)
+    elif counts[0] == 4:
+        four_val = max(v for v, c in freq.items() if c == 4)
+        kicker = max(v for v in values if v != four_val)
+        return (7, four_val, kicker)
+    elif counts[0] == 3 and any(c >= 2 for v, c in freq.items() if c >= 2 and v not in [max(v for v, c in freq.items() if c == 3)]):
+        three_val = max(v for v, c in freq.items() if c == 3)
+        pair_val = max(v for v, c in freq.items() if c >= 2 and v != three_val)
+        return (6, three_val, pair_val)
+    elif flush:
+        return (5, values)
+    elif straight:
+        return (4, high_straight, values)
+    elif counts[0] == 3:
+        three_val = max(v for v, c in freq.items() if c == 3)
+        kickers = sorted([v for v in values if v != three_val], reverse=True)
+        return (3, three_val, kickers)
+    elif counts[0] == 2 and len([v for v, c in freq.items() if c == 2]) >= 2:
+        pairs = sorted([v for v, c in freq.items() if c == 2], reverse=True)
+        kicker = max(v for v in values if v not in pairs)
+        return (2, pairs, kicker)
+    elif counts[0] == 2:
+        pair_val = max(v for v, c in freq.items() if c == 2)
+        kickers = sorted([v for v in values if v != pair_val], reverse=True)
+        return (1, pair_val, kickers)
+    else:
+        return (0, values)
+
+
+def legacy_evaluate_hand(cards: list) -> tuple:
+    best = None
+    for combo in itertools.combinations(cards, 5):
+        rank = legacy_evaluate_5cards(list(combo))
+        if best is None or rank > best:
+            best = rank
+    return best
+
+
+# -------------------------
+# 校验与基准测试：python evaluator.py [verify|bench]
+# -------------------------
+def _representative_hands():
+    """覆盖全部查表项的代表手牌：每个 7 张点数组合一手（不成同花），每个同花掩码一手"""
+    hands = []
+
+    def walk(rank, left, ranks):
+        if rank == 13:
+            if left == 0:
+                # 按位置轮换花色，同点数不会撞花色，每种花色最多 2 张
+                hands.append([r * 4 + i % 4 for i, r in enumerate(ranks)])
+            return
+        for c in range(min(4, left) + 1):
+            walk(rank + 1, left - c, ranks + [rank] * c)
+
+    walk(0, 7, [])
+    for mask in FLUSH_TABLE:
+        hands.append([r * 4 for r in range(13) if mask >> r & 1])
+    return hands
+
+
+def verify(samples: int = 20000, seed: int = 0) -> int:
+    """与旧实现逐对比较排序关系，返回不一致的数量"""
+    rng = random.Random(seed)
+    deck = list(range(52))
+    hands = _representative_hands()
+    hands += [rng.sample(deck, 7) for _ in range(samples)]
+
+    scored = sorted(
+        (
+            (evaluate(h), legacy_evaluate_hand([int_to_card(c) for c in h]), h)
+            for h in hands
+        ),
+        key=lambda item: item[0],
+    )
+    mismatches = 0
+    for (s1, l1, h1), (s2, l2, h2) in zip(scored, scored[1:]):
+        # 按新分值排序后，旧实现的比较结果必须一致
+        if (s1 == s2) != (l1 == l2) or (s1 < s2) != (l1 < l2):
+            mismatches += 1
+            if mismatches <= 10:
+                print("不一致:", [int_to_card(c) for c in h1], l1, "|", [int_to_card(c) for c in h2], l2)
+    print(f"校验 {len(scored)} 手牌，不一致 {mismatches} 处")
+    return mismatches
+
+
+def benchmark(n: int = 100000, seed: int = 0):
+    rng = random.Random(seed)
+    deck = list(range(52))
+    hands = [rng.sample(deck, 7) for _ in range(n)]
+
+    start = time.perf_counter()
+    for h in hands:
+        evaluate(h)
+    fast = n / (time.perf_counter() - start)
+
+    legacy_hands = [[int_to_card(c) for c in h] for h in hands[: max(1, n // 50)]]
+    start = time.perf_counter()
+    for h in legacy_hands:
+        legacy_evaluate_hand(h)
+    slow = len(legacy_hands) / (time.perf_counter() - start)
+
+    print(f"查表评价: {fast:,.0f} 手/秒")
+    print(f"旧实现:   {slow:,.0f} 手/秒 (加速 {fast / slow:.0f} 倍)")
+
+
+if __name__ == "__main__":
+    mode = sys.argv[1] if len(sys.argv) > 1 else "bench"
+    if mode == "verify":
+        sys.exit(1 if verify() else 0)
+    benchmark()
@@ -1,12 +1,17 @@
-import itertools
 from astrbot.api.all import *
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 from astrbot.api import logger
 from urllib.parse import quote
+import asyncio
 import random
-import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .equity import calculate_equity
+from .evaluator import card_to_int, evaluate_hand, hand_name
+from .store import PokerStore
 
 class PokerGame:
     def __init__(self, buyin: int, small_blind: int, big_blind: int, bet_amount: int, max_players: int):
@@ -49,90 +54,6 @@ class PokerGame:
 
 
 
-# -------------------------
-# 牌型评价函数
-# -------------------------
-def evaluate_5cards(cards: list) -> tuple:
-    """
-    对 5 张牌进行评价，返回一个元组表示手牌强度。
-    数值越大表示手牌越好，元组中第一个元素为类别，其它元素为高牌信息。
-    类别定义：
-        8: 同花顺
-        7: 四条
-        6: 葫芦（满堂红）
-        5: 同花
-        4: 顺子
-        3: 三条
-        2: 两对
-        1: 一对
-        0: 高牌
-    """
-    rank_map = {"2":2, "3":3, "4":4, "5":5, "6":6, "7":7, "8":8, "9":9, "10":10, "J":11, "Q":12, "K":13, "A":14}
-    values = []
-    suits = []
-    for card in cards:
-        rank = card[:-1]
-        suit = card[-1]
-        values.append(rank_map[rank])
-        suits.append(suit)
-    values.sort(reverse=True)
-    freq = {}
-    for v in values:
-        freq[v] = freq.get(v, 0) + 1
-    counts = sorted(freq.values(), reverse=True)
-    flush = len(set(suits)) == 1
-    straight = False
-    high_straight = None
-    unique_vals = sorted(set(values))
-    if len(unique_vals) >= 5:
-        for i in range(len(unique_vals)-4):
-            seq = unique_vals[i:i+5]
-            if seq == list(range(seq[0], seq[0]+5)):
-                straight = True
-                high_straight = seq[-1]
-        if set([14,2,3,4,5]).issubset(set(values)):
-            straight = True
-            high_straight = 5
-    if flush and straight:
-        return (8, high_straight, values)
-    elif counts[0] == 4:
-        four_val = max(v for v, c in freq.items() if c == 4)
-        kicker = max(v for v in values if v != four_val)
-        return (7, four_val, kicker)
-    elif counts[0] == 3 and any(c >= 2 for v, c in freq.items() if c >= 2 and v not in [max(v for v, c in freq.items() if c == 3)]):
-        three_val = max(v for v, c in freq.items() if c == 3)
-        pair_val = max(v for v, c in freq.items() if c >= 2 and v != three_val)
-        return (6, three_val, pair_val)
-    elif flush:
-        return (5, values)
-    elif straight:
-        return (4, high_straight, values)
-    elif counts[0] == 3:
-        three_val = max(v for v, c in freq.items() if c == 3)
-        kickers = sorted([v for v in values if v != three_val], reverse=True)
-        return (3, three_val, kickers)
-    elif counts[0] == 2 and len([v for v, c in freq.items() if c == 2]) >= 2:
-        pairs = sorted([v for v, c in freq.items() if c == 2], reverse=True)
-        kicker = max(v for v in values if v not in pairs)
-        return (2, pairs, kicker)
-    elif counts[0] == 2:
-        pair_val = max(v for v, c in freq.items() if c == 2)
-        kickers = sorted([v for v in values if v != pair_val], reverse=True)
-        return (1, pair_val, kickers)
-    else:
-        return (0, values)
-
-def evaluate_hand(cards: list) -> tuple:
-    """
-    给定 7 张牌（2张手牌+5张公共牌），返回最佳 5 张牌的评价元组。
-    """
-    best = None
-    for combo in itertools.combinations(cards, 5):
-        rank = evaluate_5cards(list(combo))
-        if best is None or rank > best:
-            best = rank
-    return best
-
 # -------------------------
 # 德州扑克插件
 # -------------------------
@@ -142,74 +63,41 @@ class TexasHoldemPoker(Star):
         super().__init__(context)
         self.config = config
         self.games = {}  # 存储各群游戏状态
-        self.tokens_file = os.path.join(os.path.dirname(__file__), "tokens.json")
-        self.tokens = self.load_tokens()
-        # 新增：保存游戏记录和排行榜统计
-        self.game_records_file = os.path.join(os.path.dirname(__file__), "game_records.json")
-        self.game_records = self.load_game_records()
-        self.ranking_file = os.path.join(os.path.dirname(__file__), "ranking.json")
-        self.ranking = self.load_ranking()
-
-    def load_game_records(self):
-        try:
-            if os.path.exists(self.game_records_file):
-                with open(self.game_records_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except Exception as e:
-            print("加载游戏记录失败:", e)
-        return []
-
-    def save_game_records(self):
-        try:
-            with open(self.game_records_file, "w", encoding="utf-8") as f:
-                json.dump(self.game_records, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print("保存游戏记录失败:", e)
-
-    def load_ranking(self):
+        plugin_dir = os.path.dirname(__file__)
+        self.store = PokerStore(os.path.join(plugin_dir, "poker.db"))
+        # 数据库操作都交给同一个单线程执行器，按提交顺序完成，旧的余额快照不会覆盖新的
+        self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poker-db")
+        # 旧版 JSON 数据（tokens.json / game_records.json / ranking.json）首次启动时导入
         try:
-            if os.path.exists(self.ranking_file):
-                with open(self.ranking_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            if self.store.import_json(
+                os.path.join(plugin_dir, "tokens.json"),
+                os.path.join(plugin_dir, "game_records.json"),
+                os.path.join(plugin_dir, "ranking.json"),
+            ):
+                logger.info("已将旧版 JSON 数据导入德州扑克数据库")
         except Exception as e:
-            print("加载排名失败:", e)
-        return {}
-
-    def save_ranking(self):
-        try:
-            with open(self.ranking_file, "w", encoding="utf-8") as f:
-                json.dump(self.ranking, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print("保存排名失败:", e)
-
-    def update_ranking(self, winners: list, game: PokerGame):
-        # winners 为 [(player_id, player_name), ...]
-        for p in game.players:
-            pid = p["id"]
-            name = p["name"]
-            if pid not in self.ranking:
-                self.ranking[pid] = {"name": name, "games_played": 0, "wins": 0}
-            self.ranking[pid]["games_played"] += 1
-            if any(w[0] == pid for w in winners):
-                self.ranking[pid]["wins"] += 1
-        self.save_ranking()
+            logger.error(f"导入旧版 JSON 数据失败: {e}")
+        # 余额常驻内存，变动时只写入发生变化的行
+        self.tokens = self.store.load_balances()
+        self.odds_running = set()  # 正在计算胜率的群，避免同一群重复提交
 
+    async def run_db(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.db_executor, func, *args)
 
-    def load_tokens(self):
+    async def save_tokens(self, group_id: str, *user_ids):
+        group_tokens = self.tokens.get(group_id, {})
+        changed = {uid: group_tokens[uid] for uid in user_ids if uid in group_tokens}
+        if not changed:
+            return
         try:
-            if os.path.exists(self.tokens_file):
-                with open(self.tokens_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            await self.run_db(self.store.set_balances, group_id, changed)
         except Exception as e:
-            print("加载tokens失败:", e)
-        return {}
+            logger.error(f"保存tokens失败: {e}")
 
-    def save_tokens(self):
-        try:
-            with open(self.tokens_file, "w", encoding="utf-8") as f:
-                json.dump(self.tokens, f, ensure_ascii=False, indent=4)
-        except Exception as e:
-            print("保存tokens失败:", e)
+    async def terminate(self):
+        # 排在已提交的写入之后关闭
+        await self.run_db(self.store.close)
+        self.db_executor.shutdown(wait=False)
 
     def get_group_id(self, event: AstrMessageEvent) -> str:
         group_id = event.message_obj.group_id
@@ -245,7 +133,7 @@ class TexasHoldemPoker(Star):
         if group_id not in self.tokens:
             self.tokens[group_id] = {}
         self.tokens[group_id][sender_id] = self.tokens[group_id].get(sender_id, self.config.get("initial_token", 1000)) + amount
-        self.save_tokens()
+        await self.save_tokens(group_id, sender_id)
         yield event.plain_result(f"成功增加 {amount} 代币。你当前余额: {self.tokens[group_id][sender_id]}")
 
     @poker.command("join")
@@ -273,7 +161,7 @@ class TexasHoldemPoker(Star):
             yield event.plain_result(f"余额不足，买入需要 {buyin} 代币。你当前余额: {self.tokens[group_id][sender_id]}")
             return
         self.tokens[group_id][sender_id] -= buyin
-        self.save_tokens()
+        await self.save_tokens(group_id, sender_id)
         game.pot += buyin
         game.players.append({
             "id": sender_id,
@@ -314,7 +202,7 @@ class TexasHoldemPoker(Star):
             winner = active_players[0]
             group_tokens = self.tokens[group_id]
             group_tokens[winner["id"]] += game.pot
-            self.save_tokens()
+            await self.save_tokens(group_id, winner["id"])
             yield event.plain_result(f"只有 {winner['name']} 一人未弃牌，赢得彩池 {game.pot} 代币！")
             del self.games[group_id]
 
@@ -372,7 +260,7 @@ class TexasHoldemPoker(Star):
         big_blind_player["round_bet"] += bb
         game.pot += bb
 
-        self.save_tokens()
+        await self.save_tokens(group_id, small_blind_player["id"], big_blind_player["id"])
         game.current_bet = game.big_blind
         game.phase = "preflop"
         yield event.plain_result(
@@ -410,7 +298,7 @@ class TexasHoldemPoker(Star):
         group_tokens[sender_id] -= required
         player["round_bet"] += required
         game.pot += required
-        self.save_tokens()
+        await self.save_tokens(group_id, sender_id)
         # 完成操作后轮转到下一位活跃玩家
         game.advance_turn()
         yield event.plain_result(f"你已跟注，支付 {required} 代币。当前彩池: {game.pot} 代币。")
@@ -447,7 +335,7 @@ class TexasHoldemPoker(Star):
         game.pot += total_raise
         # 更新当前预注金额为该玩家的总下注
         game.current_bet = player["round_bet"]
-        self.save_tokens()
+        await self.save_tokens(group_id, sender_id)
         game.advance_turn()
         yield event.plain_result(f"你加注了 {increment} 代币，总支付 {total_raise} 代币。当前彩池: {game.pot} 代币，新预注金额: {game.current_bet} 代币。")
 
@@ -474,7 +362,7 @@ class TexasHoldemPoker(Star):
             winner = active_players[0]
             group_tokens = self.tokens[group_id]
             group_tokens[winner["id"]] += game.pot
-            self.save_tokens()
+            await self.save_tokens(group_id, winner["id"])
             yield event.plain_result(f"只有 {winner['name']} 一人未弃牌，赢得彩池 {game.pot} 代币！")
             del self.games[group_id]
 
@@ -538,7 +426,6 @@ class TexasHoldemPoker(Star):
     @poker.command("showdown")
     async def showdown(self, event: AstrMessageEvent):
         '''摊牌：计算最佳手牌，决定赢家，保存详细记录，并输出最终余额'''
-        import time  # 确保导入 time 模块
         group_id = self.get_group_id(event)
         if group_id not in self.games:
             yield event.plain_result("当前群聊没有正在进行的游戏。")
@@ -568,7 +455,7 @@ class TexasHoldemPoker(Star):
                 winners.append((pid, info["name"]))
         msg = "摊牌结果：\n"
         for pid, info in results.items():
-            msg += f"{info['name']}: {info['hand_rank']} (手牌: {' '.join(info['cards'])})\n"
+            msg += f"{info['name']}: {hand_name(info['hand_rank'])} (手牌: {' '.join(info['cards'])})\n"
         if len(winners) == 1:
             winner_name = winners[0][1]
             msg += f"\n赢家是 {winner_name}，赢得彩池 {game.pot} 代币！"
@@ -579,20 +466,19 @@ class TexasHoldemPoker(Star):
             share = game.pot // len(winners)
             for pid, name in winners:
                 self.tokens[group_id][pid] += share
-        self.save_tokens()
 
         # 保存详细游戏记录
         game_record = {
             "group_id": group_id,
             "phase": game.phase,
             "pot": game.pot,
-            "community_cards": game.community_cards,
+            "community_cards": list(game.community_cards),
             "players": [
                 {
                     "id": p["id"],
                     "name": p["name"],
                     "final_bet": p["round_bet"],
-                    "hand": p["cards"],
+                    "hand": list(p["cards"]),
                     "active": p["active"],
                     "hand_rank": results.get(p["id"], {}).get("hand_rank")
                 }
@@ -601,11 +487,13 @@ class TexasHoldemPoker(Star):
             "winners": winners,
             "timestamp": int(time.time())
         }
-        self.game_records.append(game_record)
-        self.save_game_records()
-
-        # 更新排行榜数据
-        self.update_ranking(winners, game)
+        # 余额、牌局记录和排行榜统计在同一事务中写入
+        group_tokens = self.tokens[group_id]
+        balances = {p["id"]: group_tokens[p["id"]] for p in game.players if p["id"] in group_tokens}
+        try:
+            await self.run_db(self.store.record_showdown, group_id, balances, game_record)
+        except Exception as e:
+            logger.error(f"保存摊牌结果失败: {e}")
 
         # 输出参与玩家最终余额信息
         final_balances = "参与玩家最终余额：\n"
@@ -635,6 +523,86 @@ class TexasHoldemPoker(Star):
 
 
 
+    @poker.command("odds")
+    async def show_odds(self, event: AstrMessageEvent):
+        '''胜率：计算每位未弃牌玩家当前的胜率'''
+        group_id = self.get_group_id(event)
+        if group_id not in self.games:
+            yield event.plain_result("当前群聊没有正在进行的游戏。")
+            return
+        game = self.games[group_id]
+        if game.phase not in ("preflop", "flop", "turn", "river"):
+            yield event.plain_result("还未发牌，无法计算胜率。")
+            return
+        active_players = [p for p in game.players if p["active"] and len(p["cards"]) == 2]
+        if len(active_players) < 2:
+            yield event.plain_result("至少需要2名未弃牌玩家才能计算胜率。")
+            return
+        if group_id in self.odds_running:
+            yield event.plain_result("胜率正在计算中，请稍候。")
+            return
+
+        # 先取快照，计算期间牌局变化不影响本次结果
+        names = [p["name"] for p in active_players]
+        hands = [[card_to_int(c) for c in p["cards"]] for p in active_players]
+        board = [card_to_int(c) for c in game.community_cards]
+        self.odds_running.add(group_id)
+        try:
+            result = await asyncio.to_thread(
+                calculate_equity,
+                hands,
+                board,
+                time_budget=self.config.get("odds_time_budget", 2.0),
+                max_samples=self.config.get("odds_max_samples", 500000),
+            )
+        except Exception as e:
+            logger.error(f"胜率计算失败: {e}")
+            yield event.plain_result("胜率计算失败，请稍后再试。")
+            return
+        finally:
+            self.odds_running.discard(group_id)
+
+        if result.exact:
+            msg = f"胜率（精确枚举 {result.samples} 种发牌）：\n"
+        else:
+            msg = f"胜率（蒙特卡洛模拟 {result.samples} 次，95% 置信区间）：\n"
+        for name, equity, margin, wins, ties in zip(
+            names, result.equities, result.margins, result.wins, result.ties
+        ):
+            line = f"{name}: {equity:.1%}"
+            if not result.exact:
+                line += f" ±{margin:.1%}"
+            line += f"（胜 {wins / result.samples:.1%}，平 {ties / result.samples:.1%}）"
+            msg += line + "\n"
+        yield event.plain_result(msg.rstrip())
+
+    @poker.command("rank")
+    async def show_ranking(self, event: AstrMessageEvent):
+        '''排行榜：按胜场数排列的玩家排名'''
+        rows = await self.run_db(self.store.top_players, 10)
+        if not rows:
+            yield event.plain_result("暂无排行数据。")
+            return
+        msg = "德州扑克排行榜：\n"
+        for i, (name, games_played, wins) in enumerate(rows, 1):
+            msg += f"{i}. {name}：{wins} 胜 / {games_played} 局（胜率 {wins / max(games_played, 1):.0%}）\n"
+        yield event.plain_result(msg.rstrip())
+
+    @poker.command("history")
+    async def show_history(self, event: AstrMessageEvent):
+        '''历史：本群最近的摊牌记录'''
+        group_id = self.get_group_id(event)
+        hands = await self.run_db(self.store.recent_hands, group_id, 5)
+        if not hands:
+            yield event.plain_result("本群暂无牌局记录。")
+            return
+        msg = "最近牌局：\n"
+        for record in hands:
+            played_at = time.strftime("%m-%d %H:%M", time.localtime(record["timestamp"]))
+            winners = ", ".join(name for _, name in record["winners"])
+            msg += f"[{played_at}] 彩池 {record['pot']}，公共牌 {' '.join(record['community_cards'])}，赢家 {winners}\n"
+        yield event.plain_result(msg.rstrip())
+
     @poker.command("tokens")
     async def my_tokens(self, event: AstrMessageEvent):
         group_id = self.get_group_id(event)
@@ -685,7 +653,7 @@ class TexasHoldemPoker(Star):
         game.pot += allin_amount
         if player["round_bet"] > game.current_bet:
             game.current_bet = player["round_bet"]
-        self.save_tokens()
+        await self.save_tokens(group_id, sender_id)
         game.advance_turn()
         yield event.plain_result(f"你全压了 {allin_amount} 代币。当前彩池: {game.pot} 代币。")
 
@@ -752,12 +720,14 @@ class TexasHoldemPoker(Star):
         game.pot += sb
         if big_blind_player:
             if group_tokens.get(big_blind_player["id"], 0) < bb:
+                # 小盲已经扣除，先保存再返回
+                await self.save_tokens(group_id, small_blind_player["id"])
                 yield event.plain_result(f"新大盲 {big_blind_player['name']} 余额不足。")
                 return
             group_tokens[big_blind_player["id"]] -= bb
             big_blind_player["round_bet"] = bb
             game.pot += bb
-        self.save_tokens()
+        await self.save_tokens(group_id, *(p["id"] for p in game.players[:2]))
         # 设置当前行动玩家：通常从大盲之后开始（若人数>=3，则索引为2，否则为0）
         if len(game.players) >= 3:
             game.current_turn_index = 2
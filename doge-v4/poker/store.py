@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+class PokerStore:
+    """德州扑克持久化：余额、牌局记录和玩家统计存放在同一个 SQLite 库中
+
+    单连接 + 锁，可以在线程池中调用；每次摊牌的余额、牌局记录和统计
+    在同一个事务里写入。
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_db()
+
+    def _init_db(self):
+        with self.lock, self.conn:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS balances (
+                    group_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    balance INTEGER NOT NULL,
+                    PRIMARY KEY (group_id, user_id)
+                );
+                CREATE TABLE IF NOT EXISTS hands (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    group_id TEXT NOT NULL,
+                    pot INTEGER NOT NULL,
+                    community_cards TEXT NOT NULL,
+                    players TEXT NOT NULL,
+                    winners TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_hands_group ON hands (group_id, id);
+                CREATE TABLE IF NOT EXISTS player_stats (
+                    user_id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    games_played INTEGER NOT NULL DEFAULT 0,
+                    wins INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            """)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # ---------- 余额 ----------
+
+    def load_balances(self) -> dict:
+        """余额表行数只和玩家数有关，启动时整表读入作为内存缓存"""
+        balances = {}
+        with self.lock:
+            for group_id, user_id, balance in self.conn.execute(
+                "SELECT group_id, user_id, balance FROM balances"
+            ):
+                balances.setdefault(group_id, {})[user_id] = balance
+        return balances
+
+    def _upsert_balances(self, group_id: str, balances: dict):
+        self.conn.executemany(
+            "INSERT INTO balances (group_id, user_id, balance) VALUES (?, ?, ?) "
+            "ON CONFLICT (group_id, user_id) DO UPDATE SET balance = excluded.balance",
+            [(group_id, uid, balance) for uid, balance in balances.items()],
+        )
+
+    def set_balances(self, group_id: str, balances: dict):
+        """只写入发生变化的玩家余额"""
+        with self.lock, self.conn:
+            self._upsert_balances(group_id, balances)
+
+    # ---------- 牌局 ----------
+
+    def _insert_hand(self, record: dict):
+        self.conn.execute(
+            "INSERT INTO hands (group_id, pot, community_cards, players, winners, timestamp) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                record["group_id"],
+                record["pot"],
+                json.dumps(record["community_cards"], ensure_ascii=False),
+                json.dumps(record["players"], ensure_ascii=False),
+                json.dumps(record["winners"], ensure_ascii=False),
+                record["timestamp"],
+            ),
+        )
+
+    def _update_stats(self, players: list, winner_ids: set):
+        self.conn.executemany(
+            "INSERT INTO player_stats (user_id, name, games_played, wins) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT (user_id) DO UPDATE SET name = excluded.name, "
+            "games_played = games_played + 1, wins = wins + excluded.wins",
+            [(pid, name, int(pid in winner_ids)) for pid, name in players],
+        )
+
+    def record_showdown(self, group_id: str, balances: dict, record: dict):
+        """摊牌结算：余额、牌局记录、玩家统计在一个事务内原子写入"""
+        winner_ids = {pid for pid, _ in record["winners"]}
+        players = [(p["id"], p["name"]) for p in record["players"]]
+        with self.lock, self.conn:
+            self._upsert_balances(group_id, balances)
+            self._insert_hand(record)
+            self._update_stats(players, winner_ids)
+
+    def recent_hands(self, group_id: str, limit: int = 5) -> list:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT pot, community_cards, players, winners, timestamp FROM hands "
+                "WHERE group_id = ? ORDER BY id DESC LIMIT ?",
+                (group_id, limit),
+            ).fetchall()
+        return [
+            {
+                "pot": pot,
+                "community_cards": json.loads(cards),
+                "players": json.loads(players),
+                "winners": json.loads(winners),
+                "timestamp": timestamp,
+            }
+            for pot, cards, players, winners, timestamp in rows
+        ]
+
+    def top_players(self, limit: int = 10) -> list:
+        with self.lock:
+            return self.conn.execute(
+                "SELECT name, games_played, wins FROM player_stats "
+                "ORDER BY wins DESC, games_played ASC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+    # ---------- 旧 JSON 数据导入 ----------
+
+    def import_json(self, tokens_file: str, records_file: str, ranking_file: str) -> bool:
+        """首次启动时导入旧版 JSON 文件，只执行一次，返回是否发生了导入"""
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+                return False
+
+        def read(path, default):
+            if not os.path.exists(path):
+                return default
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        tokens = read(tokens_file, {})
+        records = read(records_file, [])
+        ranking = read(ranking_file, {})
+
+        with self.lock, self.conn:
+            for group_id, balances in tokens.items():
+                self._upsert_balances(group_id, balances)
+            for record in records:
+                self._insert_hand(record)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO player_stats (user_id, name, games_played, wins) "
+                "VALUES (?, ?, ?, ?)",
+                [
+                    (pid, info.get("name", pid), info.get("games_played", 0), info.get("wins", 0))
+                    for pid, info in ranking.items()
+                ],
+            )
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('json_imported', '1')")
+        return bool(tokens or records or ranking)
@@ -1,7 +1,10 @@
 import json
 import asyncio
 import os
+import random
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Optional, Tuple, List
@@ -120,9 +123,194 @@ class GameState:
         return group_id in self.active_games
 
 
+# 判题缓存与批量请求
+VALID_VERDICTS = ("是也不是", "不重要", "是", "否")
+
+
+class JudgeStats:
+    """单个群的判题统计：缓存命中与延迟"""
+
+    def __init__(self):
+        self.questions = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.llm_calls = 0
+        self.batched_questions = 0
+        self.total_latency = 0.0
+
+    def record(self, latency: float, hit: Optional[str] = None):
+        self.questions += 1
+        self.total_latency += latency
+        if hit == "exact":
+            self.exact_hits += 1
+        elif hit == "similar":
+            self.similar_hits += 1
+
+    def summary(self) -> str:
+        if not self.questions:
+            return "暂无判题记录"
+        hits = self.exact_hits + self.similar_hits
+        return (
+            f"缓存命中 {hits}/{self.questions}（相同 {self.exact_hits}，相似 {self.similar_hits}），"
+            f"LLM 调用 {self.llm_calls} 次（合并 {self.batched_questions} 问），"
+            f"平均延迟 {self.total_latency / self.questions:.2f} 秒"
+        )
+
+
+class GroupJudge:
+    """单局游戏的判题器
+
+    - 归一化后的相同问题、以及字符二元组相似度超过阈值的近似问题直接复用判定
+    - 没有判断请求在进行时新问题立即发出；请求进行期间到达的问题积攒起来，
+      在请求结束或窗口到期时合并为一次 LLM 调用
+    """
+
+    NEGATIONS = set("不没非无别未")
+
+    def __init__(
+        self,
+        answer: str,
+        judge_one,
+        judge_many,
+        stats: JudgeStats,
+        window: float = 0.8,
+        max_batch: int = 5,
+        similarity: float = 0.85,
+    ):
+        self.answer = answer
+        self.judge_one = judge_one
+        self.judge_many = judge_many
+        self.stats = stats
+        self.window = window
+        self.max_batch = max_batch
+        self.similarity = similarity
+        self.cache: Dict[str, str] = {}  # 归一化问题 -> 判定
+        self.grams: Dict[str, set] = {}  # 归一化问题 -> 二元组集合
+        self.pending: Dict[str, Tuple[str, asyncio.Future]] = {}  # 归一化问题 -> (原问题, 等待中的判定)
+        self.flush_task: Optional[asyncio.Task] = None
+        self.flush_tasks: set = set()  # 立即发出的批次，保留引用防止被回收
+        self.inflight = 0  # 正在进行的 LLM 判断请求数
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        import re
+
+        text = re.sub(r"[\s\W_]+", "", question.lower())
+        return re.sub(r"[吗呢吧啊呀嘛么]+$", "", text)
+
+    @staticmethod
+    def bigrams(text: str) -> set:
+        if len(text) < 2:
+            return {text}
+        return {text[i : i + 2] for i in range(len(text) - 1)}
+
+    def _find_similar(self, key: str) -> Optional[str]:
+        grams = self.bigrams(key)
+        negations = self.NEGATIONS & set(key)
+        for cached, cached_grams in self.grams.items():
+            # 否定词不一致的问题含义相反，不能复用
+            if negations != self.NEGATIONS & set(cached):
+                continue
+            union = len(grams | cached_grams)
+            if union and len(grams & cached_grams) / union >= self.similarity:
+                return self.cache[cached]
+        return None
+
+    async def judge(self, question: str) -> str:
+        start = time.monotonic()
+        key = self.normalize(question)
+
+        if key in self.cache:
+            self.stats.record(time.monotonic() - start, "exact")
+            return self.cache[key]
+        if (verdict := self._find_similar(key)) is not None:
+            self.stats.record(time.monotonic() - start, "similar")
+            return verdict
+
+        if key in self.pending:
+            future = self.pending[key][1]
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self.pending[key] = (question, future)
+            # 没有请求在进行时不必等待合并窗口，直接判断
+            if len(self.pending) >= self.max_batch or self.inflight == 0:
+                self._flush_now()
+            elif self.flush_task is None:
+                self.flush_task = asyncio.create_task(self._flush_later())
+        verdict = await asyncio.shield(future)
+        self.stats.record(time.monotonic() - start)
+        return verdict
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.window)
+        self.flush_task = None
+        await self._flush()
+
+    def _flush_now(self):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+            self.flush_task = None
+        task = asyncio.create_task(self._flush())
+        self.flush_tasks.add(task)
+        task.add_done_callback(self.flush_tasks.discard)
+
+    async def _flush(self):
+        batch, self.pending = self.pending, {}
+        if not batch:
+            return
+        keys = list(batch)
+        questions = [batch[k][0] for k in keys]
+        self.inflight += 1
+        try:
+            self.stats.llm_calls += 1
+            if len(keys) == 1:
+                verdicts = [await self.judge_one(questions[0], self.answer)]
+            else:
+                self.stats.batched_questions += len(keys)
+                verdicts = await self.judge_many(questions, self.answer)
+                # 批量结果缺失的问题单独补判
+                for i, verdict in enumerate(verdicts):
+                    if verdict is None:
+                        self.stats.llm_calls += 1
+                        verdicts[i] = await self.judge_one(questions[i], self.answer)
+        except Exception as e:
+            for _, future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.inflight -= 1
+            # 请求期间积攒的提问不再等待窗口结束，立即合并发出
+            if self.inflight == 0 and self.pending:
+                self._flush_now()
+
+        for key, verdict in zip(keys, verdicts):
+            if verdict in VALID_VERDICTS:
+                self.cache[key] = verdict
+                self.grams[key] = self.bigrams(key)
+            batch[key][1].set_result(verdict)
+
+
 # 网络海龟汤管理
 class NetworkSoupaiStorage(ThreadSafeStoryStorage):
+    """网络题库
+
+    未使用的题目索引预先打乱成一个排列，取题时从末尾弹出，O(1)。
+    使用记录以追加日志的形式写入 ``network_soupai_usage.log``：每行一个已用索引，
+    ``R`` 表示开始新一轮；日志行数超过阈值且超过已用索引数的两倍时压缩为当前已用索引，
+    保证压缩的开销能均摊到追加上。
+    所有文件写入都交给单线程执行器按顺序完成，不阻塞事件循环。
+    """
+
+    COMPACT_THRESHOLD = 1000  # 日志至少超过该行数才压缩
+
     def __init__(self, network_file: str, data_path=None):
+        self.usage_log = data_path / "network_soupai_usage.log" if data_path else None
+        self._log_lines = 0
+        self._unused: List[int] = []
+        self._log_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="soupai-usage"
+        )
         # 初始化基类
         super().__init__("network_soupai", data_path)
         self.network_file = network_file
@@ -144,6 +332,90 @@ class NetworkSoupaiStorage(ThreadSafeStoryStorage):
         except Exception as e:
             logger.error(f"加载网络海龟汤失败: {e}")
             self.stories = []
+        with self.lock:
+            self._reshuffle()
+
+    def load_usage_record(self):
+        """从追加日志加载使用记录，兼容旧版 JSON 记录"""
+        self.used_indexes = set()
+        if not self.usage_log:
+            return
+
+        try:
+            if self.usage_log.exists():
+                with open(self.usage_log, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if line == "R":
+                            self.used_indexes.clear()
+                        elif line.isdigit():
+                            self.used_indexes.add(int(line))
+                        self._log_lines += 1
+                logger.info(
+                    f"从 {self.usage_log} 加载了 {len(self.used_indexes)} 个使用记录"
+                )
+            elif self.usage_file and self.usage_file.exists():
+                with open(self.usage_file, "r", encoding="utf-8") as f:
+                    self.used_indexes = set(json.load(f))
+                logger.info(
+                    f"从旧版记录 {self.usage_file} 迁移了 {len(self.used_indexes)} 个使用记录"
+                )
+                self.save_usage_record()
+        except Exception as e:
+            logger.error(f"加载使用记录失败: {e}")
+            self.used_indexes = set()
+
+    def save_usage_record(self):
+        """将当前使用记录压缩写入日志（后台执行）"""
+        if not self.usage_log:
+            return
+        snapshot = sorted(self.used_indexes)
+        self._log_lines = len(snapshot)
+        self._log_executor.submit(self._write_compacted, snapshot)
+
+    def _record_usage(self, line: str):
+        """追加一条使用记录，必要时改为压缩（调用方持有锁）"""
+        if not self.usage_log:
+            return
+        self._log_lines += 1
+        if self._log_lines > max(self.COMPACT_THRESHOLD, 2 * len(self.used_indexes)):
+            self.save_usage_record()
+        else:
+            self._log_executor.submit(self._append_log, line)
+
+    def _append_log(self, line: str):
+        try:
+            self.usage_log.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.usage_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except Exception as e:
+            logger.error(f"追加使用记录失败: {e}")
+
+    def _write_compacted(self, snapshot: List[int]):
+        try:
+            self.usage_log.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.usage_log.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.writelines(f"{i}\n" for i in snapshot)
+            os.replace(tmp_file, self.usage_log)
+            logger.info(f"压缩了 {len(snapshot)} 个使用记录到 {self.usage_log}")
+        except Exception as e:
+            logger.error(f"保存使用记录失败: {e}")
+
+    def _reshuffle(self):
+        """重建未使用题目的随机排列（调用方持有锁）"""
+        self._unused = [
+            i for i in range(len(self.stories)) if i not in self.used_indexes
+        ]
+        random.shuffle(self._unused)
+
+    def reset_usage(self):
+        """重置使用记录"""
+        with self.lock:
+            self.used_indexes.clear()
+            self._reshuffle()
+            self.save_usage_record()
+            logger.info(f"{self.storage_name} 使用记录已重置")
 
     def get_story(self) -> Optional[Tuple[str, str]]:
         """从网络题库获取一个故事，避免重复（线程安全）"""
@@ -151,27 +423,16 @@ class NetworkSoupaiStorage(ThreadSafeStoryStorage):
             return None
 
         with self.lock:
-            # 获取所有可用的索引（排除已使用的）
-            available_indexes = [
-                i for i in range(len(self.stories)) if i not in self.used_indexes
-            ]
-
             # 如果没有可用题目，清空已用记录，重新开始一轮
-            if not available_indexes:
+            if not self._unused:
                 logger.info("网络题库已全部使用完毕，清空记录重新开始")
                 self.used_indexes.clear()
-                available_indexes = list(range(len(self.stories)))
-                # 立即保存重置后的状态
-                self.save_usage_record()
-
-            # 从可用索引中随机选择一个
-            import random
+                self._reshuffle()
+                self._record_usage("R")
 
-            selected = random.choice(available_indexes)
+            selected = self._unused.pop()
             self.used_indexes.add(selected)
-
-            # 保存使用记录
-            self.save_usage_record()
+            self._record_usage(str(selected))
 
             story = self.stories[selected]
             logger.info(
@@ -179,6 +440,10 @@ class NetworkSoupaiStorage(ThreadSafeStoryStorage):
             )
             return story["puzzle"], story["answer"]
 
+    def close(self):
+        """等待未完成的写入并关闭执行器"""
+        self._log_executor.shutdown(wait=True)
+
     def get_storage_info(self) -> Dict:
         """获取网络题库信息"""
         usage_info = self.get_usage_info()
@@ -234,17 +499,28 @@ class StoryStorage(ThreadSafeStoryStorage):
         except Exception as e:
             logger.error(f"保存故事失败: {e}")
 
-    def add_story(self, puzzle: str, answer: str) -> bool:
+    def add_story(
+            self, puzzle: str, answer: str, difficulty: Optional[str] = None
+    ) -> bool:
         """添加故事到存储库"""
         with self.lock:
             if len(self.stories) >= self.max_size:
-                # 移除最旧的故事
-                self.stories.pop(0)
+                # 优先移除最旧的已用故事，没有则移除最旧的故事
+                removed = min(self.used_indexes) if self.used_indexes else 0
+                self.stories.pop(removed)
+                # 被移除位置之后的已用索引前移一位
+                self.used_indexes = {
+                    i - 1 if i > removed else i
+                    for i in self.used_indexes
+                    if i != removed
+                }
+                self.save_usage_record()
                 logger.info("存储库已满，移除最旧的故事")
 
             story = {
                 "puzzle": puzzle,
                 "answer": answer,
+                "difficulty": difficulty,
                 "created_at": datetime.now().isoformat(),
             }
             self.stories.append(story)
@@ -252,8 +528,8 @@ class StoryStorage(ThreadSafeStoryStorage):
             logger.info(f"添加新故事到存储库，当前存储库大小: {len(self.stories)}")
             return True
 
-    def get_story(self) -> Optional[Tuple[str, str]]:
-        """从存储库获取一个故事，避免重复（线程安全）"""
+    def get_story(self, difficulty: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """从存储库获取一个故事，优先匹配难度，避免重复（线程安全）"""
         if not self.stories:
             return None
 
@@ -271,9 +547,16 @@ class StoryStorage(ThreadSafeStoryStorage):
                 # 立即保存重置后的状态
                 self.save_usage_record()
 
-            # 从可用索引中随机选择一个
-            import random
+            # 优先选择指定难度的题目
+            if difficulty:
+                matched = [
+                    i
+                    for i in available_indexes
+                    if self.stories[i].get("difficulty") == difficulty
+                ]
+                available_indexes = matched or available_indexes
 
+            # 从可用索引中随机选择一个
             selected = random.choice(available_indexes)
             self.used_indexes.add(selected)
 
@@ -286,6 +569,15 @@ class StoryStorage(ThreadSafeStoryStorage):
             )
             return story["puzzle"], story["answer"]
 
+    def reserve_count(self, difficulty: str) -> int:
+        """指定难度的未使用题目数量"""
+        with self.lock:
+            return sum(
+                1
+                for i, story in enumerate(self.stories)
+                if i not in self.used_indexes and story.get("difficulty") == difficulty
+            )
+
     def get_storage_info(self) -> Dict:
         """获取存储库信息"""
         usage_info = self.get_usage_info()
@@ -298,6 +590,205 @@ class StoryStorage(ThreadSafeStoryStorage):
         }
 
 
+# 谜题查重
+class PuzzleDeduper:
+    """基于归一化哈希与字符三元组（shingle）相似度的谜题查重"""
+
+    def __init__(self, threshold: float = 0.6):
+        self.threshold = threshold
+        self.hashes: set[str] = set()
+        self.shingle_sets: List[set] = []
+        self.index: Dict[str, List[int]] = {}  # shingle -> 谜题编号
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        import re
+
+        return re.sub(r"[\s\W_]+", "", text.lower())
+
+    @staticmethod
+    def shingles(text: str, k: int = 3) -> set:
+        if len(text) <= k:
+            return {text}
+        return {text[i : i + k] for i in range(len(text) - k + 1)}
+
+    def is_duplicate(self, puzzle: str) -> bool:
+        import hashlib
+
+        text = self.normalize(puzzle)
+        if hashlib.sha1(text.encode()).hexdigest() in self.hashes:
+            return True
+        shingles = self.shingles(text)
+        # 通过倒排索引只比较至少共享一个 shingle 的谜题
+        shared: Dict[int, int] = {}
+        for sh in shingles:
+            for idx in self.index.get(sh, ()):
+                shared[idx] = shared.get(idx, 0) + 1
+        for idx, inter in shared.items():
+            union = len(shingles) + len(self.shingle_sets[idx]) - inter
+            if union and inter / union >= self.threshold:
+                return True
+        return False
+
+    def add(self, puzzle: str):
+        import hashlib
+
+        text = self.normalize(puzzle)
+        self.hashes.add(hashlib.sha1(text.encode()).hexdigest())
+        shingles = self.shingles(text)
+        idx = len(self.shingle_sets)
+        self.shingle_sets.append(shingles)
+        for sh in shingles:
+            self.index.setdefault(sh, []).append(idx)
+
+
+# 谜题预生成流水线
+class PuzzleGenerationPipeline:
+    """为每个难度维持目标数量的未使用谜题
+
+    - 最多同时进行 concurrency 个生成任务
+    - LLM 调用受令牌桶限制（每小时 rate_per_hour 次）
+    - 新谜题与网络题库、本地存储库查重后才入库
+    """
+
+    def __init__(
+        self,
+        plugin: "SoupaiPlugin",
+        reserve_target: int,
+        concurrency: int,
+        rate_per_hour: int,
+        poll_interval: float = 60,
+    ):
+        self.plugin = plugin
+        self.reserve_target = reserve_target
+        self.concurrency = max(1, concurrency)
+        self.rate_per_hour = max(1, rate_per_hour)
+        self.poll_interval = poll_interval
+        self.enabled = True
+
+        self.tokens = float(self.rate_per_hour)
+        self.last_refill = time.monotonic()
+        self.inflight: Dict[asyncio.Task, str] = {}  # 任务 -> 难度
+        self.deduper: Optional[PuzzleDeduper] = None
+        self._wake = asyncio.Event()
+
+        self.stats = {"generated": 0, "duplicates": 0, "failures": 0}
+
+    def wake(self):
+        """有题目被消耗或手动触发时唤醒流水线"""
+        self._wake.set()
+
+    def _in_window(self) -> bool:
+        start, end = self.plugin.auto_generate_start, self.plugin.auto_generate_end
+        if start == end:
+            return True
+        hour = datetime.now().hour
+        if start < end:
+            return start <= hour < end
+        return hour >= start or hour < end  # 跨午夜
+
+    def _take_token(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(
+            float(self.rate_per_hour),
+            self.tokens + (now - self.last_refill) * self.rate_per_hour / 3600,
+        )
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def _build_deduper(self) -> PuzzleDeduper:
+        deduper = PuzzleDeduper()
+        storages = (self.plugin.online_story_storage, self.plugin.local_story_storage)
+        for storage in storages:
+            for story in storage.stories:
+                deduper.add(story.get("puzzle", ""))
+        return deduper
+
+    def deficits(self) -> Dict[str, int]:
+        """各难度距离目标储备还差多少（已扣除生成中的任务）"""
+        storage = self.plugin.local_story_storage
+        result = {}
+        for difficulty in self.plugin.difficulty_settings:
+            pending = sum(1 for d in self.inflight.values() if d == difficulty)
+            missing = self.reserve_target - storage.reserve_count(difficulty) - pending
+            if missing > 0:
+                result[difficulty] = missing
+        return result
+
+    async def run(self):
+        while True:
+            try:
+                if self.enabled and self._in_window():
+                    self.fill()
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                for task in self.inflight:
+                    task.cancel()
+                break
+            except Exception as e:
+                logger.error(f"谜题生成流水线错误: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    def fill(self):
+        """按缺口启动生成任务，受并发数和调用预算限制"""
+        self.plugin._ensure_story_storages()
+        if self.deduper is None:
+            self.deduper = self._build_deduper()
+        for difficulty, missing in self.deficits().items():
+            for _ in range(missing):
+                if len(self.inflight) >= self.concurrency or not self._take_token():
+                    return
+                task = asyncio.create_task(self._generate(difficulty))
+                self.inflight[task] = difficulty
+                task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task):
+        self.inflight.pop(task, None)
+        if not task.cancelled():
+            # 一个任务结束后立即尝试补位
+            self.wake()
+
+    async def _generate(self, difficulty: str):
+        try:
+            puzzle, answer = await self.plugin.generate_story_with_llm(difficulty)
+        except Exception as e:
+            logger.error(f"预生成谜题失败: {e}")
+            self.stats["failures"] += 1
+            return
+        if not puzzle or not answer or puzzle.startswith("（") or puzzle == "生成失败":
+            self.stats["failures"] += 1
+            return
+        if self.deduper.is_duplicate(puzzle):
+            logger.info(f"预生成谜题与已有谜题重复，已丢弃: {puzzle}")
+            self.stats["duplicates"] += 1
+            return
+        self.deduper.add(puzzle)
+        self.plugin.local_story_storage.add_story(puzzle, answer, difficulty)
+        self.stats["generated"] += 1
+        logger.info(f"预生成谜题成功，难度: {difficulty}")
+
+    def summary(self) -> str:
+        storage = self.plugin.local_story_storage
+        reserves = "，".join(
+            f"{d} {storage.reserve_count(d)}/{self.reserve_target}"
+            for d in self.plugin.difficulty_settings
+        )
+        return (
+            f"• 各难度储备：{reserves}\n"
+            f"• 生成中：{len(self.inflight)}/{self.concurrency}，"
+            f"调用预算：{self.rate_per_hour} 次/小时（剩余 {int(self.tokens)}）\n"
+            f"• 已生成 {self.stats['generated']}，重复丢弃 {self.stats['duplicates']}，"
+            f"失败 {self.stats['failures']}"
+        )
+
+
 # 验证结果类
 class VerificationResult:
     """验证结果类"""
@@ -360,21 +851,25 @@ class SoupaiPlugin(Star):
                 "limit": None,
                 "accept_levels": ["完全还原", "核心推理正确"],
                 "hint_limit": 10,
+                "puzzle_style": "反转直接、推理链条较短，适合新手入门",
             },
             "普通": {
                 "limit": 35,
                 "accept_levels": ["完全还原"],
                 "hint_limit": 5,
+                "puzzle_style": "包含两层左右的误导，推理难度适中",
             },
             "困难": {
                 "limit": 15,
                 "accept_levels": ["完全还原"],
                 "hint_limit": 1,
+                "puzzle_style": "至少包含三个误导点，因果链条较长且隐蔽",
             },
             "666开挂了": {
                 "limit": 5,
                 "accept_levels": ["完全还原"],
                 "hint_limit": 0,
+                "puzzle_style": "多重反转、线索极少且刁钻，需要严密推理才能还原",
             },
         }
         self.group_difficulty: Dict[str, str] = {}
@@ -390,8 +885,23 @@ class SoupaiPlugin(Star):
         # 防止重复调用的状态
         self.generating_games = set()  # 正在生成谜题的群聊ID集合
 
-        # 自动生成状态
-        self.auto_generating = False
+        # 判题统计（按群）与问题合并窗口
+        self.judge_stats: Dict[str, JudgeStats] = {}
+        self.judge_batch_window = self.config.get("judge_batch_window", 0.8)
+
+        # 谜题预生成流水线，在 init 中启动
+        self.reserve_per_difficulty = self.config.get("reserve_per_difficulty", 3)
+        # 储备总数不能超过存储库容量，否则新题会不断挤掉还没用过的储备
+        max_reserve = self.storage_max_size // len(self.difficulty_settings)
+        if self.reserve_per_difficulty > max_reserve:
+            logger.warning(
+                f"每种难度储备 {self.reserve_per_difficulty} 个超过存储库容量 {self.storage_max_size}"
+                f"（{len(self.difficulty_settings)} 种难度），已调整为 {max_reserve} 个"
+            )
+            self.reserve_per_difficulty = max_reserve
+        self.generation_concurrency = self.config.get("generation_concurrency", 2)
+        self.generate_rate_per_hour = self.config.get("generate_rate_per_hour", 20)
+        self.generation_pipeline: Optional[PuzzleGenerationPipeline] = None
         self.auto_generate_task = None
 
     def _ensure_story_storages(self) -> None:
@@ -423,8 +933,14 @@ class SoupaiPlugin(Star):
         # 初始化存储对象
         self._ensure_story_storages()
 
-        # 启动自动生成任务
-        asyncio.create_task(self._start_auto_generate())
+        # 启动谜题预生成流水线
+        self.generation_pipeline = PuzzleGenerationPipeline(
+            self,
+            reserve_target=self.reserve_per_difficulty,
+            concurrency=self.generation_concurrency,
+            rate_per_hour=self.generate_rate_per_hour,
+        )
+        self.auto_generate_task = asyncio.create_task(self.generation_pipeline.run())
 
         online_info = self.online_story_storage.get_storage_info()
         logger.info(
@@ -434,80 +950,17 @@ class SoupaiPlugin(Star):
     async def terminate(self):
         """插件卸载时清理资源"""
         # 停止自动生成
-        self.auto_generating = False
         if self.auto_generate_task:
             self.auto_generate_task.cancel()
+        if self.online_story_storage:
+            await asyncio.to_thread(self.online_story_storage.close)
         logger.info("海龟汤插件已卸载呜呜呜呜呜")
 
-    async def _start_auto_generate(self):
-        """启动自动生成任务"""
-        while True:
-            try:
-                now = datetime.now()
-                current_hour = now.hour
-
-                # 检查是否在自动生成时间范围内
-                if self.auto_generate_start <= current_hour < self.auto_generate_end:
-                    if not self.auto_generating:
-                        # 检查存储库是否已满，如果已满则不启动自动生成
-                        self._ensure_story_storages()
-                        storage_info = self.local_story_storage.get_storage_info()
-                        if storage_info["available"] <= 0:
-                            logger.info(
-                                f"本地存储库已满，跳过自动生成，时间: {current_hour}:00"
-                            )
-                            # 等待1小时后再次检查
-                            await asyncio.sleep(3600)  # 1小时
-                            continue
-
-                        logger.info(f"开始自动生成故事，时间: {current_hour}:00")
-                        self.auto_generating = True
-                        asyncio.create_task(self._auto_generate_loop())
-                else:
-                    if self.auto_generating:
-                        logger.info(f"停止自动生成故事，时间: {current_hour}:00")
-                        self.auto_generating = False
-
-                # 等待1小时后再次检查
-                await asyncio.sleep(3600)  # 1小时
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"自动生成任务错误: {e}")
-                await asyncio.sleep(3600)  # 出错后等待1小时再试
-
-    async def _auto_generate_loop(self):
-        """自动生成循环"""
-        # 确保在运行循环前题库已初始化
-        self._ensure_story_storages()
-        while self.auto_generating:
-            try:
-                # 检查本地存储库是否已满
-                storage_info = self.local_story_storage.get_storage_info()
-                if storage_info["available"] <= 0:
-                    logger.info("本地存储库已满，停止自动生成")
-                    self.auto_generating = False
-                    break
-
-                # 生成一个故事
-                puzzle, answer = await self.generate_story_with_llm()
-                if puzzle and answer and not puzzle.startswith("（"):
-                    self.local_story_storage.add_story(puzzle, answer)
-                    logger.info("自动生成故事成功")
-                else:
-                    logger.warning("自动生成故事失败")
-
-                # 等待5分钟再生成下一个
-                await asyncio.sleep(300)  # 5分钟
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"自动生成故事错误: {e}")
-                await asyncio.sleep(300)  # 出错后等待5分钟再试
-
     # ✅ 生成谜题和答案
-    async def generate_story_with_llm(self) -> Tuple[str, str]:
-        """使用 LLM 生成海龟汤谜题"""
+    async def generate_story_with_llm(
+            self, difficulty: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """使用 LLM 生成海龟汤谜题，可指定目标难度"""
 
         # 根据配置获取指定的生成 LLM 提供商
         if self.generate_llm_provider_id:
@@ -523,7 +976,7 @@ class SoupaiPlugin(Star):
                 logger.error("未配置 LLM 服务商")
                 return "（无法生成题面，请先配置大语言模型）", "（无）"
 
-        prompt = self._build_puzzle_prompt()
+        prompt = self._build_puzzle_prompt(difficulty)
 
         try:
             logger.info("开始调用 LLM 生成谜题...")
@@ -610,7 +1063,7 @@ class SoupaiPlugin(Star):
             logger.error(f"生成谜题失败: {e}")
             return "生成失败", f"LLM 调用出错: {e}"
 
-    def _build_puzzle_prompt(self) -> str:
+    def _build_puzzle_prompt(self, difficulty: Optional[str] = None) -> str:
         """构建谜题生成的提示词"""
         import random
 
@@ -694,6 +1147,10 @@ class SoupaiPlugin(Star):
             f"请基于「{selected_theme}」主题生成一个完全原创的反转推理谜题。"
         )
 
+        style = self.difficulty_settings.get(difficulty, {}).get("puzzle_style")
+        if style:
+            prompt += f"\n【难度】：{difficulty}——{style}。"
+
         return prompt
 
     async def _generate_for_storage(self) -> bool:
@@ -834,46 +1291,60 @@ class SoupaiPlugin(Star):
             return VerificationResult("验证失败", f"解析验证结果时发生错误: {e}")
 
     # ✅ 判断提问的回答方式
-    async def judge_question(self, question: str, true_answer: str) -> str:
-        """使用 LLM 判断用户提问的回答方式"""
-
-        # 根据配置获取指定的判断 LLM 提供商
+    def _get_judge_provider(self):
+        """获取判断 LLM 提供商，失败时返回 (None, 错误提示)"""
         if self.judge_llm_provider_id:
             provider = self.context.get_provider_by_id(self.judge_llm_provider_id)
             if provider is None:
                 logger.error(
                     f"未找到指定的判断 LLM 提供商: {self.judge_llm_provider_id}"
                 )
-                return "（未配置判断 LLM，无法判断）"
+                return None, "（未配置判断 LLM，无法判断）"
         else:
             provider = self.context.get_using_provider()
             if provider is None:
-                return "（未配置 LLM，无法判断）"
+                return None, "（未配置 LLM，无法判断）"
+        return provider, ""
+
+    @staticmethod
+    def _build_judge_criteria() -> str:
+        """判定标准（单问与批量判断共用）"""
+        return (
+            "判定标准：\n"
+            "- \"是\"：\n"
+            "  玩家命中关键事实或行为，且该信息能直接帮助接近真相。缺少部分细节可以忽略，只要不影响推理方向，就判\"是\"。\n"
+            "- \"否\"：\n"
+            "  与真相完全不符，或包含明显错误，会使玩家推理走向错误方向。\n"
+            "- \"不重要\"：\n"
+            "  与故事真相无关，或该信息无法推动推理进展。\n"
+            "- \"是也不是\"：\n"
+            "  玩家命中部分事实，但：\n"
+            "    1) 因果关系不完整或存在偏差；\n"
+            "    2) 表述中包含可能让玩家推理错误的成分；\n"
+            "    3) 忽略了与当前描述直接相关的重要关键点。\n"
+            "  如果只是缺少背景信息，但不影响方向，优先判\"是\"而不是\"是也不是\"。\n\n"
+            "额外说明：\n"
+            "- 不要求玩家一次性说出全部真相。\n"
+            "- 允许玩家只描述真相的一部分，只要方向正确且不会误导，就判\"是\"。\n"
+            "- 对可能误导玩家的陈述要谨慎，宁可判\"是也不是\"。\n"
+            "- 判定时平衡游戏流畅性和推理挑战性。"
+        )
+
+    async def judge_question(self, question: str, true_answer: str) -> str:
+        """使用 LLM 判断用户提问的回答方式"""
+
+        # 根据配置获取指定的判断 LLM 提供商
+        provider, error = self._get_judge_provider()
+        if provider is None:
+            return error
 
         prompt = (
-            f"海龟汤游戏规则：\n"
+            "海龟汤游戏规则：\n"
             f"1. 故事的完整真相是：{true_answer}\n"
             f'2. 玩家提问或陈述："{question}"\n'
-            f"3. 你的任务是判断玩家的说法是否符合真相。\n"
-            f"4. 只能回答：\"是\"、\"否\"、\"不重要\"或\"是也不是\"。\n\n"
-            f"判定标准：\n"
-            f"- \"是\"：\n"
-            f"  玩家命中关键事实或行为，且该信息能直接帮助接近真相。缺少部分细节可以忽略，只要不影响推理方向，就判\"是\"。\n"
-            f"- \"否\"：\n"
-            f"  与真相完全不符，或包含明显错误，会使玩家推理走向错误方向。\n"
-            f"- \"不重要\"：\n"
-            f"  与故事真相无关，或该信息无法推动推理进展。\n"
-            f"- \"是也不是\"：\n"
-            f"  玩家命中部分事实，但：\n"
-            f"    1) 因果关系不完整或存在偏差；\n"
-            f"    2) 表述中包含可能让玩家推理错误的成分；\n"
-            f"    3) 忽略了与当前描述直接相关的重要关键点。\n"
-            f"  如果只是缺少背景信息，但不影响方向，优先判\"是\"而不是\"是也不是\"。\n\n"
-            f"额外说明：\n"
-            f"- 不要求玩家一次性说出全部真相。\n"
-            f"- 允许玩家只描述真相的一部分，只要方向正确且不会误导，就判\"是\"。\n"
-            f"- 对可能误导玩家的陈述要谨慎，宁可判\"是也不是\"。\n"
-            f"- 判定时平衡游戏流畅性和推理挑战性。"
+            "3. 你的任务是判断玩家的说法是否符合真相。\n"
+            "4. 只能回答：\"是\"、\"否\"、\"不重要\"或\"是也不是\"。\n\n"
+            + self._build_judge_criteria()
         )
 
         try:
@@ -885,9 +1356,8 @@ class SoupaiPlugin(Star):
                 system_prompt='你是一个海龟汤推理游戏的助手。你必须严格按照游戏规则回答，只能回答"是"、"否"、"不重要"或"是也不是"，不能添加任何其他内容。',
             )
 
-            valid_responses = {"是", "否", "是也不是", "不重要"}
             reply = llm_resp.completion_text.strip()
-            if reply in valid_responses:
+            if reply in VALID_VERDICTS:
                 return reply
             return "你给ai干宕机了或者有什么其他原因，反正他没好好回复，我也不知道为什么（我努力修过代码了）"
 
@@ -895,6 +1365,64 @@ class SoupaiPlugin(Star):
             logger.error(f"判断问题失败: {e}")
             return "（判断失败，请重试）"
 
+    async def judge_questions_batch(
+            self, questions: List[str], true_answer: str
+    ) -> List[Optional[str]]:
+        """一次 LLM 调用判断多个问题，解析失败的问题返回 None"""
+        import re
+
+        provider, error = self._get_judge_provider()
+        if provider is None:
+            return [error] * len(questions)
+
+        numbered = "\n".join(f'{i}. "{q}"' for i, q in enumerate(questions, 1))
+        prompt = (
+            "海龟汤游戏规则：\n"
+            f"1. 故事的完整真相是：{true_answer}\n"
+            f"2. 玩家的多条提问或陈述如下：\n{numbered}\n"
+            "3. 你的任务是逐条判断玩家的说法是否符合真相，各条之间相互独立。\n"
+            "4. 每条只能回答：\"是\"、\"否\"、\"不重要\"或\"是也不是\"。\n\n"
+            + self._build_judge_criteria()
+            + f"\n\n【输出格式】：每行一条，形如“序号. 判定”，共 {len(questions)} 行，不要输出其他内容。"
+        )
+
+        try:
+            llm_resp: LLMResponse = await provider.text_chat(
+                prompt=prompt,
+                contexts=[],
+                func_tool=None,
+                image_urls=[],
+                system_prompt='你是一个海龟汤推理游戏的助手。你必须严格按照游戏规则逐条回答，每条只能是"是"、"否"、"不重要"或"是也不是"，不能添加任何其他内容。',
+            )
+        except Exception as e:
+            logger.error(f"批量判断问题失败: {e}")
+            return [None] * len(questions)
+
+        verdicts: List[Optional[str]] = [None] * len(questions)
+        verdict_pattern = "|".join(VALID_VERDICTS)
+        for line in llm_resp.completion_text.strip().splitlines():
+            match = re.match(
+                rf"^\s*(\d+)\s*[.、:：)]\s*[\"“]?({verdict_pattern})[\"”]?\s*$", line
+            )
+            if match and 1 <= int(match.group(1)) <= len(questions):
+                verdicts[int(match.group(1)) - 1] = match.group(2)
+        return verdicts
+
+    def _get_group_judge(self, group_id: str, game: Dict, answer: str) -> GroupJudge:
+        """获取本局游戏的判题器，不存在时创建"""
+        judge = game.get("judge")
+        if judge is None or judge.answer != answer:
+            stats = self.judge_stats.setdefault(group_id, JudgeStats())
+            judge = GroupJudge(
+                answer,
+                self.judge_question,
+                self.judge_questions_batch,
+                stats,
+                window=self.judge_batch_window,
+            )
+            game["judge"] = judge
+        return judge
+
     # ✅ 生成方向性提示
     def build_allow_list(self, puzzle: str, qa_history: List[Dict[str, str]]) -> List[str]:
         """根据题面和历史问答构建允许在提示中出现的名词列表"""
@@ -1034,24 +1562,18 @@ class SoupaiPlugin(Star):
             # 根据策略获取谜题
             strategy = self.puzzle_source_strategy
 
+            difficulty = self.group_difficulty.get(group_id, "普通")
+
             # 使用统一的策略方法获取故事
-            story = await self.get_story_by_strategy(strategy)
+            story = await self.get_story_by_strategy(strategy, difficulty)
 
             if not story:
-                yield event.plain_result("获取谜题失败，请重试")
+                yield event.plain_result("题库暂时为空，正在后台生成谜题，请稍后再试")
                 self.generating_games.discard(group_id)
                 return
 
             puzzle, answer = story
 
-            # 检查LLM生成是否失败
-            if puzzle == "（无法生成题面，请先配置大语言模型）":
-                yield event.plain_result(f"生成谜题失败：{answer}")
-                self.generating_games.discard(group_id)
-                return
-
-
-            difficulty = self.group_difficulty.get(group_id, "普通")
             diff_conf = self.difficulty_settings.get(
                 difficulty, self.difficulty_settings["普通"]
             )
@@ -1284,7 +1806,11 @@ class SoupaiPlugin(Star):
 
                     # 使用 LLM 判断回答（是否问答）
                     logger.info(f"使用 LLM 判断游戏问答: '{command_part}'")
-                    reply = await self.judge_question(command_part, current_answer)
+                    if game is not None:
+                        judge = self._get_group_judge(group_id, game, current_answer)
+                        reply = await judge.judge(command_part)
+                    else:
+                        reply = await self.judge_question(command_part, current_answer)
 
                     # 记录提问和回答
                     if game is not None:
@@ -1340,6 +1866,11 @@ class SoupaiPlugin(Star):
             logger.error(f"启动游戏会话失败: {e}")
             await event.send(event.plain_result(f"启动游戏会话失败：{e}"))
 
+    def _format_judge_stats(self, group_id: str) -> str:
+        """状态信息中的判题统计行"""
+        stats = self.judge_stats.get(group_id)
+        return f"\n⚡ 判题：{stats.summary()}" if stats and stats.questions else ""
+
     def _is_at_bot(self, event: AstrMessageEvent) -> bool:
         """检查消息是否@了bot"""
 
@@ -1349,71 +1880,45 @@ class SoupaiPlugin(Star):
                 return True
         return False
 
-    async def get_story_by_strategy(self, strategy: str) -> Optional[Tuple[str, str]]:
-        """根据策略获取故事，返回 (puzzle, answer) 或 None"""
-        import random
+    async def get_story_by_strategy(
+            self, strategy: str, difficulty: Optional[str] = None
+    ) -> Optional[Tuple[str, str]]:
+        """根据策略获取故事，返回 (puzzle, answer) 或 None
 
+        只从网络题库和本地储备中取题，不再现场调用 LLM 生成；
+        本地储备被消耗后唤醒预生成流水线补充。
+        """
         self._ensure_story_storages()
 
-        if strategy == "network_first":
-            # 策略1：优先网络题库 -> 本地存储库 -> LLM现场生成
-
-            # 1. 检查网络题库
-            story = self.online_story_storage.get_story()
-            if story:
-                return story
-
-            # 2. 检查本地存储库
-            story = self.local_story_storage.get_story()
-            if story:
-                return story
+        def from_network():
+            return self.online_story_storage.get_story()
 
-            # 3. LLM现场生成
-            return await self.generate_story_with_llm()
+        def from_local():
+            story = self.local_story_storage.get_story(difficulty)
+            if story and self.generation_pipeline:
+                self.generation_pipeline.wake()
+            return story
 
+        if strategy == "network_first":
+            # 策略1：优先网络题库 -> 本地存储库
+            sources = (from_network, from_local)
         elif strategy == "ai_first":
-            # 策略2：优先本地存储库 -> 网络题库 -> LLM现场生成
-
-            # 1. 检查本地存储库
-            story = self.local_story_storage.get_story()
-            if story:
-                return story
+            # 策略2：优先本地存储库 -> 网络题库
+            sources = (from_local, from_network)
+        elif strategy == "random":
+            # 策略3：随机决定这次先从网络题库还是本地存储库获取
+            sources = random.choice([(from_network, from_local), (from_local, from_network)])
+        else:
+            return None
 
-            # 2. 检查网络题库
-            story = self.online_story_storage.get_story()
+        for source in sources:
+            story = source()
             if story:
                 return story
 
-            # 3. LLM现场生成
-            return await self.generate_story_with_llm()
-
-        elif strategy == "random":
-            # 策略3：随机选择网络题库或本地存储库，失败时使用LLM现场生成
-
-            # 随机决定这次从网络题库还是本地存储库获取
-            if random.choice(["network", "storage"]) == "network":
-                # 参考策略1的网络题库逻辑
-                story = self.online_story_storage.get_story()
-                if story:
-                    return story
-
-                story = self.local_story_storage.get_story()
-                if story:
-                    return story
-
-                return await self.generate_story_with_llm()
-            else:
-                # 参考策略2的本地存储库逻辑
-                story = self.local_story_storage.get_story()
-                if story:
-                    return story
-
-                story = self.online_story_storage.get_story()
-                if story:
-                    return story
-
-                return await self.generate_story_with_llm()
-
+        # 题库全空时唤醒流水线，由后台补充
+        if self.generation_pipeline:
+            self.generation_pipeline.wake()
         return None
 
     async def _handle_game_status_in_session(
@@ -1432,10 +1937,11 @@ class SoupaiPlugin(Star):
 
                 question_info = f"{question_count}/{question_limit}" if question_limit else f"{question_count}/∞"
                 hint_info = f"{hint_count}/{hint_limit}" if hint_limit else "不可用"
+                judge_info = self._format_judge_stats(group_id)
 
                 await event.send(
                     event.plain_result(
-                        f"🎮 当前有活跃的海龟汤游戏\n📖 题面：{game['puzzle']}\n🎯 难度：{difficulty}\n❓ 提问：{question_info}\n💡 提示：{hint_info}"
+                        f"🎮 当前有活跃的海龟汤游戏\n📖 题面：{game['puzzle']}\n🎯 难度：{difficulty}\n❓ 提问：{question_info}\n💡 提示：{hint_info}{judge_info}"
                     )
                 )
             else:
@@ -1605,9 +2111,10 @@ class SoupaiPlugin(Star):
 
             question_info = f"{question_count}/{question_limit}" if question_limit else f"{question_count}/∞"
             hint_info = f"{hint_count}/{hint_limit}" if hint_limit else "不可用"
+            judge_info = self._format_judge_stats(group_id)
 
             yield event.plain_result(
-                f"🎮 当前有活跃的海龟汤游戏\n📖 题面：{game['puzzle']}\n🎯 难度：{difficulty}\n❓ 提问：{question_info}\n💡 提示：{hint_info}"
+                f"🎮 当前有活跃的海龟汤游戏\n📖 题面：{game['puzzle']}\n🎯 难度：{difficulty}\n❓ 提问：{question_info}\n💡 提示：{hint_info}{judge_info}"
             )
         else:
             yield event.plain_result(
@@ -1657,82 +2164,50 @@ class SoupaiPlugin(Star):
     async def start_backup_generation(self, event: AstrMessageEvent):
         """开始生成备用故事（仅管理员）"""
 
-        if self.auto_generating:
-            yield event.plain_result("⚠️ 备用故事生成已在运行中")
+        pipeline = self.generation_pipeline
+        if pipeline is None:
+            yield event.plain_result("⚠️ 插件尚未初始化完成，请稍后再试")
+            return
+        if pipeline.enabled:
+            pipeline.wake()
+            yield event.plain_result("⚠️ 备用故事生成已在运行中，已触发一次补充")
             return
 
-        # 检查存储库是否已满
         self._ensure_story_storages()
         storage_info = self.local_story_storage.get_storage_info()
-        if storage_info["available"] <= 0:
-            yield event.plain_result("⚠️ 存储库已满，无法生成更多故事")
-            return
-
-        self.auto_generating = True
-        asyncio.create_task(self._auto_generate_loop())
+        pipeline.enabled = True
+        pipeline.wake()
         yield event.plain_result(
             f"✅ 开始生成备用故事，存储库状态: {storage_info['total']}/{storage_info['max_size']}"
         )
 
-    # 🔒 全局指令拦截器 - 当正在生成时提醒用户
-    @filter.event_message_type(filter.EventMessageType.ALL)
-    async def global_command_interceptor(self, event: AstrMessageEvent):
-        """全局指令拦截器，当正在生成备用故事时提醒用户"""
-        # 检查是否有活跃游戏，如果有活跃游戏，不在这里处理
-        group_id = event.get_group_id()
-        if group_id and self.game_state.is_game_active(group_id):
-            # 有活跃游戏，让会话控制处理
-            return
-
-        # 如果正在生成备用故事，且不是 /备用结束 指令，则提醒用户
-        if self.auto_generating:
-            user_input = event.message_str.strip()
-            # 只拦截非本插件的指令，避免阻断自己的指令
-            if (
-                    user_input.startswith("/")
-                    and not user_input.startswith("/备用结束")
-                    and not user_input.startswith("/汤")
-                    and not user_input.startswith("/揭晓")
-                    and not user_input.startswith("/验证")
-                    and not user_input.startswith("/汤状态")
-                    and not user_input.startswith("/强制结束")
-                    and not user_input.startswith("/备用开始")
-                    and not user_input.startswith("/备用状态")
-                    and not user_input.startswith("/汤配置")
-                    and not user_input.startswith("/重置题库")
-                    and not user_input.startswith("/题库详情")
-                    and not user_input.startswith("/查看")
-                    and not user_input.startswith("/soup")
-            ):
-                yield event.plain_result(
-                    "⚠️ 系统正在生成备用故事，请稍后再试或使用 /备用结束 停止生成"
-                )
-
     @filter.permission_type(filter.PermissionType.ADMIN)
     @filter.command("备用结束")
     async def stop_backup_generation(self, event: AstrMessageEvent):
         """停止生成备用故事（仅管理员）"""
 
-        if not self.auto_generating:
+        pipeline = self.generation_pipeline
+        if pipeline is None or not pipeline.enabled:
             yield event.plain_result("⚠️ 备用故事生成未在运行")
             return
 
-        self.auto_generating = False
+        pipeline.enabled = False
         yield event.plain_result("✅ 已停止生成备用故事，正在完成当前生成...")
 
+    def _format_generate_window(self) -> str:
+        if self.auto_generate_start == self.auto_generate_end:
+            return "全天"
+        return f"{self.auto_generate_start}:00-{self.auto_generate_end}:00"
+
     @filter.command("备用状态")
     async def check_backup_status(self, event: AstrMessageEvent):
         """查看备用故事状态"""
         self._ensure_story_storages()
         storage_info = self.local_story_storage.get_storage_info()
         online_info = self.online_story_storage.get_storage_info()
-        status = "🟢 运行中" if self.auto_generating else "🔴 已停止"
-
-
-        # 检查存储库是否已满
-        storage_full_warning = ""
-        if storage_info["available"] <= 0:
-            storage_full_warning = "\n⚠️ 本地存储库已满，自动生成已停止"
+        pipeline = self.generation_pipeline
+        status = "🟢 运行中" if pipeline and pipeline.enabled else "🔴 已停止"
+        pipeline_info = f"\n{pipeline.summary()}" if pipeline else ""
 
         message = (
             f"📚 备用故事状态：\n"
@@ -1742,7 +2217,7 @@ class SoupaiPlugin(Star):
             f"• 剩余题目：{storage_info['remaining']}\n"
             f"• 可用空间：{storage_info['available']}\n"
             f"• 网络题库：{online_info['total']} 个 (已用: {online_info['used']}, 剩余: {online_info['available']})\n"
-            f"• 自动生成时间：{self.auto_generate_start}:00-{self.auto_generate_end}:00{storage_full_warning}"
+            f"• 自动生成时间：{self._format_generate_window()}{pipeline_info}"
         )
 
         yield event.plain_result(message)
@@ -1857,19 +2332,14 @@ class SoupaiPlugin(Star):
 
         # 获取策略的中文描述
         strategy_names = {
-            "network_first": "优先网络题库→本地存储库→LLM生成",
+            "network_first": "优先网络题库→本地存储库",
             "random": "随机选择网络题库或本地存储库",
-            "ai_first": "优先本地存储库→网络题库→LLM生成",
+            "ai_first": "优先本地存储库→网络题库",
         }
         strategy_name = strategy_names.get(
             self.puzzle_source_strategy, self.puzzle_source_strategy
         )
 
-        # 检查存储库是否已满
-        storage_full_warning = ""
-        if local_info["available"] <= 0:
-            storage_full_warning = "\n⚠️ 本地存储库已满，自动生成已停止"
-
         config_info = (
             f"⚙️ 海龟汤插件配置：\n"
             f"• 生成谜题 LLM：{self.generate_llm_provider_id or '默认'}\n"
@@ -1877,7 +2347,9 @@ class SoupaiPlugin(Star):
             f"• 游戏超时：{self.game_timeout} 秒\n"
             f"• 网络题库：{online_info['total']} 个谜题 (已用: {online_info['used']}, 剩余: {online_info['available']})\n"
             f"• 本地存储库：{local_info['total']}/{local_info['max_size']} (已用: {local_info['used']}, 剩余: {local_info['remaining']})\n"
-            f"• 自动生成时间：{self.auto_generate_start}:00-{self.auto_generate_end}:00\n"
-            f"• 谜题来源策略：{strategy_name}{storage_full_warning}"
+            f"• 自动生成时间：{self._format_generate_window()}\n"
+            f"• 每种难度储备：{self.reserve_per_difficulty} 个，"
+            f"并发 {self.generation_concurrency}，{self.generate_rate_per_hour} 次/小时\n"
+            f"• 谜题来源策略：{strategy_name}"
         )
         yield event.plain_result(config_info)
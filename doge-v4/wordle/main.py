@@ -1,6 +1,6 @@
 import os
 import random
-import json
+import asyncio
 from io import BytesIO
 
 from PIL import Image as ImageW   
@@ -11,12 +11,15 @@ from astrbot.api.event import AstrMessageEvent
 from astrbot.api.star import Context, Star, register
 import re
 
-try:
-    os.system("python -m pip install pyspellchecker")  
-except:
-    logger.info("Pyspellchecker not installed this time.")
+from .word_index import WordIndex
+from .solver import WordleSolver
 
-from spellchecker import SpellChecker
+try:
+    from spellchecker import SpellChecker
+except ImportError:
+    # 只在缺少依赖时安装，避免每次加载插件都调用 pip
+    os.system("python -m pip install pyspellchecker")
+    from spellchecker import SpellChecker
 
 def re_spell_check(word: str, re_word_list: list):  
     for each_word in re_word_list:
@@ -24,8 +27,9 @@ def re_spell_check(word: str, re_word_list: list):
             return True
         
 class WordleGame:
-    def __init__(self, answer: str):
+    def __init__(self, answer: str, explanation: str = ""):
         self.answer = answer.upper()
+        self.explanation = explanation
         self.length = len(answer)
         self.max_attempts = self.length + 1
         self.guesses: list[str] = []
@@ -239,39 +243,53 @@ class PluginWordle(Star):
         # 自定义拼写检查
         self.custom_word_list = self.config.get("custom_word_list", "").split(";")
 
-    @staticmethod
-    async def get_answer(length):
-        try:
-            wordlist_path = os.path.join(
-                os.path.dirname(os.path.abspath(__file__)), "wordlist"
-            )
+        # 词表和拼写检查器只加载一次，在所有会话间共享
+        self.wordlist_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wordlist")
+        self.word_index: WordIndex | None = None
+        self.spell_checker: SpellChecker | None = None
+        self.solver: WordleSolver | None = None
+        self.solve_running = False
+        self._load_lock = asyncio.Lock()
+
+    async def get_word_index(self) -> WordIndex | None:
+        if self.word_index is None:
+            async with self._load_lock:
+                if self.word_index is None:
+                    if not os.path.exists(self.wordlist_path):
+                        logger.error("词表文件不存在")
+                        return None
+                    self.word_index = await asyncio.to_thread(WordIndex, self.wordlist_path)
+                    logger.info(f"词表加载完成，共{len(self.word_index)}个单词")
+        return self.word_index
+
+    async def get_spell_checker(self) -> SpellChecker:
+        if self.spell_checker is None:
+            async with self._load_lock:
+                if self.spell_checker is None:
+                    self.spell_checker = await asyncio.to_thread(SpellChecker)
+        return self.spell_checker
+
+    async def get_solver(self) -> WordleSolver | None:
+        word_index = await self.get_word_index()
+        if word_index is None:
+            return None
+        if self.solver is None:
+            self.solver = WordleSolver(word_index)
+        return self.solver
 
-            if not os.path.exists(wordlist_path):
-                logger.error("词表文件不存在")
+    async def get_answer(self, length) -> tuple[str, str] | None:
+        """随机选一个指定长度的单词，返回 (大写单词, 中文释义)"""
+        try:
+            word_index = await self.get_word_index()
+            if word_index is None:
                 return None
-
-            # 获取单词文件
-            word_file_list = os.listdir(wordlist_path)
-            global word_dict
-            word_dict = {}
-            # 遍历单词表，并用字典接收内容
-            for word_file in word_file_list:
-                with open(os.path.join(wordlist_path,word_file),"r",encoding="utf-8") as f:
-                    word_dict.update(json.load(f)) 
-                    # 只保留长度为length的单词
-                    for word in list(word_dict.keys()):
-                        if len(word) != length:
-                            del word_dict[word]
-
-            # 随机选一个单词
-            word = random.choice(list(word_dict.keys()))
-            global explanation
-            explanation = word_dict[word]["中释"]
-
+            picked = word_index.random_word(int(length))
+            if picked is None:
+                return None
+            word, explanation = picked
             logger.info(f"选择了{word}单词，长度{length}，释义为{explanation}")
+            return word.upper(), explanation
 
-            return word.upper()
-        
         except Exception as e:
             logger.error(f"加载词表失败: {e!s}")
             return None
@@ -301,6 +319,20 @@ class PluginWordle(Star):
             return
         game = self.game_sessions[session_id]
 
+        # 优先用求解器给出推荐猜测，答案不在可解的词表里时退回到原来的提示方式
+        solver = await self.get_solver()
+        if solver is not None:
+            suggestion, remaining, bits = await asyncio.to_thread(
+                solver.suggest, game.length, game.guesses, game.feedbacks
+            )
+            if suggestion is not None:
+                if remaining == 1:
+                    hint = f"根据目前的反馈，只剩下一个可能的单词了：{suggestion}。"
+                else:
+                    hint = f"根据目前的反馈，还有{remaining}个可能的单词，推荐猜 {suggestion}（预计能获得{bits:.2f}比特的信息）。"
+                yield event.plain_result(hint)
+                return
+
         image_result_hint = await game.hint()
 
         if not image_result_hint == False:  # 当用户猜出来过正确的字母时，给出图片形式的提示
@@ -337,14 +369,45 @@ class PluginWordle(Star):
             hint = f"提示：第{i+1}个字母是 {game.answer[i]}。"
             yield event.plain_result(hint)
     
+    @wordle.command("solve")  # type: ignore
+    async def solve_benchmark(self, event: AstrMessageEvent, length = 5, limit = 0):
+        """让求解器玩遍指定长度的所有单词，统计平均猜测次数"""
+        if self.solve_running:
+            yield event.plain_result("求解器正在测试中，请稍后再试。")
+            return
+        solver = await self.get_solver()
+        if solver is None:
+            yield event.plain_result("词表加载失败，无法测试求解器。")
+            return
+        yield event.plain_result(f"开始测试{length}个字母的单词，请稍候……")
+        self.solve_running = True
+        try:
+            stats = await asyncio.to_thread(solver.benchmark, int(length), int(limit))
+        except Exception as e:
+            logger.error(f"求解器测试失败: {e!s}")
+            yield event.plain_result("求解器测试失败了……")
+            return
+        finally:
+            self.solve_running = False
+        if stats is None:
+            yield event.plain_result(f"没有{length}个字母长度的单词。")
+            return
+        yield event.plain_result(
+            f"求解器测试完成（{length}个字母，词表共{stats['words']}个单词，测试{stats['games']}局）\n"
+            f"开局猜测：{stats['opening']}\n"
+            f"平均猜测次数：{stats['average']:.3f}，最多{stats['worst']}次\n"
+            f"{length + 1}次内没猜出：{stats['failed']}局\n"
+            f"耗时：{stats['seconds']:.1f}秒"
+        )
+
     @wordle.command("start")  # type: ignore
     async def start_wordle(self, event: AstrMessageEvent, length = 5):
         """开始Wordle游戏"""
-        answer = await self.get_answer(length)
+        picked = await self.get_answer(length)
         session_id = event.unified_msg_origin
         if session_id in self.game_sessions:
             del self.game_sessions[session_id]
-        if not answer:
+        if not picked:
             random_text = random.choice([
                 f"{length}个字母长度的单词，我找不到啊……",
                 f"{length}个字母的单词好像有点稀有哦，换一个吧！",
@@ -352,8 +415,13 @@ class PluginWordle(Star):
             ])
             yield event.plain_result(random_text)
         else:
-            game = WordleGame(answer)
+            answer, explanation = picked
+            game = WordleGame(answer, explanation)
             self.game_sessions[session_id] = game
+            # 后台预计算这个长度的反馈矩阵，之后的提示就不用再等
+            solver = await self.get_solver()
+            if solver is not None:
+                asyncio.create_task(asyncio.to_thread(solver.table, game.length))
             logger.debug(f"答案是：{answer}")
             random_text = random.choice([
                     f"游戏开始！请输入长度为{length}的单词。",
@@ -373,13 +441,12 @@ class PluginWordle(Star):
         if session_id in self.game_sessions and event.is_at_or_wake_command:
             game = self.game_sessions[session_id]
 
-            if "wordle start" in msg or "wordle end" in msg or "wordle hint" in msg:
+            if "wordle start" in msg or "wordle end" in msg or "wordle hint" in msg or "wordle solve" in msg:
                 return
             
             else:
                 
                 length = game.length
-                spellcheck = SpellChecker()
 
                 if not msg.isalpha():
                     random_text = random.choice([
@@ -413,8 +480,8 @@ class PluginWordle(Star):
                     return   
                     
                 elif not(
-                    msg in list(word_dict.keys())   # 在词表中是否找到用户的输入
-                    or spellcheck.known((msg,)) # 在拼写检查库中是否找到用户的输入
+                    msg in await self.get_word_index()   # 在词表中是否找到用户的输入
+                    or (await self.get_spell_checker()).known((msg,)) # 在拼写检查库中是否找到用户的输入
                     or (re_spell_check(msg,self.custom_word_list))
                     ):
                     random_text = random.choice([
@@ -452,10 +519,10 @@ class PluginWordle(Star):
                 ])
                 if random.randint(1,22) == 1:
                     random_text = "🔠🥳语言神，启动🔠🥳！"
-                game_status = f"{random_text}“{game.answer}”的意思是“{explanation}”。"
+                game_status = f"{random_text}“{game.answer}”的意思是“{game.explanation}”。"
                 del self.game_sessions[session_id]
             elif game.is_game_over:
-                game_status = f"没有人猜出答案啊Σ(°△°|||)︴\n正确答案是“{game.answer}”，意思是“{explanation}”。"
+                game_status = f"没有人猜出答案啊Σ(°△°|||)︴\n正确答案是“{game.answer}”，意思是“{game.explanation}”。"
                 del self.game_sessions[session_id]
             else:
                 game_status = f"已猜测 {len(game.guesses)}/{game.max_attempts} 次。"
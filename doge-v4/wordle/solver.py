@@ -0,0 +1,175 @@
+"""
+Wordle 求解器
+
+- 同一长度的单词编码成 (N, L) 的字母矩阵，反馈按 游戏里 guess() 的规则
+  （先判绿，再按剩余字母数从左到右判黄）向量化计算，编码为三进制整数
+  sum(feedback[i] * 3**i)
+- 每个长度第一次用到时预计算 N x N 的反馈矩阵，之后建议猜测只需在矩阵上
+  取候选列、按行统计反馈分布并计算信息熵
+- 候选集由已有的 guesses/feedbacks 过滤得到，猜过的词即使不在词表里也能参与过滤
+"""
+import threading
+import time
+
+import numpy as np
+
+from .word_index import WordIndex
+
+CHUNK = 512
+
+
+def encode_words(words: list[str]) -> np.ndarray:
+    """大写单词列表 -> (N, L) 的 int8 字母编号矩阵"""
+    if not words:
+        return np.zeros((0, 0), dtype=np.int8)
+    raw = np.frombuffer("".join(words).encode("ascii"), dtype=np.uint8)
+    return (raw.reshape(len(words), -1) - ord("A")).astype(np.int8)
+
+
+def feedback_code(feedback: list[int]) -> int:
+    return sum(v * 3 ** i for i, v in enumerate(feedback))
+
+
+def compute_patterns(guesses: np.ndarray, answers: np.ndarray) -> np.ndarray:
+    """(G, L) 的猜测 x (N, L) 的答案 -> (G, N) 的反馈编码"""
+    length = guesses.shape[1]
+    dtype = np.uint16 if 3 ** length <= np.iinfo(np.uint16).max else np.uint32
+    weights = (3 ** np.arange(length)).astype(dtype)
+    out = np.zeros((len(guesses), len(answers)), dtype=dtype)
+    for start in range(0, len(guesses), CHUNK):
+        g = guesses[start:start + CHUNK, :, None]  # (G, L, 1)，和答案的 (N,) 广播成 (G, N)
+        block = out[start:start + CHUNK]
+        open_ = [g[:, i] != answers[:, i] for i in range(length)]
+        for i in range(length):
+            # 答案里未判绿、且和猜测词第 i 位字母相同的位置数
+            avail = np.zeros(block.shape, dtype=np.int8)
+            for p in range(length):
+                avail += open_[p] & (answers[:, p] == g[:, i])
+            # 同一字母在它左边、且未判绿的出现次数，按从左到右的顺序消耗剩余个数
+            for j in range(i):
+                avail -= open_[j] & (g[:, j] == g[:, i])
+            yellow = open_[i] & (avail > 0)
+            block += (~open_[i] * 2 + yellow).astype(dtype) * weights[i]
+    return out
+
+
+class LengthTable:
+    """一个长度的全部单词和它们两两之间的反馈矩阵"""
+
+    def __init__(self, words: list[str]):
+        self.words = words
+        self.position = {w: i for i, w in enumerate(words)}
+        self.codes = encode_words(words)
+        self.patterns = compute_patterns(self.codes, self.codes)
+        self.opening: tuple[str, float] | None = None
+
+    def pattern_row(self, word: str, columns: np.ndarray) -> np.ndarray:
+        idx = self.position.get(word)
+        if idx is not None:
+            return self.patterns[idx, columns]
+        # 玩家猜的词可能只通过了拼写检查，不在词表里
+        return compute_patterns(encode_words([word]), self.codes[columns])[0]
+
+    def filter(self, guesses: list[str], feedbacks: list[list[int]]) -> np.ndarray:
+        """返回和所有反馈都一致的候选下标"""
+        candidates = np.arange(len(self.words))
+        for word, feedback in zip(guesses, feedbacks):
+            if len(candidates) == 0:
+                break
+            row = self.pattern_row(word.upper(), candidates)
+            candidates = candidates[row == feedback_code(feedback)]
+        return candidates
+
+    def entropies(self, candidates: np.ndarray) -> np.ndarray:
+        """每个词作为猜测时，在候选集上反馈分布的信息熵"""
+        sub = np.sort(self.patterns[:, candidates], axis=1)
+        rows, cols = sub.shape
+        starts = np.ones_like(sub, dtype=bool)
+        starts[:, 1:] = sub[:, 1:] != sub[:, :-1]
+        group = np.cumsum(starts.ravel()) - 1
+        sizes = np.bincount(group).astype(np.float64)
+        group_row = np.repeat(np.arange(rows), cols)[starts.ravel()]
+        p = sizes / cols
+        return np.bincount(group_row, weights=-p * np.log2(p), minlength=rows)
+
+    def best_guess(self, candidates: np.ndarray) -> tuple[str, float]:
+        if len(candidates) <= 2:
+            return self.words[candidates[0]], float(len(candidates) == 2)
+        scores = self.entropies(candidates)
+        # 信息量相同时优先选有可能就是答案的词
+        bonus = np.zeros(len(self.words))
+        bonus[candidates] = 1.0 / len(candidates)
+        best = int(np.argmax(scores + bonus))
+        return self.words[best], float(scores[best])
+
+
+class WordleSolver:
+    """按长度懒加载反馈矩阵，供提示和自测使用；方法都是同步的，应放在线程里调用"""
+
+    def __init__(self, word_index: WordIndex):
+        self.word_index = word_index
+        self.tables: dict[int, LengthTable] = {}
+        self.lock = threading.Lock()
+
+    def table(self, length: int) -> LengthTable | None:
+        with self.lock:
+            table = self.tables.get(length)
+            if table is None:
+                words = sorted({w.upper() for w in self.word_index.bucket(length) if w.isascii() and w.isalpha()})
+                if not words:
+                    return None
+                table = self.tables[length] = LengthTable(words)
+            return table
+
+    def suggest(self, length: int, guesses: list[str], feedbacks: list[list[int]]) -> tuple[str | None, int, float]:
+        """返回 (建议猜测, 剩余候选数, 期望信息量 bits)"""
+        table = self.table(length)
+        if table is None:
+            return None, 0, 0.0
+        candidates = table.filter(guesses, feedbacks)
+        if len(candidates) == 0:
+            return None, 0, 0.0
+        if not guesses:
+            if table.opening is None:
+                table.opening = table.best_guess(candidates)
+            word, bits = table.opening
+        else:
+            word, bits = table.best_guess(candidates)
+        return word, len(candidates), bits
+
+    def play(self, table: LengthTable, answer_idx: int, max_guesses: int) -> int:
+        """用求解器猜一个答案，返回用掉的次数，超过上限返回 max_guesses + 1"""
+        candidates = np.arange(len(table.words))
+        if table.opening is None:
+            table.opening = table.best_guess(candidates)
+        word = table.opening[0]
+        for turn in range(1, max_guesses + 1):
+            guess_idx = table.position[word]
+            if guess_idx == answer_idx:
+                return turn
+            code = table.patterns[guess_idx, answer_idx]
+            candidates = candidates[table.patterns[guess_idx, candidates] == code]
+            word = table.best_guess(candidates)[0]
+        return max_guesses + 1
+
+    def benchmark(self, length: int, limit: int = 0) -> dict | None:
+        """让求解器把该长度的所有答案（或前 limit 个）都玩一遍"""
+        table = self.table(length)
+        if table is None:
+            return None
+        started = time.perf_counter()
+        answers = range(len(table.words))
+        if limit and limit < len(table.words):
+            answers = np.random.default_rng(0).choice(len(table.words), limit, replace=False)
+        max_guesses = length + 1
+        results = [self.play(table, int(i), max_guesses) for i in answers]
+        solved = [r for r in results if r <= max_guesses]
+        return {
+            "words": len(table.words),
+            "games": len(results),
+            "average": sum(solved) / len(solved) if solved else 0.0,
+            "worst": max(solved) if solved else 0,
+            "failed": len(results) - len(solved),
+            "opening": table.opening[0],
+            "seconds": time.perf_counter() - started,
+        }
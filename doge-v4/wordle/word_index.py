@@ -0,0 +1,41 @@
+import json
+import os
+import random
+
+
+class WordIndex:
+    """词表索引：启动后只读一次，按长度分桶，并提供小写单词集合用于拼写检查"""
+
+    def __init__(self, wordlist_path: str):
+        self.buckets: dict[int, list[str]] = {}
+        self.explanations: dict[str, str] = {}
+        self.words: set[str] = set()
+
+        merged = {}
+        for word_file in sorted(os.listdir(wordlist_path)):
+            if not word_file.endswith(".json"):
+                continue
+            with open(os.path.join(wordlist_path, word_file), "r", encoding="utf-8") as f:
+                merged.update(json.load(f))
+
+        for word, info in merged.items():
+            self.buckets.setdefault(len(word), []).append(word)
+            self.explanations[word] = info.get("中释", "") if isinstance(info, dict) else ""
+            self.words.add(word.lower())
+
+    def __contains__(self, word: str) -> bool:
+        return word.lower() in self.words
+
+    def __len__(self) -> int:
+        return len(self.explanations)
+
+    def bucket(self, length: int) -> list[str]:
+        return self.buckets.get(length, [])
+
+    def random_word(self, length: int) -> tuple[str, str] | None:
+        """随机抽一个指定长度的单词，返回 (单词, 中文释义)"""
+        bucket = self.buckets.get(length)
+        if not bucket:
+            return None
+        word = random.choice(bucket)
+        return word, self.explanations[word]